@@ -14,7 +14,7 @@ from io import BytesIO
 from types import SimpleNamespace
 
 # ## EXTERNAL IMPORTS
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, render_template
 from sqlalchemy import event, MetaData
 from flask_sqlalchemy import SQLAlchemy
 from flask_apscheduler import APScheduler
@@ -25,13 +25,14 @@ from werkzeug.exceptions import HTTPException
 
 # ## PACKAGE IMPORTS
 from config import DB_PATH, JOBS_PATH, DEBUG_MODE, NAMING_CONVENTION, DEBUG_LOG, DEBUG_VERBOSE, LOGHANDLER,\
-    CHECK_FOREIGN_KEYS
+    CHECK_FOREIGN_KEYS, SQL_PROFILING, SQL_PROFILE_PANEL, QUERY_SHAPE_LOGGING
 from utility import RepeatTimer, is_interactive_shell
 from utility.uprint import buffered_print, print_warning, print_sql
 from utility.data import encode_json
 
 # ## LOCAL IMPORTS
 from .logical import query_extensions
+from .logical.full_text import regexp
 from .logical.validate import validate_python
 
 
@@ -79,6 +80,9 @@ def _fk_pragma_on_connect(dbapi_connection, connection_record, database):
             _dbg_print = print_sql
         dbapi_connection.set_trace_callback(_dbg_print)
 
+    if database == 'prebooru':
+        dbapi_connection.create_function('regexp', 2, regexp, deterministic=True)
+
     DATABASE_INFO.connections[database].add(connection_record.uuid)
     logger.debug('DBOPEN-%s(%d) [%d]--%s--:CONN(%s)', database, len(DATABASE_INFO.connections[database]),
                  connection_record.pid, connection_record.uuid, SERVER_INFO.unique_id)
@@ -124,20 +128,27 @@ def _fk_open_connections():
 
 
 def _fk_before_cursor_execute(dbapi_connection, cursor, statement, params, context, executemany):
-    if DEBUG_LOG:
+    if DEBUG_LOG or SQL_PROFILING or QUERY_SHAPE_LOGGING:
         dbapi_connection.info.setdefault('query_start_time', [])
         dbapi_connection.info['query_start_time'].append(time.perf_counter())
 
 
 def _fk_after_cursor_execute(dbapi_connection, cursor, statement, params, context, executemany):
-    if DEBUG_LOG:
+    if DEBUG_LOG or SQL_PROFILING or QUERY_SHAPE_LOGGING:
         start_time = dbapi_connection.info['query_start_time'].pop(-1)
         duration = 1000 * (time.perf_counter() - start_time)
-        print("Execution time: %0.2fms" % duration)
+        if DEBUG_LOG:
+            print("Execution time: %0.2fms" % duration)
+        if SQL_PROFILING:
+            from app.logical.sql_profiler import record_statement
+            record_statement(statement, params, duration, executemany)
+        if QUERY_SHAPE_LOGGING:
+            from app.logical.query_shapes import record_query_shape
+            record_query_shape(statement, duration)
 
 
 def _before_request():
-    from app.logical.database.server_info_db import update_last_activity
+    from app.logical.activity import record_activity
     SERVER_INFO.unique_id = str(uuid.uuid4())
     logger.info("Before request: Endpoint - %s, Allow - %s, Active = %d, UUID = %s\n",
                 request.endpoint, SERVER_INFO.allow_requests, SERVER_INFO.active_requests,
@@ -145,16 +156,28 @@ def _before_request():
     SERVER_INFO.active_requests += 1
     if not re.match(r'^(?:shutdown|ping|scheduler|job|static|media)', request.endpoint or ''):
         try:
-            update_last_activity('user')
+            record_activity('user')
         except Exception as e:
-            # Don't fail the request if the database is locked
+            # Don't fail the request if the activity file is unavailable
             logger.warning(f"Unable to update last activity:\r\n {e}")
-            SESSION.rollback()
-        else:
-            SESSION.commit()
+    if SQL_PROFILING:
+        from app.logical.sql_profiler import start_profile
+        start_profile()
     return None if SERVER_INFO.allow_requests else ""
 
 
+def _after_request(response):
+    if SQL_PROFILING:
+        from app.logical.sql_profiler import finish_profile
+        profile = finish_profile(response)
+        if SQL_PROFILE_PANEL and profile is not None and response.mimetype == 'text/html'\
+                and not response.direct_passthrough:
+            panel = render_template('layouts/_sql_profile.html', profile=profile)
+            html = response.get_data(as_text=True)
+            response.set_data(html.replace('</body>', panel + '</body>', 1))
+    return response
+
+
 def _teardown_request(error=None):
     if error is not None:
         logger.warning(f"\nRequest error: {error}\n")
@@ -282,6 +305,7 @@ event.listen(DB.get_engine(bind=None).engine, 'after_cursor_execute', _fk_after_
 
 PREBOORU_APP.wsgi_app = MethodRewriteMiddleware(PREBOORU_APP.wsgi_app)
 PREBOORU_APP.before_request(_before_request)
+PREBOORU_APP.after_request(_after_request)
 PREBOORU_APP.teardown_request(_teardown_request)
 PREBOORU_APP.errorhandler(Exception)(_error_handler)
 
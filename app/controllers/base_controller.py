@@ -126,9 +126,18 @@ def default_order(query, search):
 
 def paginate(query, request, max_limit=MAXIMUM_PAGINATE_LIMIT, **kwargs):
     per_page = get_limit(request, max_limit)
+    count_key = _count_key(request, kwargs)
+    keyset_orderable = _is_keyset_orderable(query)
+    keyset_page = get_keyset_page(request)
+    if keyset_page is not None and keyset_orderable:
+        return query.keyset_paginate(page=keyset_page, per_page=per_page, count_key=count_key, **kwargs)
     page = get_page(request, query, per_page)
     try:
-        return query.count_paginate(page=page, per_page=per_page, **kwargs)
+        pagination = query.count_paginate(page=page, per_page=per_page, count_key=count_key, **kwargs)
+        if keyset_orderable and kwargs.get('count', True) and len(pagination.items) > 0:
+            # Going forward from any numbered page switches to keyset pages, which don't slow down with depth
+            pagination.next_keyset = f'b{pagination.items[-1].id}' if pagination.has_next else None
+        return pagination
     except Exception as e:
         # Fallback to a less efficient paginate upon exception
         tback = traceback.format_exc()
@@ -201,6 +210,11 @@ def get_page(request, query=None, per_page=None):
     return 1
 
 
+def get_keyset_page(request):
+    page = request.args.get('page')
+    return page if page is not None and re.match(r'^[ab]\d+$', page) else None
+
+
 def get_limit(request, max_limit=None):
     default_limit = min(max_limit, DEFAULT_PAGINATE_LIMIT) if max_limit is not None else DEFAULT_PAGINATE_LIMIT
     max_limit = max_limit if max_limit is not None else MAXIMUM_PAGINATE_LIMIT
@@ -338,5 +352,17 @@ def strip_whitespace(html):
 
 # #### Private functions
 
+def _is_keyset_orderable(query):
+    order_clauses = query._order_by_clauses
+    if len(order_clauses) != 1:
+        return False
+    return order_clauses[0].compare(_query_model(query).id.desc())
+
+
+def _count_key(request, kwargs):
+    args = tuple(sorted((k, tuple(v)) for (k, v) in request.args.lists() if k not in ['page', 'limit']))
+    return (request.path, args, kwargs.get('distinct', False))
+
+
 def _query_model(query):
     return query.column_descriptions[0]['entity']
@@ -1,16 +1,21 @@
 # APP/CONTROLLERS/ERRORS_CONTROLLER.PY
 
+# ## PYTHON IMPORTS
+from types import SimpleNamespace
+
 # ## EXTERNAL IMPORTS
-from flask import Blueprint, request, render_template, flash, redirect, url_for
+from flask import Blueprint, request, render_template, flash, redirect, url_for, jsonify, abort
+from flask_sqlalchemy import Pagination
 
 # ## PACKAGE IMPORTS
 from utility.data import eval_bool_string
 
 # ## LOCAL IMPORTS
 from ..logical.database.error_db import delete_error
+from ..logical.logger import ERROR_LOGS
 from ..models import Error
 from .base_controller import get_params_value, process_request_values, show_json_response, index_json_response,\
-    search_filter, default_order, paginate, get_or_abort, index_html_response
+    search_filter, default_order, paginate, get_or_abort, index_html_response, get_page, get_limit
 
 
 # ## GLOBAL VARIABLES
@@ -31,6 +36,18 @@ def index():
     return q
 
 
+def log_page(count=True):
+    log_type = request.args.get('type', 'error')
+    if log_type not in ERROR_LOGS:
+        abort(404)
+    error_log = ERROR_LOGS[log_type]
+    # Page 0 would give a negative offset, and limit 0 would never fill a page
+    page, per_page = max(get_page(request), 1), max(get_limit(request), 1)
+    items = error_log.page(page, per_page)
+    total = error_log.count() if count else None
+    return log_type, Pagination(None, page, per_page, total, items)
+
+
 # #### Route functions
 
 # ###### SHOW
@@ -61,6 +78,20 @@ def index_html():
     return index_html_response(page, 'error', 'errors')
 
 
+# ###### LOG
+
+@bp.route('/errors/log.json', methods=['GET'])
+def log_json():
+    _, page = log_page(count=False)
+    return jsonify(page.items)
+
+
+@bp.route('/errors/log', methods=['GET'])
+def log_html():
+    log_type, page = log_page()
+    return render_template("errors/log.html", page=page, log_type=log_type, error=SimpleNamespace(id=None))
+
+
 # #### DELETE
 
 @bp.route('/errors/<int:id>', methods=['DELETE'])
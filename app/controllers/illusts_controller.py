@@ -20,6 +20,7 @@ from ..logical.records.illust_rec import update_illust_from_source, archive_illu
     illust_delete_title, illust_swap_title, illust_delete_commentary, illust_swap_commentary,\
     illust_add_additional_commentary, delete_illust, save_illust_to_archive
 from ..logical.sources.base_src import get_post_source
+from ..logical.tag_index import tag_query_filter
 from ..logical.database.illust_db import create_illust_from_parameters, update_illust_from_parameters,\
     set_illust_artist
 from .base_controller import get_params_value, process_request_values, show_json_response, index_json_response,\
@@ -249,6 +250,7 @@ def index():
     q = Illust.query
     q = search_filter(q, search, negative_search)
     q = pool_filter(q, search)
+    q = tag_query_filter(q, Illust, search)
     if search.get('order') == 'site':
         q = q.order_by(Illust.site_illust_id.desc())
     else:
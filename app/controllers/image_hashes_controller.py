@@ -55,8 +55,7 @@ FORM_CONFIG = {
         'name': 'Image size',
         'field': SelectField,
         'kwargs': {
-            'choices': [("", ""), ('chunk', 'Chunk'), ('cross0', 'Cross #0'), ('cross0', 'Cross #1'),
-                        ('cross2', 'Cross #2'), ('all', 'All')],
+            'choices': [("", ""), ('index', 'Index'), ('band', 'Band'), ('all', 'All')],
         },
     },
 }
@@ -82,7 +81,7 @@ def convert_data_params(dataparams):
     params = nullify_blanks(params)
     set_default(params, 'score', 90.0)
     set_default(params, 'size', 'small')
-    set_default(params, 'sim_clause', 'cross2')
+    set_default(params, 'sim_clause', 'index')
     return params
 
 
@@ -12,6 +12,7 @@ from utility.time import local_timezone
 
 # ## LOCAL IMPORTS
 from .. import SCHEDULER
+from ..logical.database.jobs_db import get_media_job_counts
 
 
 # ## GLOBAL VARIABLES
@@ -39,6 +40,11 @@ def index_json():
     return jsonify(data)
 
 
+@bp.route('/jobs/media', methods=['GET'])
+def media_index_json():
+    return jsonify(get_media_job_counts())
+
+
 # #### CREATE
 
 @bp.route('/jobs', methods=['POST'])
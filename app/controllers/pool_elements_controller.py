@@ -1,7 +1,8 @@
 # APP/CONTROLLERS/POOL_ELEMENTS_CONTROLLER.PY
 
 # ## EXTERNAL IMPORTS
-from flask import Blueprint, request, redirect, flash
+from flask import Blueprint, request, redirect, flash, jsonify
+from sqlalchemy import or_, and_
 from sqlalchemy.orm import selectinload
 
 # ## PACKAGE IMPORTS
@@ -11,10 +12,11 @@ from utility.data import eval_bool_string, int_or_array
 from ..models import Pool, PoolElement, Post, Illust
 from ..logical.utility import set_error
 from ..logical.database.pool_element_db import get_pool_elements_by_id
-from ..logical.records.pool_rec import add_to_pool, delete_pool_element, batch_delete_pool_elements
+from ..logical.records.pool_rec import add_to_pool, move_pool_element, delete_pool_element,\
+    batch_delete_pool_elements
 from .base_controller import get_data_params, get_or_abort, get_or_error, check_param_requirements,\
-    index_json_response, show_json_response, process_request_values, get_params_value, search_filter, default_order,\
-    parse_type, render_template_ws
+    show_json_response, process_request_values, get_params_value, search_filter, default_order, parse_type,\
+    render_template_ws, paginate
 
 
 # ## GLOBAL VARIABLES
@@ -89,7 +91,10 @@ def show_json(id):
 @bp.route('/pool_elements.json', methods=['GET'])
 def index_json():
     q = index()
-    return index_json_response(q, request)
+    # Same as index_json_response, except that the ordinals for the whole page are loaded with one query
+    pool_elements = paginate(q, request, count=False).items
+    PoolElement.load_ordinals(pool_elements)
+    return jsonify([pool_element.to_json() for pool_element in pool_elements])
 
 
 # ###### CREATE
@@ -107,11 +112,29 @@ def create_json():
             item = Illust.find(result['item']['id'])
         pool_elements = PoolElement.query.options(selectinload(PoolElement.pool))\
                                          .filter(PoolElement.id.in_(result['element_ids'])).all()
+        PoolElement.load_ordinals(pool_elements)
         result['html'] = render_template_ws("pools/_section.html", pool_elements=pool_elements,
                                             section_id=f"{result['type']}-pools", item=item)
     return result
 
 
+# ###### UPDATE
+
+@bp.route('/pool_elements/<int:id>.json', methods=['PUT'])
+def update_json(id):
+    pool_element = get_or_error(PoolElement, id)
+    if type(pool_element) is dict:
+        return pool_element
+    dataparams = get_data_params(request, 'pool_element')
+    position = parse_type(dataparams, 'position', int)
+    retdata = {'error': False, 'params': dataparams}
+    if position is None or position < 0:
+        return set_error(retdata, "A position of 0 or greater must be specified.")
+    move_pool_element(pool_element, position)
+    retdata['item'] = pool_element.to_json()
+    return retdata
+
+
 # ###### DELETE
 
 @bp.route('/pool_elements/<int:id>.json', methods=['DELETE'])
@@ -162,8 +185,10 @@ def batch_delete_html():
 def previous_html(id):
     pool_element = get_or_abort(PoolElement, id)
     previous_element = PoolElement.query.filter(PoolElement.pool_id == pool_element.pool_id,
-                                                PoolElement.position < pool_element.position)\
-                                  .order_by(PoolElement.position.desc()).first()
+                                                or_(PoolElement.position < pool_element.position,
+                                                    and_(PoolElement.position == pool_element.position,
+                                                         PoolElement.id < pool_element.id)))\
+                                  .order_by(PoolElement.position.desc(), PoolElement.id.desc()).first()
     if previous_element is None:
         return redirect(request.referrer)
     return redirect(previous_element.item.show_url)
@@ -173,8 +198,10 @@ def previous_html(id):
 def next_html(id):
     pool_element = get_or_abort(PoolElement, id)
     next_element = PoolElement.query.filter(PoolElement.pool_id == pool_element.pool_id,
-                                            PoolElement.position > pool_element.position)\
-                              .order_by(PoolElement.position.asc()).first()
+                                            or_(PoolElement.position > pool_element.position,
+                                                and_(PoolElement.position == pool_element.position,
+                                                     PoolElement.id > pool_element.id)))\
+                              .order_by(PoolElement.position.asc(), PoolElement.id.asc()).first()
     if next_element is None:
         return redirect(request.referrer)
     return redirect(next_element.item.show_url)
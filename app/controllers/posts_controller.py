@@ -13,6 +13,7 @@ from utility.data import eval_bool_string, is_falsey
 from ..models import Post, Illust, IllustUrl, Artist, Booru, PoolElement, PostType
 from ..logical.records.post_rec import create_sample_preview_files, create_video_sample_preview_files,\
     archive_post_for_deletion, redownload_post, delete_post, save_post_to_archive, download_post_frames
+from ..logical.tag_index import tag_query_filter
 from .base_controller import show_json_response, index_json_response, search_filter, process_request_values,\
     get_params_value, paginate, default_order, get_or_abort, index_html_response
 
@@ -107,6 +108,7 @@ def index():
     q = Post.query
     q = search_filter(q, search, negative_search)
     q = pool_filter(q, search)
+    q = tag_query_filter(q, Post, search)
     if search.get('order') == 'site':
         q = q.unique_join(IllustUrl, Post.illust_urls)\
              .unique_join(Illust, IllustUrl.illust)\
@@ -0,0 +1,35 @@
+# APP/CONTROLLERS/SQL_PROFILES_CONTROLLER.PY
+
+# ## EXTERNAL IMPORTS
+from flask import Blueprint, jsonify
+
+# ## LOCAL IMPORTS
+from ..logical.sql_profiler import get_profiles, get_profile, clear_profiles
+
+
+# ## GLOBAL VARIABLES
+
+bp = Blueprint("sql_profile", __name__)
+
+
+# ## FUNCTIONS
+
+# #### Route functions
+
+@bp.route('/sql_profiles.json', methods=['GET'])
+def index_json():
+    return jsonify(get_profiles())
+
+
+@bp.route('/sql_profiles/<id>.json', methods=['GET'])
+def show_json(id):
+    profile = get_profile(id)
+    if profile is None:
+        return jsonify({'error': True, 'message': "Profile %s not found" % id}), 404
+    return jsonify(profile)
+
+
+@bp.route('/sql_profiles.json', methods=['DELETE'])
+def delete_json():
+    clear_profiles()
+    return jsonify({'error': False})
@@ -280,9 +280,12 @@ def subnav_link_to(text, endpoint, id, with_params, attrs, **kwargs):
 
 
 def page_navigation(paginate):
+    if getattr(paginate, 'keyset', False):
+        # Keyset pages aren't numbered, so only the first page can be linked besides the adjacent pages
+        return paginate.prev_num, None, paginate.next_num, [1]
     current_page = paginate.page
     previous_page = paginate.prev_num
-    next_page = paginate.next_num
+    next_page = getattr(paginate, 'next_keyset', None) or paginate.next_num
     last_page = paginate.pages
     left = max(current_page - 4, 2)
     penultimate_page = last_page - 1
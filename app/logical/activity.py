@@ -0,0 +1,76 @@
+# APP/LOGICAL/ACTIVITY.PY
+
+"""Write-behind tracker for user and server activity, shared between processes through a memory-mapped file."""
+
+# ## PYTHON IMPORTS
+import os
+import mmap
+import time
+import struct
+import threading
+
+# ## PACKAGE IMPORTS
+from config import DATA_DIRECTORY, ACTIVITY_FLUSH_INTERVAL
+from utility.file import create_directory
+from utility.time import datetime_from_epoch
+
+
+# ## GLOBAL VARIABLES
+
+ACTIVITY_TYPES = ['user', 'server']
+
+# One epoch timestamp per activity type
+HEARTBEAT_FORMAT = '<d'
+HEARTBEAT_ITEM_SIZE = struct.calcsize(HEARTBEAT_FORMAT)
+HEARTBEAT_SIZE = HEARTBEAT_ITEM_SIZE * len(ACTIVITY_TYPES)
+HEARTBEAT_FILEPATH = os.path.join(DATA_DIRECTORY, 'activity.dat')
+
+HEARTBEAT = None
+LAST_ACTIVITY = {type: 0.0 for type in ACTIVITY_TYPES}
+LAST_FLUSH = {type: 0.0 for type in ACTIVITY_TYPES}
+ACTIVITY_LOCK = threading.Lock()
+
+
+# ## FUNCTIONS
+
+# #### Main functions
+
+def record_activity(type):
+    """The activity is always kept in memory, but only written out for other processes every flush interval."""
+    current_time = time.time()
+    with ACTIVITY_LOCK:
+        LAST_ACTIVITY[type] = current_time
+        if current_time - LAST_FLUSH[type] < ACTIVITY_FLUSH_INTERVAL:
+            return
+        LAST_FLUSH[type] = current_time
+        _write_heartbeat(type, current_time)
+
+
+def get_activity(type):
+    with ACTIVITY_LOCK:
+        timestamp = max(LAST_ACTIVITY[type], _read_heartbeat(type))
+    return datetime_from_epoch(timestamp) if timestamp > 0.0 else None
+
+
+# #### Private functions
+
+def _get_heartbeat():
+    global HEARTBEAT
+    if HEARTBEAT is None:
+        if not os.path.exists(HEARTBEAT_FILEPATH) or os.path.getsize(HEARTBEAT_FILEPATH) < HEARTBEAT_SIZE:
+            create_directory(HEARTBEAT_FILEPATH)
+            with open(HEARTBEAT_FILEPATH, 'wb') as file:
+                file.write(bytes(HEARTBEAT_SIZE))
+        with open(HEARTBEAT_FILEPATH, 'r+b') as file:
+            HEARTBEAT = mmap.mmap(file.fileno(), HEARTBEAT_SIZE)
+    return HEARTBEAT
+
+
+def _read_heartbeat(type):
+    offset = ACTIVITY_TYPES.index(type) * HEARTBEAT_ITEM_SIZE
+    return struct.unpack_from(HEARTBEAT_FORMAT, _get_heartbeat(), offset)[0]
+
+
+def _write_heartbeat(type, timestamp):
+    offset = ACTIVITY_TYPES.index(type) * HEARTBEAT_ITEM_SIZE
+    struct.pack_into(HEARTBEAT_FORMAT, _get_heartbeat(), offset, timestamp)
@@ -1,51 +1,94 @@
 # APP/LOGICAL/BATCH_LOADER.PY
 
+"""Batch loading of relationships for lists of records, using dict-indexed joins and chunked IN lists."""
+
+# ## EXTERNAL IMPORTS
+from sqlalchemy.orm.attributes import set_committed_value
+
+
+# ## GLOBAL VARIABLES
+
+# Lowest host parameter limit of any SQLite build (versions before 3.32.0)
+SQLITE_MAX_PARAMETERS = 999
+
 
 # ## FUNCTIONS
 
-def selectinload_batch_primary(records, relation, reverse=False):
+# #### Main functions
+
+def selectinload_batch_primary(records, relation):
+    if len(records) == 0:
+        return []
     relation_property = getattr(records[0].__class__, relation).property
     lasttable = relation_property.mapper.class_
-    primaryjoin = relation_property.primaryjoin
-    primaryjoin_left, primaryjoin_right =\
-        (primaryjoin.left, primaryjoin.right)\
-        if not reverse else\
-        (primaryjoin.right, primaryjoin.left)
-    record_id_gen = list(getattr(item, primaryjoin_right.name) for item in records)
-    last_items = lasttable.query.filter(primaryjoin_left.in_(record_id_gen)).all()
+    record_column, last_column = relation_property.local_remote_pairs[0]
+    record_keys = _unique_values(records, record_column.name)
+    last_items = _query_in_chunks(lasttable.query, last_column, record_keys, 'all')
+    last_index = _group_index(last_items, last_column.name)
     for record in records:
-        last_id = getattr(record, primaryjoin_right.name)
-        last_item = next((item for item in last_items if getattr(item, primaryjoin_left.name) == last_id), None)
-        record.__dict__[relation] = last_item
+        _set_relation(record, relation_property, last_index.get(getattr(record, record_column.name), []))
     return last_items
 
 
 def selectinload_batch_secondary(records, relation):
+    if len(records) == 0:
+        return []
     relation_property = getattr(records[0].__class__, relation).property
-    primaryjoin = relation_property.primaryjoin
-    nexttable = primaryjoin.right.table
-    record_id_gen = (getattr(record, primaryjoin.left.name) for record in records)
-    next_items = nexttable.query.filter(primaryjoin.right.in_(record_id_gen)).all2()
     lasttable = relation_property.mapper.class_
-    secondaryjoin = relation_property.secondaryjoin
-    secondary_id_gen = (getattr(item, secondaryjoin.right.name) for item in next_items)
-    last_items = lasttable.query.filter(secondaryjoin.left.in_(secondary_id_gen)).all()
+    record_column, next_record_column = relation_property.synchronize_pairs[0]
+    last_column, next_last_column = relation_property.secondary_synchronize_pairs[0]
+    nexttable = next_record_column.table
+    record_keys = _unique_values(records, record_column.name)
+    next_items = _query_in_chunks(nexttable.query, next_record_column, record_keys, 'all2')
+    last_keys = _unique_values(next_items, next_last_column.name)
+    last_items = _query_in_chunks(lasttable.query, last_column, last_keys, 'all')
+    last_index = {getattr(item, last_column.name): item for item in last_items}
+    next_index = _group_index(next_items, next_record_column.name)
     for record in records:
-        item_id = getattr(record, primaryjoin.left.name)
-        next_item = next((item for item in next_items if getattr(item, primaryjoin.right.name) == item_id), None)
-        if next_item is None:
-            record.__dict__[relation] = None
-            continue
-        last_id = getattr(next_item, secondaryjoin.right.name)
-        last_item = next((item for item in last_items if getattr(item, secondaryjoin.left.name) == last_id))
-        record.__dict__[relation] = last_item
+        next_group = next_index.get(getattr(record, record_column.name), [])
+        record_items = [last_index[getattr(item, next_last_column.name)] for item in next_group
+                        if getattr(item, next_last_column.name) in last_index]
+        _set_relation(record, relation_property, record_items)
     return last_items
 
 
 def selectinload_batch_relations(records, *relations):
+    """Each relation is loaded on the items of the previous one, e.g. ('illust_urls', 'post') or 'illust_urls.post'.
+    Returns the items of the last relation."""
+    relations = [name for relation in relations for name in relation.split('.')]
     for relation in relations:
+        if len(records) == 0:
+            break
         relation_property = getattr(records[0].__class__, relation).property
-        if relation_property.secondaryjoin is not None:
+        if relation_property.secondary is not None:
             records = selectinload_batch_secondary(records, relation)
         else:
             records = selectinload_batch_primary(records, relation)
+    return records
+
+
+# #### Private functions
+
+def _query_in_chunks(query, column, values, method):
+    results = []
+    for i in range(0, len(values), SQLITE_MAX_PARAMETERS):
+        chunk_query = query.filter(column.in_(values[i: i + SQLITE_MAX_PARAMETERS]))
+        results += getattr(chunk_query, method)()
+    return results
+
+
+def _unique_values(items, name):
+    values = (getattr(item, name) for item in items)
+    return list(dict.fromkeys(value for value in values if value is not None))
+
+
+def _group_index(items, name):
+    index = {}
+    for item in items:
+        index.setdefault(getattr(item, name), []).append(item)
+    return index
+
+
+def _set_relation(record, relation_property, items):
+    value = items if relation_property.uselist else (items[0] if len(items) else None)
+    set_committed_value(record, relation_property.key, value)
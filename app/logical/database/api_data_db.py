@@ -1,11 +1,33 @@
 # APP/LOGICAL/DATABASE/API_DATA_DB.PY
 
+# ## PYTHON IMPORTS
+import threading
+from collections import OrderedDict, namedtuple
+
+# ## EXTERNAL IMPORTS
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
 # ## PACKAGE IMPORTS
-from utility.time import get_current_time, days_from_now
+from config import API_DATA_CACHE_TTL, API_DATA_CACHE_SIZE
+from utility.time import get_current_time, days_from_now, seconds_from_now
 
 # ## LOCAL IMPORTS
+from ... import SESSION
 from ...models import ApiData
-from .base_db import add_record, delete_record, commit_session
+from ...models.model_enums import ApiDataType, SiteDescriptor
+from .base_db import commit_session
+
+
+# ## GLOBAL VARIABLES
+
+QUERY_CHUNK_SIZE = 500
+BULK_CHUNK_SIZE = 150
+
+# Detached copy of an API data row, so that cached lookups need neither the session nor decompression
+CachedApiData = namedtuple('CachedApiData', ['id', 'site_id', 'type_id', 'data_id', 'data', 'expires'])
+
+API_DATA_CACHE = OrderedDict()
+API_DATA_CACHE_LOCK = threading.Lock()
 
 
 # ## FUNCTIONS
@@ -13,24 +35,23 @@ from .base_db import add_record, delete_record, commit_session
 # ###### CREATE/UPDATE
 
 def save_api_data(network_data, id_key, site_id, type_id):
-    data_ids = [int(data[id_key]) for data in network_data]
-    cache_data = get_api_data(data_ids, site_id, type_id)
-    for data_item in network_data:
-        data_id = int(data_item[id_key])
-        cache_item = next(filter(lambda x: x.data_id == data_id, cache_data), None)
-        if not cache_item:
-            print("save_api_data - creating cache item:", type_id, data_id)
-            data = {
-                'site_id': site_id,
-                'type_id': type_id,
-                'data_id': data_id,
-            }
-            cache_item = ApiData(**data)
-            add_record(cache_item)
-        else:
-            print("save_api_data - updating cache item:", type_id, data_id, cache_item.id)
-        cache_item.data = data_item
-        cache_item.expires = days_from_now(1)
+    """Inserts or updates all items with one statement per chunk, keyed on (site_id, type_id, data_id)."""
+    if len(network_data) == 0:
+        return
+    expires = days_from_now(1)
+    # Later items with the same ID replace earlier ones, same as updating the record repeatedly would
+    data_index = {int(data_item[id_key]): data_item for data_item in network_data}
+    upsert_params = [{'site_id': site_id, 'type_id': type_id, 'data_id': data_id, 'data': data_item,
+                      'expires': expires}
+                     for (data_id, data_item) in data_index.items()]
+    print("save_api_data - upserting cache items:", type_id, list(data_index.keys()))
+    _invalidate_cached_api_data(data_index.keys(), site_id, type_id)
+    statement = sqlite_insert(ApiData.__table__)
+    statement = statement.on_conflict_do_update(index_elements=['site_id', 'type_id', 'data_id'],
+                                                set_={'data': statement.excluded.data,
+                                                      'expires': statement.excluded.expires})
+    for i in range(0, len(upsert_params), BULK_CHUNK_SIZE):
+        SESSION.execute(statement, upsert_params[i: i + BULK_CHUNK_SIZE])
     commit_session()
 
 
@@ -44,20 +65,21 @@ def delete_expired_api_data():
 # #### Query functions
 
 def get_api_data(data_ids, site, type):
+    """Returns CachedApiData items. The data is shared between lookups, so it should be treated as read-only."""
     current_time = get_current_time()
-    has_deleted = False
+    ret_data, missing_ids = _get_cached_api_data(data_ids, site, type, current_time)
     cache_data = []
-    for i in range(0, len(data_ids), 100):
-        sublist = data_ids[i: i + 100]
+    for i in range(0, len(missing_ids), QUERY_CHUNK_SIZE):
+        sublist = missing_ids[i: i + QUERY_CHUNK_SIZE]
         cache_data += _get_api_data(sublist, site, type)
-    ret_data = []
+    expired_ids = []
     for cache in cache_data:
         if cache.expires < current_time:
-            delete_record(cache)
-            has_deleted = True
+            expired_ids.append(cache.id)
         else:
-            ret_data.append(cache)
-    if has_deleted:
+            ret_data.append(_set_cached_api_data(cache))
+    if len(expired_ids):
+        _delete_api_data_by_ids(expired_ids)
         commit_session()
     return ret_data
 
@@ -78,6 +100,51 @@ def expired_api_data_count():
 
 # #### Private functions
 
+def _cache_key(data_id, site, type_name):
+    site_id = SiteDescriptor.to_id(site) if isinstance(site, str) else site
+    type_id = ApiDataType.to_id(type_name) if isinstance(type_name, str) else type_name
+    return (site_id, type_id, int(data_id))
+
+
+def _get_cached_api_data(data_ids, site, type_name, current_time):
+    found_data = []
+    missing_ids = []
+    with API_DATA_CACHE_LOCK:
+        for data_id in data_ids:
+            key = _cache_key(data_id, site, type_name)
+            entry = API_DATA_CACHE.get(key)
+            if entry is None or entry[1] <= current_time:
+                missing_ids.append(data_id)
+                continue
+            API_DATA_CACHE.move_to_end(key)
+            found_data.append(entry[0])
+    return found_data, missing_ids
+
+
+def _set_cached_api_data(cache):
+    item = CachedApiData(cache.id, cache.site_id, cache.type_id, cache.data_id, cache.data, cache.expires)
+    key = (item.site_id, item.type_id, item.data_id)
+    valid_until = min(item.expires, seconds_from_now(API_DATA_CACHE_TTL))
+    with API_DATA_CACHE_LOCK:
+        API_DATA_CACHE[key] = (item, valid_until)
+        API_DATA_CACHE.move_to_end(key)
+        while len(API_DATA_CACHE) > API_DATA_CACHE_SIZE:
+            API_DATA_CACHE.popitem(last=False)
+    return item
+
+
+def _invalidate_cached_api_data(data_ids, site, type_name):
+    with API_DATA_CACHE_LOCK:
+        for data_id in data_ids:
+            API_DATA_CACHE.pop(_cache_key(data_id, site, type_name), None)
+
+
+def _delete_api_data_by_ids(ids):
+    for i in range(0, len(ids), QUERY_CHUNK_SIZE):
+        sublist = ids[i: i + QUERY_CHUNK_SIZE]
+        ApiData.query.filter(ApiData.id.in_(sublist)).delete(synchronize_session=False)
+
+
 def _get_api_data(data_ids, site, type_name):
     q = ApiData.query
     if isinstance(site, int):
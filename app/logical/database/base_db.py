@@ -6,7 +6,7 @@ import datetime
 
 # ## EXTERNAL IMPORTS
 import sqlalchemy
-from sqlalchemy import func
+from sqlalchemy import func, select, distinct, exists, text, table, column
 
 # ## PACKAGE IMPORTS
 from utility.time import process_utc_timestring, get_current_time
@@ -17,6 +17,21 @@ from ... import SESSION
 from ..logger import log_error
 
 
+# ## GLOBAL VARIABLES
+
+CREATE_DUPLICATE_MAP = """
+CREATE TEMPORARY TABLE duplicate_map (
+    old_id INTEGER NOT NULL PRIMARY KEY,
+    new_id INTEGER NOT NULL
+)
+"""
+DROP_DUPLICATE_MAP = "DROP TABLE IF EXISTS temp.duplicate_map"
+
+DUPLICATE_MAP = table('duplicate_map', column('old_id'), column('new_id'))
+
+PRUNE_CANDIDATE = table('prune_candidate', column('table_name'), column('item_id'))
+
+
 # ## FUNCTIONS
 
 def safe_db_execute(func_name, module_name, scope_vars=None, **kwargs):
@@ -237,54 +252,83 @@ def will_update_record(record, data, columns):
 
 
 def remove_duplicate_items(check_model, check_column, foreign_keys):
-    duplicates = check_model.query.group_by(check_column)\
-                            .having(func.count(check_column) > 1)\
-                            .with_entities(check_column)\
-                            .all()
-    total = len(duplicates)
-    if total == 0:
-        return total
-    for duplicate in duplicates:
-        dup_items = check_model.query.filter(check_column == duplicate[0]).all()
-        update_id = dup_items[0].id
-        # Remove duplicates in M2M before updating, otherwise it could violate the unique constraint
-        for foreign_key in foreign_keys:
-            if not foreign_key[0]._secondary_table:
-                continue
-            attach_model, attach_column, primary_id = foreign_key
-            attach_id = attach_column.name
-            primary_column = getattr(attach_model, primary_id)
-            m2m_items = attach_model.query.filter(attach_column.in_(item.id for item in dup_items)).all()
-            seen_primary_ids = set()
-            for item in m2m_items:
-                if item[primary_id] in seen_primary_ids:
-                    attach_model.query.filter(primary_column == item[primary_id],
-                                              attach_column == item[attach_id])\
-                                      .delete()
-                    flush_session()
+    """
+    Merges all items with the same check column value into the one with the lowest ID, with a fixed number of
+    set-based statements per foreign key. Returns the number of duplicated values.
+    """
+    # The temporary table belongs to the connection, which may still have it from a run that was interrupted
+    SESSION.execute(text(DROP_DUPLICATE_MAP))
+    SESSION.execute(text(CREATE_DUPLICATE_MAP))
+    try:
+        SESSION.execute(DUPLICATE_MAP.insert().from_select(['old_id', 'new_id'],
+                                                           _duplicate_map_select(check_model, check_column)))
+        total = SESSION.execute(select(func.count(distinct(DUPLICATE_MAP.c.new_id)))).scalar()
+        if total > 0:
+            old_ids = select(DUPLICATE_MAP.c.old_id)
+            for foreign_key in foreign_keys:
+                attach_table = _get_table(foreign_key[0])
+                attach_column = attach_table.c[foreign_key[1].name]
+                if attach_table._secondary_table:
+                    # Copy the M2M rows to the kept item first, skipping ones it already has, so that the
+                    # composite primary key is never violated
+                    primary_column = attach_table.c[foreign_key[2]]
+                    copy_rows = select(primary_column, DUPLICATE_MAP.c.new_id)\
+                        .join(DUPLICATE_MAP, attach_column == DUPLICATE_MAP.c.old_id)
+                    SESSION.execute(attach_table.insert().prefix_with('OR IGNORE')
+                                                .from_select([primary_column.name, attach_column.name], copy_rows))
+                    SESSION.execute(attach_table.delete().where(attach_column.in_(old_ids)))
                 else:
-                    seen_primary_ids.add(item[primary_id])
-        # Update tables to the first item found
-        for foreign_key in foreign_keys:
-            attach_model, attach_column, *_ = foreign_key
-            for item in dup_items[1:]:
-                attach_model.query.filter(attach_column == item.id).update({attach_column.name: update_id})
-                flush_session()
-                delete_record(item)
-                flush_session()
-    commit_session()
+                    new_id = select(DUPLICATE_MAP.c.new_id).where(DUPLICATE_MAP.c.old_id == attach_column)\
+                        .scalar_subquery()
+                    SESSION.execute(attach_table.update().where(attach_column.in_(old_ids))
+                                                .values({attach_column.name: new_id}))
+            check_table = _get_table(check_model)
+            SESSION.execute(check_table.delete().where(check_table.c.id.in_(old_ids)))
+        SESSION.execute(text(DROP_DUPLICATE_MAP))
+        commit_session()
+    except Exception:
+        SESSION.rollback()
+        SESSION.execute(text(DROP_DUPLICATE_MAP))
+        raise
     return total
 
 
-def prune_unused_items(model, union_clause):
-    delete_count = model.query.filter(model.id.not_in(union_clause))\
-                              .delete(synchronize_session=False)
+def prune_unused_items(model, foreign_keys):
+    """
+    Only the items queued in prune_candidate are checked, which triggers add to when an item is created or when a
+    reference to it is removed, so that the cost follows the churn since the last run instead of the table sizes.
+    """
+    table_name = _get_table(model).name
+    is_candidate = PRUNE_CANDIDATE.c.table_name == table_name
+    query = model.query.filter(model.id.in_(select(PRUNE_CANDIDATE.c.item_id).where(is_candidate)))
+    for foreign_key in foreign_keys:
+        query = query.filter(~exists().where(foreign_key[1] == model.id))
+    delete_count = query.delete(synchronize_session=False)
+    # The items that are still referenced get queued again once they lose a reference
+    SESSION.execute(PRUNE_CANDIDATE.delete().where(is_candidate))
     commit_session()
     return delete_count
 
 
 # #### Private functions
 
+def _duplicate_map_select(check_model, check_column):
+    """Every duplicate item paired with the ID of the item that it gets merged into."""
+    # Items with a NULL value are never duplicates of each other
+    keep = check_model.query.with_entities(check_column.label('value'), func.min(check_model.id).label('keep_id'))\
+                            .filter(check_column.is_not(None))\
+                            .group_by(check_column)\
+                            .having(func.count(check_model.id) > 1)\
+                            .subquery()
+    return select(check_model.id, keep.c.keep_id)\
+        .join(keep, check_column == keep.c.value)\
+        .where(check_model.id != keep.c.keep_id)
+
+
+def _get_table(model):
+    return model if isinstance(model, sqlalchemy.Table) else model.__table__
+
+
 def _handle_db_exception(error):
     if isinstance(error, sqlalchemy.exc.OperationalError) and error.code == 'e3q8':
         print("!!!Sleeping for DB lock!!!")
@@ -1,8 +1,20 @@
 # APP/LOGICAL/DATABASE/IMAGE_HASH_DB.PY
 
+# ## PYTHON IMPORTS
+import time
+
+# ## EXTERNAL IMPORTS
+from sqlalchemy import text
+
+# ## PACKAGE IMPORTS
+from config import IMAGE_HASH_CHANGE_RETENTION
+
 # ## LOCAL IMPORTS
-from ...models import ImageHash
-from .base_db import set_column_attributes, save_record, flush_session
+from ... import SESSION
+from ...models import ImageHash, ImageHashBand
+from ...models.image_hash import hash_bands
+from ..similarity_index import add_image_hash_to_index, remove_post_from_index
+from .base_db import set_column_attributes, save_record, flush_session, commit_or_flush
 
 
 # ## GLOBAL VARIABLES
@@ -17,19 +29,41 @@ NULL_WRITABLE_ATTRIBUTES = ['post_id', 'ratio', 'hash']
 
 def create_image_hash_from_parameters(createparams, commit=True):
     image_hash = ImageHash()
-    return set_image_hash_from_parameters(image_hash, createparams, 'created', commit)
+    set_image_hash_from_parameters(image_hash, createparams, 'created', commit)
+    add_image_hash_to_index(image_hash)
+    return image_hash
 
 
 # #### Set
 
 def set_image_hash_from_parameters(image_hash, setparams, action, commit):
     if set_column_attributes(image_hash, ANY_WRITABLE_ATTRIBUTES, NULL_WRITABLE_ATTRIBUTES, setparams):
+        image_hash.bands = [ImageHashBand(band=band, value=value)
+                            for (band, value) in enumerate(hash_bands(image_hash.hash))]
         save_record(image_hash, action, commit=commit)
     return image_hash
 
 
+# #### Query
+
+def get_all_image_hash_similarity_data():
+    return ImageHash.query.with_entities(ImageHash.post_id, ImageHash.ratio, ImageHash.hash)\
+                          .order_by(ImageHash.ratio.asc(), ImageHash.id.asc())\
+                          .all()
+
+
 # #### Delete
 
 def delete_image_hash_by_post_id(post_id):
+    image_hash_ids = ImageHash.query.filter(ImageHash.post_id == post_id).with_entities(ImageHash.id)
+    ImageHashBand.query.filter(ImageHashBand.image_hash_id.in_(image_hash_ids)).delete(synchronize_session=False)
     ImageHash.query.filter(ImageHash.post_id == post_id).delete()
     flush_session()
+    remove_post_from_index(post_id)
+
+
+def delete_expired_image_hash_changes(commit=True):
+    expires = time.time() - IMAGE_HASH_CHANGE_RETENTION
+    result = SESSION.execute(text("DELETE FROM image_hash_change WHERE created < :expires"), {'expires': expires})
+    commit_or_flush(commit)
+    return result.rowcount
@@ -1,17 +1,21 @@
 # APP/LOGICAL/DATABASE/JOBS_DB.PY
 
+# ## PYTHON IMPORTS
+import time
+
 # ## EXTERNAL IMPORTS
-from sqlalchemy import inspect
+from sqlalchemy import inspect, func
 
 # ## LOCAL IMPORTS
 from ... import DB
-from ...models.jobs import JobInfo, JobEnable, JobLock, JobManual, JobTime, JobStatus
+from ...models.jobs import JobInfo, JobEnable, JobLock, JobManual, JobTime, JobStatus, MediaJob
 from .base_db import add_record, delete_record, flush_session
 
 
 # ## GLOBAL VARIABLES
 
-JOB_ITEMS = {model._model_name(): model for model in [JobInfo, JobEnable, JobManual, JobLock, JobTime, JobStatus]}
+JOB_MODELS = [JobInfo, JobEnable, JobManual, JobLock, JobTime, JobStatus, MediaJob]
+JOB_ITEMS = {model._model_name(): model for model in JOB_MODELS}
 
 JOB_ITEMS_CREATE = {
     'job_enable': lambda x, v: JobEnable(id=x, enabled=v),
@@ -40,6 +44,13 @@ def create_job_item(jobtype, id, val):
     return item
 
 
+def create_media_jobs(kind, post_ids):
+    current_time = time.time()
+    for post_id in post_ids:
+        add_record(MediaJob(kind=kind, post_id=post_id, status='pending', attempts=0, created=current_time))
+    flush_session()
+
+
 # #### Update
 
 def update_job_item(item, value):
@@ -60,6 +71,20 @@ def update_job_status(id, data):
     flush_session()
 
 
+def update_media_job_status(media_job, status, error=None, attempts=None):
+    media_job.status = status
+    media_job.error = error
+    if attempts is not None:
+        media_job.attempts = attempts
+    flush_session()
+
+
+def reset_running_media_jobs():
+    """Jobs left running by a previous server process will never finish, so they go back into the queue."""
+    MediaJob.query.filter(MediaJob.status == 'running').update({'status': 'pending'})
+    flush_session()
+
+
 # #### Delete
 
 def delete_job_item(item):
@@ -89,6 +114,23 @@ def is_any_job_manual():
     return JobManual.query.filter(JobManual.manual.is_(True)).first() is not None
 
 
+def get_pending_media_jobs(kind, limit):
+    return MediaJob.query.filter(MediaJob.kind == kind, MediaJob.status == 'pending')\
+                         .order_by(MediaJob.id.asc())\
+                         .limit(limit)\
+                         .all()
+
+
+def get_media_job_counts():
+    counts = MediaJob.query.with_entities(MediaJob.kind, MediaJob.status, func.count(MediaJob.id))\
+                           .group_by(MediaJob.kind, MediaJob.status)\
+                           .all()
+    data = {}
+    for (kind, status, count) in counts:
+        data.setdefault(kind, {})[status] = count
+    return data
+
+
 def get_job_status_data(id):
     if id is None:
         return None
@@ -1,14 +1,12 @@
 # APP/LOGICAL/DATABASE/SERVER_INFO_DB.PY
 
-# ## PYTHON IMPORTS
-import datetime
-
 # ## PACKAGE IMPORTS
-from utility.time import get_current_time, process_utc_timestring, minutes_ago
+from utility.time import get_current_time, minutes_ago
 from utility.data import eval_bool_string
 
 # ## LOCAL IMPORTS
 from ...models import ServerInfo
+from ..activity import ACTIVITY_TYPES, record_activity, get_activity
 from .base_db import add_record, commit_session, flush_session
 from .jobs_db import is_any_job_locked, is_any_job_manual
 
@@ -18,8 +16,6 @@ from .jobs_db import is_any_job_locked, is_any_job_manual
 INITIALIZED = False
 
 FIELD_UPDATERS = {
-    'server_last_activity': lambda *args: datetime.datetime.isoformat(get_current_time()),
-    'user_last_activity': lambda *args: datetime.datetime.isoformat(get_current_time()),
     'twitter_next_wait': lambda *args: str(get_current_time().timestamp() + (args[0] if len(args) else 0)),
     'pixiv_next_wait': lambda *args: str(get_current_time().timestamp() + (args[0] if len(args) else 0)),
     'subscriptions_ready': lambda *args: str(args[0] if len(args) else False),
@@ -75,24 +71,22 @@ def get_all_server_fields():
 
 # #### Misc
 
-@checkinit
 def get_last_activity(type):
-    field = type + '_last_activity'
-    last_activity = query_field(field)
-    return process_utc_timestring(last_activity) if last_activity is not None else None
+    return get_activity(type)
 
 
-@checkinit
 def update_last_activity(type):
-    field = type + '_last_activity'
-    value = FIELD_UPDATERS[field]()
-    update_field(field, value)
+    """Activity is tracked outside of the database, so that it doesn't cost a write transaction."""
+    record_activity(type)
 
 
 def server_is_busy():
+    user_activity = get_last_activity('user')
+    server_activity = get_last_activity('server')
     return any((
-        get_last_activity('user') > minutes_ago(15),
-        (get_last_activity('server') > minutes_ago(5)) and (is_any_job_locked() or is_any_job_manual()),
+        user_activity is not None and user_activity > minutes_ago(15),
+        (server_activity is not None and server_activity > minutes_ago(5))
+        and (is_any_job_locked() or is_any_job_manual()),
     ))
 
 
@@ -141,5 +135,7 @@ def initialize_server_fields():
             create_field(field, value)
         else:
             update_field(field, value)
+    for type in ACTIVITY_TYPES:
+        update_last_activity(type)
     commit_session()
     INITIALIZED = True
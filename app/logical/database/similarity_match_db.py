@@ -1,9 +1,11 @@
 # APP/LOGICAL/DATABASE/SIMILARITY_MATCH_DB.PY
 
 # ## EXTERNAL IMPORTS
-from sqlalchemy import or_
+from sqlalchemy import or_, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 # ## LOCAL IMPORTS
+from ... import SESSION
 from ...models import SimilarityMatch
 from .base_db import set_column_attributes, save_record, delete_record, commit_or_flush
 
@@ -12,6 +14,8 @@ from .base_db import set_column_attributes, save_record, delete_record, commit_o
 ANY_WRITABLE_ATTRIBUTES = ['score']
 NULL_WRITABLE_ATTRIBUTES = ['forward_id', 'reverse_id']
 
+BULK_CHUNK_SIZE = 300
+
 
 # ## FUNCTIONS
 
@@ -38,6 +42,22 @@ def set_similarity_match_from_parameters(similarity_match, setparams, action, co
     return similarity_match
 
 
+# #### Bulk
+
+def upsert_similarity_matches(match_params, commit=True):
+    """Inserts or updates the score of a list of {forward_id, reverse_id, score}, with forward_id < reverse_id."""
+    statement = sqlite_insert(SimilarityMatch.__table__)
+    statement = statement.on_conflict_do_update(index_elements=['forward_id', 'reverse_id'],
+                                                set_={'score': statement.excluded.score})
+    for i in range(0, len(match_params), BULK_CHUNK_SIZE):
+        SESSION.execute(statement, match_params[i: i + BULK_CHUNK_SIZE])
+    commit_or_flush(commit)
+
+
+def get_all_similarity_match_keys():
+    return set(SimilarityMatch.query.with_entities(SimilarityMatch.forward_id, SimilarityMatch.reverse_id).all())
+
+
 # #### Delete
 
 def delete_similarity_match(similarity_match, commit=False):
@@ -56,3 +76,12 @@ def delete_similarity_matches_by_post_id(post_id, commit=False):
                                      SimilarityMatch.reverse_id == post_id))\
                          .delete()
     commit_or_flush(commit)
+
+
+def delete_similarity_matches_by_keys(keys, commit=False):
+    keys = list(keys)
+    for i in range(0, len(keys), BULK_CHUNK_SIZE):
+        SimilarityMatch.query.filter(tuple_(SimilarityMatch.forward_id, SimilarityMatch.reverse_id)
+                                     .in_(keys[i: i + BULK_CHUNK_SIZE]))\
+                             .delete(synchronize_session=False)
+    commit_or_flush(commit)
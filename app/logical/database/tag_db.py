@@ -1,19 +1,27 @@
 # APP/LOGICAL/DATABASE/TAG_DB.PY
 
+# ## PYTHON IMPORTS
+import time
+from fnmatch import fnmatchcase
+
 # ## EXTERNAL IMPORTS
-from sqlalchemy import union_all
+from sqlalchemy import or_, text
+
+# ## PACKAGE IMPORTS
+from config import TAG_CHANGE_RETENTION
 
 # ## LOCAL IMPORTS
-from ...models import SiteTag, UserTag, IllustTags, PostTags
-from .base_db import set_column_attributes, save_record, prune_unused_items
+from ... import SESSION
+from ...models import Tag, SiteTag, UserTag, IllustTags, PostTags
+from .base_db import set_column_attributes, save_record, prune_unused_items, commit_or_flush
 
 
 # ## GLOBAL VARIABLES
 
-TAG_UNION_CLAUSE = union_all(
-    IllustTags.query.with_entities(IllustTags.tag_id),
-    PostTags.query.with_entities(PostTags.tag_id),
-)
+TAG_FOREIGN_KEYS = [
+    (IllustTags, IllustTags.tag_id, 'illust_id'),
+    (PostTags, PostTags.tag_id, 'post_id'),
+]
 
 ANY_WRITABLE_ATTRIBUTES = ['name']
 NULL_WRITABLE_ATTRIBUTES = []
@@ -41,8 +49,51 @@ def set_tag_from_parameters(tag, setparams, action, commit):
     return tag
 
 
+# #### Query
+
+def get_tag_ids_by_terms(terms):
+    """Returns a dict of term -> tag IDs, where terms containing * are matched as globs against the tag name."""
+    names = [term for term in terms if '*' not in term]
+    patterns = [term for term in terms if '*' in term]
+    clauses = [Tag.name.op('GLOB')(pattern) for pattern in patterns]
+    if len(names):
+        clauses.append(Tag.name.in_(names))
+    if len(clauses) == 0:
+        return {}
+    rows = Tag.query.with_entities(Tag.id, Tag.name).filter(or_(*clauses)).all()
+    term_ids = {term: [] for term in terms}
+    for (id, name) in rows:
+        if name in term_ids:
+            term_ids[name].append(id)
+        for pattern in patterns:
+            if fnmatchcase(name, pattern):
+                term_ids[pattern].append(id)
+    return term_ids
+
+
+def get_tag_association_rows(table_name, item_column):
+    return SESSION.execute(text("SELECT tag_id, %s FROM %s" % (item_column, table_name)))
+
+
+def get_tag_change_max_id():
+    return SESSION.execute(text("SELECT MAX(id) FROM tag_change")).scalar() or 0
+
+
+def get_tag_change_rows(table_name, min_id, limit):
+    statement = text("SELECT id, item_id, tag_id, action FROM tag_change WHERE id > :min_id AND table_name = :table"
+                     " ORDER BY id ASC LIMIT :limit")
+    return SESSION.execute(statement, {'min_id': min_id, 'table': table_name, 'limit': limit}).fetchall()
+
+
 # #### Delete
 
 def prune_unused_tags():
     # Only site tags are automatically pruneable. User tags must be removed manually.
-    return prune_unused_items(SiteTag, TAG_UNION_CLAUSE)
+    return prune_unused_items(SiteTag, TAG_FOREIGN_KEYS)
+
+
+def delete_expired_tag_changes(commit=True):
+    expires = time.time() - TAG_CHANGE_RETENTION
+    result = SESSION.execute(text("DELETE FROM tag_change WHERE created < :expires"), {'expires': expires})
+    commit_or_flush(commit)
+    return result.rowcount
@@ -0,0 +1,130 @@
+# APP/LOGICAL/ERROR_LOG.PY
+
+"""Append-only JSON-lines logs, which rotate to numbered segments once they grow past ERROR_LOG_MAX_SIZE."""
+
+# ## PYTHON IMPORTS
+import os
+import time
+import json
+
+# ## PACKAGE IMPORTS
+from config import DATA_DIRECTORY, ERROR_LOG_MAX_SIZE, ERROR_LOG_SEGMENTS
+from utility.data import encode_json
+from utility.file import create_directory
+
+
+# ## GLOBAL VARIABLES
+
+# A rotation lock that is older than this was left behind by a process that died while rotating
+STALE_LOCK_SECONDS = 60
+
+# Lines are counted a block at a time, so that counting doesn't load whole segments into memory
+COUNT_BLOCK_SIZE = 64 * 1024
+
+
+# ## CLASSES
+
+class ErrorLog():
+    """
+    Each entry is appended with a single unbuffered write, which the OS keeps whole even when several threads or
+    processes are writing at once, so that writers need no lock. Only rotation takes a lock file.
+    """
+    def __init__(self, name):
+        self.filepath = os.path.join(DATA_DIRECTORY, name + '.jsonl')
+        self.lockpath = self.filepath + '.lock'
+
+    @property
+    def segment_filepaths(self):
+        """Newest first, with the current segment at index 0."""
+        root, ext = os.path.splitext(self.filepath)
+        return [self.filepath] + ['%s.%d%s' % (root, i, ext) for i in range(1, ERROR_LOG_SEGMENTS + 1)]
+
+    def append(self, entry):
+        data = (encode_json(entry) + '\n').encode('utf-8')
+        create_directory(self.filepath)
+        fd = os.open(self.filepath, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size > ERROR_LOG_MAX_SIZE:
+            self.rotate()
+
+    def rotate(self):
+        if not self._acquire_rotate_lock():
+            return
+        try:
+            if not os.path.exists(self.filepath) or os.path.getsize(self.filepath) <= ERROR_LOG_MAX_SIZE:
+                # Another process already rotated it
+                return
+            filepaths = self.segment_filepaths
+            for (newer, older) in reversed(list(zip(filepaths, filepaths[1:]))):
+                if os.path.exists(newer):
+                    os.replace(newer, older)
+        except OSError:
+            # Windows won't rename a file that another process has open, so try again on a later append
+            pass
+        finally:
+            os.remove(self.lockpath)
+
+    def count(self):
+        total = 0
+        for filepath in self.segment_filepaths:
+            if os.path.exists(filepath):
+                with open(filepath, 'rb') as file:
+                    for block in iter(lambda: file.read(COUNT_BLOCK_SIZE), b''):
+                        total += block.count(b'\n')
+        return total
+
+    def page(self, page, per_page):
+        """Returns the entries for a page, newest first, reading only as many segments as the page reaches."""
+        if page < 1 or per_page < 1:
+            return []
+        offset = (page - 1) * per_page
+        entries = []
+        for filepath in self.segment_filepaths:
+            if not os.path.exists(filepath):
+                continue
+            with open(filepath, 'rb') as file:
+                lines = file.read().splitlines()
+            if offset >= len(lines):
+                offset -= len(lines)
+                continue
+            for line in reversed(lines[:len(lines) - offset]):
+                entries.append(_decode_line(line))
+                if len(entries) == per_page:
+                    return entries
+            offset = 0
+        return entries
+
+    def clear(self):
+        for filepath in self.segment_filepaths:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+    # ## Private
+
+    def _acquire_rotate_lock(self):
+        try:
+            os.close(os.open(self.lockpath, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(self.lockpath) > STALE_LOCK_SECONDS:
+                    os.remove(self.lockpath)
+            except OSError:
+                pass
+            return False
+
+
+# ## FUNCTIONS
+
+# #### Private functions
+
+def _decode_line(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        # The tail of a write that was cut off by a crash
+        return {'message': line.decode('utf-8', 'replace'), 'corrupt': True}
@@ -0,0 +1,94 @@
+# APP/LOGICAL/FULL_TEXT.PY
+
+"""
+Full-text search over the FTS5 indexes created in app/models/raw_schema.py, plus the REGEXP function.
+:NOTE: The indexes are kept in sync by triggers, which are lost whenever a migration recreates the base table.
+"""
+
+# ## PYTHON IMPORTS
+import re
+import sqlite3
+import functools
+
+# ## EXTERNAL IMPORTS
+from sqlalchemy import table, column, select
+
+
+# ## GLOBAL VARIABLES
+
+# Base table name -> indexed text columns
+FULL_TEXT_INDEXES = {
+    'description': ['body'],
+    'tag': ['name'],
+    'label': ['name'],
+    'notation': ['body'],
+}
+
+# The trigram tokenizer matches substrings, which also works for text without spaces (e.g. Japanese).
+FULL_TEXT_TOKENIZER = 'trigram' if sqlite3.sqlite_version_info >= (3, 34, 0) else 'unicode61 remove_diacritics 2'
+
+# Trigrams can't match any shorter terms, so those are matched with LIKE instead
+MIN_MATCH_LENGTH = 3 if FULL_TEXT_TOKENIZER == 'trigram' else 1
+
+REGEX_CACHE_SIZE = 256
+
+
+# ## FUNCTIONS
+
+# #### Helper functions
+
+def has_full_text_index(table_name, columnname):
+    return columnname in FULL_TEXT_INDEXES.get(table_name, [])
+
+
+def full_text_table_name(table_name):
+    return table_name + '_fts'
+
+
+def full_text_query(terms):
+    """Each term must be present. Terms are quoted, except for a trailing * for prefix search."""
+    match_terms = []
+    for term in terms:
+        prefix = term.endswith('*') and len(term) > 1
+        term = term.rstrip('*') if prefix else term
+        match_terms.append('"%s"' % term.replace('"', '""') + ('*' if prefix else ""))
+    return ' '.join(match_terms)
+
+
+def like_pattern(term):
+    return '%' + re.sub(r'([\x01%_])', '\x01\\1', term.rstrip('*')) + '%'
+
+
+def regexp(pattern, value):
+    """Replacement for the REGEXP function SQLAlchemy registers, which recompiles the pattern for each row."""
+    if pattern is None or value is None:
+        return None
+    return _compile_regex(pattern).search(value) is not None
+
+
+# #### Query functions
+
+def full_text_match_subquery(table_name, columnname, value):
+    """
+    Whitespace separates the terms. Terms shorter than MIN_MATCH_LENGTH get a substring scan instead.
+    Returns None when there are no terms, since an empty MATCH is a syntax error.
+    """
+    terms = value.split()
+    if len(terms) == 0:
+        return None
+    fts_table = table(full_text_table_name(table_name), column('rowid'), column(columnname))
+    match_terms = [term for term in terms if len(term.rstrip('*')) >= MIN_MATCH_LENGTH]
+    like_terms = [term for term in terms if term not in match_terms]
+    query = select(fts_table.c.rowid)
+    if len(match_terms):
+        query = query.where(fts_table.c[columnname].op('MATCH')(full_text_query(match_terms)))
+    for term in like_terms:
+        query = query.where(fts_table.c[columnname].like(like_pattern(term), escape='\x01'))
+    return query
+
+
+# #### Private functions
+
+@functools.lru_cache(maxsize=REGEX_CACHE_SIZE)
+def _compile_regex(pattern):
+    return re.compile(pattern)
@@ -1,46 +1,48 @@
 # APP/LOGICAL/LOGGER.PY
 
 # ## PYTHON IMPORTS
-import os
 import sys
 import time
 import traceback
 
 # ## PACKAGE IMPORTS
-from config import DATA_DIRECTORY
-from utility.file import load_default, put_get_json
 from utility.uprint import print_error
 from utility.data import merge_dicts
 
+# ## LOCAL IMPORTS
+from .error_log import ErrorLog
+
 
 # ## GLOBAL VARIABLES
 
-ERROR_LOG_FILE = os.path.join(DATA_DIRECTORY, 'error_log.json')
-NETWORK_ERROR_LOG_FILE = os.path.join(DATA_DIRECTORY, 'network_error_log.json')
+ERROR_LOG = ErrorLog('error_log')
+NETWORK_ERROR_LOG = ErrorLog('network_error_log')
+
+ERROR_LOGS = {
+    'error': ERROR_LOG,
+    'network': NETWORK_ERROR_LOG,
+}
 
 
 # ## FUNCTIONS
 
 def log_error(module, message):
-    all_errors = load_default(ERROR_LOG_FILE, [])
     error = get_traceback()
-    all_errors.append({
+    ERROR_LOG.append({
         'module': module,
         'message': message,
         'traceback': error,
         'time': time.ctime(),
     })
-    put_get_json(ERROR_LOG_FILE, 'w', all_errors)
     print_error('\n', module, '\n', message, '\n', '\n'.join(error), '\n')
 
 
 def log_network_error(module, response):
-    all_errors = load_default(NETWORK_ERROR_LOG_FILE, [])
     try:
         content = response.json()
     except Exception:
         content = response.text
-    all_errors.append({
+    NETWORK_ERROR_LOG.append({
         'module': module,
         'url': str(response.url),
         'status_code': response.status_code,
@@ -48,7 +50,6 @@ def log_network_error(module, response):
         'content': content,
         'time': time.ctime(),
     })
-    put_get_json(NETWORK_ERROR_LOG_FILE, 'w', all_errors)
 
 
 def handle_error_message(error, retdata=None):
@@ -4,6 +4,7 @@
 import cv2
 import numpy
 import ffmpeg
+import psutil
 import filetype
 from PIL import Image
 from io import BytesIO
@@ -11,7 +12,7 @@ from io import BytesIO
 # ## PACKAGE IMPORTS
 from config import PREVIEW_DIMENSIONS, SAMPLE_DIMENSIONS, MP4_SKIP_FRAMES, MP4_MIN_FRAMES,\
     WEBP_QUALITY, WEBP_LOOPS
-from utility.file import create_directory, put_get_raw
+from utility.file import create_directory, put_get_raw, replace_file, delete_file
 from utility.data import get_buffer_checksum
 
 
@@ -75,8 +76,9 @@ def get_video_info(file_path):
 
 
 def load_image(buffer):
+    """The buffer can also be a file path, in which case the image data is read from disk as needed."""
     try:
-        file_imgdata = BytesIO(buffer)
+        file_imgdata = BytesIO(buffer) if not isinstance(buffer, str) else buffer
         image = Image.open(file_imgdata)
     except Exception as e:
         return "Error processing image data: %s" % repr(e)
@@ -116,6 +118,14 @@ def create_data(buffer, file_path):
         return "Error creating data: %s" % repr(e)
 
 
+def create_data_from_file(source_path, file_path, keep=False):
+    print("Saving data:", file_path)
+    try:
+        replace_file(source_path, file_path, keep=keep)
+    except Exception as e:
+        return "Error creating data: %s" % repr(e)
+
+
 def create_video_screenshot(file_path, save_path):
     print("Saving video screenshot:", save_path)
     try:
@@ -125,37 +135,38 @@ def create_video_screenshot(file_path, save_path):
 
 
 def convert_mp4_to_webp(file_path, save_path):
+    """Frames are piped to the encoder one at a time, so memory stays bounded regardless of the video length."""
     print("Opening ->", file_path)
     video_capture = cv2.VideoCapture(file_path)
     frame_rate = video_capture.get(cv2.CAP_PROP_FPS)
     frame_count = video_capture.get(cv2.CAP_PROP_FRAME_COUNT)
     skip_frames = MP4_SKIP_FRAMES if frame_count > MP4_MIN_FRAMES else 1
-    duration = int(MILLISECONDS_PER_SECOND / (frame_rate / skip_frames))  # milliseconds
-    frame_num = 0
-    frames = []
-    print("Loading frames")
-    while True:
-        if frame_num % 100 == 0:
-            print("Processing frames: %d - %d / %d" % (frame_num + 1, min(frame_num + 100, frame_count), frame_count))
-        if (frame_num % skip_frames) == 0:
-            still_reading, image_array = video_capture.read()
-            if still_reading:
-                # Numbers come in as BGR, so flip them around to RGB
-                flip_image_array = numpy.flip(image_array, 2)
-                img = Image.fromarray(flip_image_array)
-                if img.width > PREVIEW_DIMENSIONS[0] or img.height > PREVIEW_DIMENSIONS[1]:
-                    img.thumbnail(PREVIEW_DIMENSIONS)
-                frames.append(img)
-        else:
-            still_reading = video_capture.grab()
-        if not still_reading:
-            video_capture.release()
-            break
-        frame_num += 1
-    print("Saving to WEBP ->", save_path)
-    create_directory(save_path)
-    frames[0].save(save_path, 'webp', append_images=frames[1:], save_all=True, duration=duration, loop=WEBP_LOOPS,
-                   minimize_size=True, lossless=False, quality=WEBP_QUALITY)
+    processes = [psutil.Process()]
+    peak_memory = _get_memory_usage(processes)
+    encoder = None
+    try:
+        for img in _read_video_frames(video_capture, frame_count, skip_frames):
+            if encoder is None:
+                print("Streaming to WEBP ->", save_path)
+                create_directory(save_path)
+                encoder = _open_webp_encoder(save_path, img.size, frame_rate / skip_frames)
+                processes.append(psutil.Process(encoder.pid))
+            encoder.stdin.write(img.tobytes())
+            peak_memory = max(peak_memory, _get_memory_usage(processes))
+        if encoder is None:
+            raise Exception("No frames read from video: %s" % file_path)
+        _close_webp_encoder(encoder)
+        if encoder.returncode != 0:
+            raise Exception("Error creating WEBP preview: ffmpeg exit code %d" % encoder.returncode)
+    except Exception:
+        if encoder is not None:
+            _close_webp_encoder(encoder)
+            # Don't leave a truncated preview behind
+            delete_file(save_path)
+        raise
+    finally:
+        video_capture.release()
+    print("WEBP conversion peak memory: %0.1f MB" % (peak_memory / (1024 * 1024)))
 
 
 def convert_mp4_to_webm(file_path, save_path, width=None, height=None):
@@ -191,3 +202,54 @@ def convert_mp4_to_webm(file_path, save_path, width=None, height=None):
         msg = "Exception creating video sample media: %s" % str(e)
         print(msg)
         return msg
+
+
+# #### Private functions
+
+def _read_video_frames(video_capture, frame_count, skip_frames):
+    frame_num = 0
+    while True:
+        if frame_num % 100 == 0:
+            print("Processing frames: %d - %d / %d" % (frame_num + 1, min(frame_num + 100, frame_count), frame_count))
+        if (frame_num % skip_frames) == 0:
+            still_reading, image_array = video_capture.read()
+            if still_reading:
+                # Numbers come in as BGR, so flip them around to RGB
+                flip_image_array = numpy.flip(image_array, 2)
+                img = Image.fromarray(flip_image_array)
+                if img.width > PREVIEW_DIMENSIONS[0] or img.height > PREVIEW_DIMENSIONS[1]:
+                    img.thumbnail(PREVIEW_DIMENSIONS)
+                yield img
+        else:
+            still_reading = video_capture.grab()
+        if not still_reading:
+            return
+        frame_num += 1
+
+
+def _open_webp_encoder(save_path, size, frame_rate):
+    stream = ffmpeg.input('pipe:', format='rawvideo', pix_fmt='rgb24', s='%dx%d' % size, framerate=frame_rate)
+    stream = stream.output(save_path, vcodec='libwebp', pix_fmt='yuv420p', loop=WEBP_LOOPS, lossless=0,
+                           quality=WEBP_QUALITY, compression_level=6)
+    stream = stream.global_args('-loglevel', 'error').overwrite_output()
+    print("Command:", stream.compile(), '\n')
+    return stream.run_async(pipe_stdin=True)
+
+
+def _close_webp_encoder(encoder):
+    """Closing the pipe raises when ffmpeg has already exited, which would otherwise mask the original error."""
+    try:
+        encoder.stdin.close()
+    except OSError:
+        pass
+    encoder.wait()
+
+
+def _get_memory_usage(processes):
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return total
@@ -0,0 +1,152 @@
+# APP/LOGICAL/MEDIA_WORKER.PY
+
+"""Persistent process pool for the CPU-heavy media work, fed from a durable job queue in the jobs database."""
+
+# ## PYTHON IMPORTS
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+# ## PACKAGE IMPORTS
+from config import MEDIA_WORKER_LIMITS, MEDIA_JOB_MAX_ATTEMPTS, MEDIA_WORKER_POLL_INTERVAL
+from utility.uprint import print_info
+
+# ## LOCAL IMPORTS
+from .. import SESSION
+from ..models import Post
+from .utility import SessionThread
+from .logger import log_error
+from .media import convert_mp4_to_webp
+from .database.base_db import commit_session
+from .database.jobs_db import get_job_item, get_pending_media_jobs, update_media_job_status,\
+    reset_running_media_jobs, delete_job_item
+from .records.image_hash_rec import get_post_image_hash_params, calculate_post_image_hashes, save_post_image_hashes
+
+
+# ## GLOBAL VARIABLES
+
+MEDIA_WORKER_THREAD = None
+
+
+# ## FUNCTIONS
+
+# #### Job kind functions
+
+def _prepare_image_hash(post):
+    if len(post.image_hashes) > 0:
+        return None
+    return (get_post_image_hash_params(post),)
+
+
+def _finish_image_hash(post, params, result):
+    save_post_image_hashes(params[0], result, commit=False)
+
+
+def _prepare_video_preview(post):
+    if post.file_ext != 'mp4':
+        return None
+    return (post.file_path, post.video_preview_path)
+
+
+def _finish_video_preview(post, params, result):
+    return result
+
+
+# Prepare and finish run on the server process with database access, and return None when there is nothing to do or
+# when there was no error. Process is sent to the worker pool with the prepared parameters, so it must be picklable.
+MEDIA_JOB_KINDS = {
+    'image_hash': {
+        'prepare': _prepare_image_hash,
+        'process': calculate_post_image_hashes,
+        'finish': _finish_image_hash,
+    },
+    'video_preview': {
+        'prepare': _prepare_video_preview,
+        'process': convert_mp4_to_webp,
+        'finish': _finish_video_preview,
+    },
+}
+
+
+# #### Main functions
+
+def start_media_worker():
+    global MEDIA_WORKER_THREAD
+    if MEDIA_WORKER_THREAD is None:
+        MEDIA_WORKER_THREAD = SessionThread(target=_run_media_worker, daemon=True)
+        MEDIA_WORKER_THREAD.start()
+
+
+# #### Private functions
+
+def _run_media_worker():
+    reset_running_media_jobs()
+    commit_session()
+    max_workers = sum(MEDIA_WORKER_LIMITS.values())
+    print_info("Media worker started with %d processes" % max_workers)
+    executor = None
+    running = {}
+    while True:
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+        try:
+            _collect_finished_jobs(running)
+            _submit_pending_jobs(executor, running)
+        except BrokenProcessPool as e:
+            SESSION.rollback()
+            log_error('media_worker._run_media_worker', "Media worker pool broken, restarting: %s" % repr(e))
+            executor.shutdown(wait=False)
+            executor = None
+        except Exception as e:
+            SESSION.rollback()
+            log_error('media_worker._run_media_worker', "Unhandled exception in the media worker: %s" % repr(e))
+        if len(running):
+            wait(running.keys(), timeout=MEDIA_WORKER_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        else:
+            time.sleep(MEDIA_WORKER_POLL_INTERVAL)
+
+
+def _submit_pending_jobs(executor, running):
+    for (kind, limit) in MEDIA_WORKER_LIMITS.items():
+        available = limit - sum(1 for item in running.values() if item[1] == kind)
+        if available <= 0:
+            continue
+        for media_job in get_pending_media_jobs(kind, available):
+            post = Post.find(media_job.post_id)
+            params = MEDIA_JOB_KINDS[kind]['prepare'](post) if post is not None else None
+            if params is None:
+                delete_job_item(media_job)
+                continue
+            future = executor.submit(MEDIA_JOB_KINDS[kind]['process'], *params)
+            update_media_job_status(media_job, 'running')
+            running[future] = (media_job.id, kind, params)
+    commit_session()
+
+
+def _collect_finished_jobs(running):
+    for future in [future for future in running if future.done()]:
+        (job_id, kind, params) = running.pop(future)
+        media_job = get_job_item('media_job', job_id)
+        if media_job is None:
+            continue
+        try:
+            result = future.result()
+            post = Post.find(media_job.post_id)
+            error = MEDIA_JOB_KINDS[kind]['finish'](post, params, result) if post is not None else None
+        except Exception as e:
+            SESSION.rollback()
+            error = repr(e)
+        if error is None:
+            delete_job_item(media_job)
+        else:
+            _fail_media_job(media_job, error)
+        commit_session()
+
+
+def _fail_media_job(media_job, error):
+    attempts = media_job.attempts + 1
+    if attempts < MEDIA_JOB_MAX_ATTEMPTS:
+        update_media_job_status(media_job, 'pending', error=error, attempts=attempts)
+        return
+    update_media_job_status(media_job, 'error', error=error, attempts=attempts)
+    log_error('media_worker._fail_media_job', "%s failed after %d attempts: %s" % (media_job.title, attempts, error))
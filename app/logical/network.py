@@ -1,24 +1,66 @@
 # APP/LOGICAL/NETWORK.PY
 
 # ## PYTHON IMPORTS
+import os
 import time
 import json
+import hashlib
+import threading
+import urllib.parse
+
+# ## EXTERNAL IMPORTS
 import httpx
 
 # ## PACKAGE IMPORTS
-from config import PREBOORU_PORT
+from config import PREBOORU_PORT, HTTP2_ENABLED, HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS,\
+    HTTP_KEEPALIVE_EXPIRY, HTTP_DEFAULT_TIMEOUT, HTTP_HOST_TIMEOUTS
+from utility.file import create_directory, delete_file
+from utility.uprint import print_warning
+
+
+# ## GLOBAL VARIABLES
+
+HTTP_CLIENTS = {}
+HTTP_CLIENTS_PID = None
+HTTP_CLIENTS_LOCK = threading.Lock()
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 # ## FUNCTIONS
 
+# #### Client functions
+
+def get_http_client(url):
+    """Return the shared client for the URL's host, so that connections get reused between requests."""
+    global HTTP_CLIENTS_PID
+    host = urllib.parse.urlparse(url).netloc
+    with HTTP_CLIENTS_LOCK:
+        # Pooled connections can't be shared with a forked process
+        if HTTP_CLIENTS_PID != os.getpid():
+            HTTP_CLIENTS.clear()
+            HTTP_CLIENTS_PID = os.getpid()
+        if host not in HTTP_CLIENTS:
+            HTTP_CLIENTS[host] = _create_http_client(host)
+        return HTTP_CLIENTS[host]
+
+
+def close_http_clients():
+    with HTTP_CLIENTS_LOCK:
+        if HTTP_CLIENTS_PID == os.getpid():
+            for client in HTTP_CLIENTS.values():
+                client.close()
+        HTTP_CLIENTS.clear()
+
+
+# #### Request functions
+
 def get_http_data(serverfilepath, method='get', **args):
-    if 'timeout' not in args:
-        args['timeout'] = 10
-    request_method = getattr(httpx, method)
+    client = get_http_client(serverfilepath)
     response = None
     for i in range(4):
         try:
-            response = request_method(serverfilepath, **args)
+            response = client.request(method.upper(), serverfilepath, **args)
         except (httpx.ConnectTimeout, httpx.ConnectError):
             continue
         except Exception as e:
@@ -35,6 +77,36 @@ def get_http_data(serverfilepath, method='get', **args):
         return "Repeated connection errors"
 
 
+def download_http_file(serverfilepath, save_path, **args):
+    """
+    Stream the response body to the save path, hashing it along the way, so that memory use doesn't depend on the
+    size of the file. Returns the MD5 and size of the file, or an error string.
+    """
+    client = get_http_client(serverfilepath)
+    create_directory(save_path)
+    status = None
+    for i in range(4):
+        try:
+            with client.stream('GET', serverfilepath, **args) as response:
+                status = (response.status_code, response.reason_phrase)
+                if response.status_code == 200:
+                    return _save_response_stream(response, save_path)
+        except (httpx.ConnectTimeout, httpx.ConnectError):
+            delete_file(save_path)
+            continue
+        except Exception as e:
+            delete_file(save_path)
+            return "Unexpected error: %s" % str(e)
+        if status[0] >= 500 and status[0] < 600:
+            print("Server error; sleeping...")
+            time.sleep(15)
+            continue
+    if status is not None:
+        return "HTTP %d - %s" % status
+    else:
+        return "Repeated connection errors"
+
+
 def send_prebooru_request(path, method, **args):
     send_url = f'http://127.0.0.1:{PREBOORU_PORT}' + path
     return get_http_data(send_url, method=method, **args)
@@ -54,3 +126,36 @@ def prebooru_json_request(path, method, **args):
         return data
     else:
         return "Unrecognized response."
+
+
+# #### Private functions
+
+def _create_http_client(host):
+    hostname = host.split(':')[0]
+    timeout = HTTP_HOST_TIMEOUTS.get(hostname, HTTP_DEFAULT_TIMEOUT)
+    limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                          max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                          keepalive_expiry=HTTP_KEEPALIVE_EXPIRY)
+    return httpx.Client(http2=_use_http2(), limits=limits, timeout=timeout)
+
+
+def _save_response_stream(response, save_path):
+    hasher = hashlib.md5()
+    size = 0
+    with open(save_path, 'wb') as file:
+        for chunk in response.iter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+            file.write(chunk)
+            size += len(chunk)
+    return {'md5': hasher.hexdigest(), 'size': size}
+
+
+def _use_http2():
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print_warning("Install h2 module for HTTP/2 support: pip install httpx[http2]")
+        return False
+    return True
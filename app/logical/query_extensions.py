@@ -2,31 +2,38 @@
 
 # ## PYTHON IMPORTS
 import re
+import time
+import threading
 from types import SimpleNamespace
 from functools import reduce
 
 # ## EXTERNAL IMPORTS
-from sqlalchemy import func
+from sqlalchemy import func, text, inspect
 import sqlalchemy.orm
 import flask_sqlalchemy
 
 # ## PACKAGE IMPORTS
-from config import DEFAULT_PAGINATE_LIMIT
+from config import DEFAULT_PAGINATE_LIMIT, COUNT_CACHE_TTL, COUNT_CACHE_SIZE, APPROXIMATE_UNFILTERED_COUNTS
 
 
 # ## GLOBAL VARIABLES
 
 INIT = False
 
+COUNT_CACHE = {}
+COUNT_CACHE_LOCK = threading.Lock()
+
 
 # ## CLASSES
 
 class CountPaginate():
-    def __init__(self, query=None, page=1, per_page=DEFAULT_PAGINATE_LIMIT, distinct=False, count=True, expunge=False):
+    def __init__(self, query=None, page=1, per_page=DEFAULT_PAGINATE_LIMIT, distinct=False, count=True, expunge=False,
+                 count_key=None):
         self.query = query
         self.per_page = per_page
         self.distinct = distinct
         self.expunge = expunge
+        self.count_key = count_key
         self.page = max(page, 1)
         self.offset = (page - 1) * per_page
         if count:
@@ -56,12 +63,12 @@ class CountPaginate():
     def next(self):
         if self.has_next:
             return CountPaginate(query=self.query, page=self.page + 1, per_page=self.per_page, distinct=self.distinct,
-                                 expunge=self.expunge)
+                                 expunge=self.expunge, count_key=self.count_key)
 
     def prev(self):
         if self.has_prev:
             return CountPaginate(query=self.query, page=self.page - 1, per_page=self.per_page, distinct=self.distinct,
-                                 expunge=self.expunge)
+                                 expunge=self.expunge, count_key=self.count_key)
 
     def _get_items(self):
         if self.distinct:
@@ -73,19 +80,7 @@ class CountPaginate():
         return q.allexp() if self.expunge else q.all()
 
     def _get_count(self):
-        # Easy way to get an exact copy of a query
-        self._count_query = self.query.filter()
-        if len(self._count_query._where_criteria) == 0:
-            model = self._count_query.column_descriptions[0]['entity']
-            # Queries with no where criteria do not work correctly
-            self._count_query = self._count_query.filter(*model.pk_cols)
-        # Using function count with scalar does not like loader options
-        self._count_query._with_options = ()
-        if self.distinct:
-            # Keep it from rendering an unncessary DISTINCT outside of the count
-            self._count_query._distinct_on = ()
-            self._count_query._distinct = False
-        return self._count_query.get_count() if not self.distinct else self._count_query.distinct_count()
+        return cached_query_count(self.query, self.distinct, self.count_key, APPROXIMATE_UNFILTERED_COUNTS)
 
 
 class SequentialPaginate():
@@ -97,6 +92,10 @@ class SequentialPaginate():
         self.expunge = expunge
         self.current_count = self._get_count()
         self.count = count or self.current_count
+        self.min_id = self.max_id = self.page_min = self.page_max = None
+        self.items = []
+        self.range = 'N/A'
+        self.direction = None
         if self.current_count > 0:
             self.min_id = min_id or self._get_min_id()
             self.max_id = max_id or self._get_max_id()
@@ -115,7 +114,9 @@ class SequentialPaginate():
                     raise Exception("Invalid sequential page number specified.")
             else:
                 raise Exception("Invalid page specified.")
-            self.items = self._get_items() if self.current_count > 0 else []
+            self.items = self._get_items()
+        # The page can be empty even with a positive count when the page ID is past either end
+        if len(self.items) > 0:
             self.page_min, self.page_max =\
                 [self.items[0], self.items[-1]]\
                 if self.direction == 'a' else\
@@ -126,19 +127,14 @@ class SequentialPaginate():
                 self.range = f'{self.page_min.shortlink} - {self.page_max.shortlink}'
             else:
                 self.range = f'{self.page_max.shortlink} - {self.page_min.shortlink}'
-        else:
-            self.min_id = self.max_id = self.page_min = self.page_max = None
-            self.items = []
-            self.range = 'N/A'
-            self.direction = None
 
     @property
     def above_pagenum(self):
-        return f'a{self.page_max.id}' if self.current_count > 0 else None
+        return f'a{self.page_max.id}' if self.page_max is not None else None
 
     @property
     def below_pagenum(self):
-        return f'b{self.page_min.id}' if self.current_count > 0 else None
+        return f'b{self.page_min.id}' if self.page_min is not None else None
 
     @property
     def has_next(self):
@@ -150,11 +146,11 @@ class SequentialPaginate():
 
     @property
     def has_above(self):
-        return self.max_id > self.page_max.id if self.current_count > 0 else False
+        return self.max_id > self.page_max.id if self.page_max is not None else False
 
     @property
     def has_below(self):
-        return self.min_id < self.page_min.id if self.current_count > 0 else False
+        return self.min_id < self.page_min.id if self.page_min is not None else False
 
     def above(self):
         return SequentialPaginate(query=self.query, per_page=self.per_page, page=self.above_pagenum, count=self.count,
@@ -195,19 +191,41 @@ class SequentialPaginate():
         return q.allexp() if self.expunge else q.all()
 
     def _get_count(self):
-        # Easy way to get an exact copy of a query
-        self._count_query = self.query.filter()
-        if len(self._count_query._where_criteria) == 0:
-            model = self._count_query.column_descriptions[0]['entity']
-            # Queries with no where criteria do not work correctly
-            self._count_query = self._count_query.filter(*model.pk_cols)
-        # Using function count with scalar does not like loader options
-        self._count_query._with_options = ()
-        if self.distinct:
-            # Keep it from rendering an unncessary DISTINCT outside of the count
-            self._count_query._distinct_on = ()
-            self._count_query._distinct = False
-        return self._count_query.get_count() if not self.distinct else self._count_query.distinct_count()
+        return query_count(self.query, self.distinct)
+
+
+class KeysetPaginate(SequentialPaginate):
+    """
+    Sequential paginate for index pages ordered newest first. Pages are addressed by the ID just past the page border
+    (e.g. "b1234" for the page below post #1234), so every page costs the same to fetch no matter how deep it is.
+    """
+    keyset = True
+
+    def __init__(self, query=None, page=None, per_page=DEFAULT_PAGINATE_LIMIT, distinct=False, count=True,
+                 expunge=False, count_key=None):
+        self.use_count = count
+        self.count_key = count_key
+        super().__init__(query=query.order_by(None), per_page=per_page, page=page, distinct=distinct,
+                         expunge=expunge)
+        if self.direction == 'a':
+            # Pages above the border are fetched in ascending order
+            self.items.reverse()
+        self.page = page
+
+    @property
+    def prev_num(self):
+        return self.above_pagenum if self.has_above else None
+
+    @property
+    def next_num(self):
+        return self.below_pagenum if self.has_below else None
+
+    def _get_count(self):
+        if not self.use_count:
+            # Only whether there are any items at all matters when the count isn't needed
+            return 1 if self._get_min_id() is not None else 0
+        # The count is only for display, since pages are never computed from it
+        return cached_query_count(self.query, self.distinct, self.count_key, True)
 
 
 # ## FUNCTIONS
@@ -226,6 +244,7 @@ def initialize():
         sqlalchemy.orm.Query.distinct_count = distinct_count
         sqlalchemy.orm.Query.count_paginate = count_paginate
         sqlalchemy.orm.Query.sequential_paginate = sequential_paginate
+        sqlalchemy.orm.Query.keyset_paginate = keyset_paginate
         sqlalchemy.orm.Query.allexp = expunge_all
         sqlalchemy.orm.Query.all2 = secondary_all
         sqlalchemy.orm.Query.first2 = secondary_first
@@ -277,6 +296,10 @@ def sequential_paginate(self, **kwargs):
     return SequentialPaginate(query=self, **kwargs)
 
 
+def keyset_paginate(self, **kwargs):
+    return KeysetPaginate(query=self, **kwargs)
+
+
 def expunge_all(self):
     from .. import SESSION
     items = self.all()
@@ -319,8 +342,64 @@ def paginate_last(self):
     return min((self.page * self.per_page), self.total)
 
 
+# #### Count functions
+
+def query_count(query, distinct):
+    # Easy way to get an exact copy of a query
+    count_query = query.filter()
+    if len(count_query._where_criteria) == 0:
+        model = count_query.column_descriptions[0]['entity']
+        # Queries with no where criteria do not work correctly
+        count_query = count_query.filter(*model.pk_cols)
+    # Using function count with scalar does not like loader options
+    count_query._with_options = ()
+    if distinct:
+        # Keep it from rendering an unncessary DISTINCT outside of the count
+        count_query._distinct_on = ()
+        count_query._distinct = False
+    return count_query.get_count() if not distinct else count_query.distinct_count()
+
+
+def cached_query_count(query, distinct, key, approximate=False):
+    """
+    Counts are cached for a short time by key, which should identify the search. Approximate counts of unfiltered
+    queries come from the statistics gathered by ANALYZE, when available.
+    """
+    if key is None:
+        return query_count(query, distinct)
+    current_time = time.time()
+    with COUNT_CACHE_LOCK:
+        entry = COUNT_CACHE.get(key)
+        if entry is not None and entry[1] > current_time:
+            return entry[0]
+    count = _approximate_count(query) if approximate else None
+    if count is None:
+        count = query_count(query, distinct)
+    with COUNT_CACHE_LOCK:
+        if len(COUNT_CACHE) >= COUNT_CACHE_SIZE:
+            expired_keys = [k for (k, v) in COUNT_CACHE.items() if v[1] <= current_time]
+            for k in (expired_keys or [min(COUNT_CACHE, key=lambda k: COUNT_CACHE[k][1])]):
+                del COUNT_CACHE[k]
+        COUNT_CACHE[key] = (count, current_time + COUNT_CACHE_TTL)
+    return count
+
+
 # #### Private functions
 
+def _approximate_count(query):
+    if len(query._where_criteria) > 0 or len(query._legacy_setup_joins) > 0:
+        return None
+    model = _query_model(query)
+    statement = text("SELECT stat FROM sqlite_stat1 WHERE tbl = :table_name LIMIT 1")
+    try:
+        stat = query.session.execute(statement, {'table_name': model.__table__.name},
+                                     bind_arguments={'mapper': inspect(model)}).scalar()
+    except Exception:
+        # The statistics table only exists once ANALYZE has been run
+        return None
+    return int(stat.split()[0]) if stat is not None else None
+
+
 def _has_entity(self, model):
     current_joined_tables = [t[0] for t in self._legacy_setup_joins]
     return model.__table__ in current_joined_tables
@@ -0,0 +1,86 @@
+# APP/LOGICAL/QUERY_SHAPES.PY
+
+"""Write-behind log of the statement shapes executed by each process, which is read by index_advisor.py."""
+
+# ## PYTHON IMPORTS
+import os
+import json
+import time
+import atexit
+import threading
+
+# ## PACKAGE IMPORTS
+from config import DATA_DIRECTORY, QUERY_SHAPE_FLUSH_INTERVAL
+from utility.file import create_directory
+
+# ## LOCAL IMPORTS
+from .sql_profiler import statement_shape
+
+
+# ## GLOBAL VARIABLES
+
+QUERY_SHAPES_FILEPATH = os.path.join(DATA_DIRECTORY, 'query_shapes.jsonl')
+
+# Shape -> [example statement, count, total milliseconds] since the last flush
+PENDING_SHAPES = {}
+SHAPES_LOCK = threading.Lock()
+LAST_FLUSH = time.time()
+
+
+# ## FUNCTIONS
+
+# #### Main functions
+
+def record_query_shape(statement, duration):
+    shape = statement_shape(statement)
+    with SHAPES_LOCK:
+        entry = PENDING_SHAPES.get(shape)
+        if entry is None:
+            entry = PENDING_SHAPES[shape] = [statement, 0, 0.0]
+        entry[1] += 1
+        entry[2] += duration
+        if time.time() - LAST_FLUSH < QUERY_SHAPE_FLUSH_INTERVAL:
+            return
+        _flush_query_shapes()
+
+
+def flush_query_shapes():
+    with SHAPES_LOCK:
+        _flush_query_shapes()
+
+
+def load_query_shapes(filepath=QUERY_SHAPES_FILEPATH):
+    """Returns the totals of all flushed entries as shape -> {statement, count, time}."""
+    shapes = {}
+    if not os.path.exists(filepath):
+        return shapes
+    with open(filepath, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written line from a process that was killed mid-flush
+                continue
+            entry = shapes.setdefault(item['shape'], {'statement': item['statement'], 'count': 0, 'time': 0.0})
+            entry['count'] += item['count']
+            entry['time'] += item['time']
+    return shapes
+
+
+# #### Private functions
+
+def _flush_query_shapes():
+    global LAST_FLUSH
+    LAST_FLUSH = time.time()
+    if len(PENDING_SHAPES) == 0:
+        return
+    lines = [json.dumps({'shape': shape, 'statement': entry[0], 'count': entry[1], 'time': round(entry[2], 3)})
+             for (shape, entry) in PENDING_SHAPES.items()]
+    PENDING_SHAPES.clear()
+    create_directory(QUERY_SHAPES_FILEPATH)
+    # One write per flush, so that the lines of concurrent processes don't get interleaved
+    with open(QUERY_SHAPES_FILEPATH, 'a', encoding='utf-8') as file:
+        file.write('\n'.join(lines) + '\n')
+
+
+atexit.register(flush_query_shapes)
@@ -1,34 +1,77 @@
 # APP/LOGICAL/RECORDS/ARCHIVE_REC.PY
 
 # ## PYTHON IMPORTS
-import itertools
+from concurrent.futures import ThreadPoolExecutor
 
 # ## PACKAGE IMPORTS
+from config import EXPIRED_ARCHIVES_PER_PAGE, ARCHIVE_DELETE_WORKERS
 from utility.file import delete_file
 from utility.time import get_current_time
 
 # ## LOCAL IMPORTS
 from ...models import Archive, ArchivePost, ArchiveIllust, ArchiveArtist, ArchiveBooru
 from ..database.base_db import commit_session
+from ..database.jobs_db import create_or_update_job_status
+
+
+# ## GLOBAL VARIABLES
+
+ARCHIVE_TYPE_MODELS = {
+    'posts': ArchivePost,
+    'illusts': ArchiveIllust,
+    'artists': ArchiveArtist,
+    'boorus': ArchiveBooru,
+}
 
 
 # ## FUNCTIONS
 
-def delete_expired_archives():
-    status = {}
-    expired = Archive.query.filter(Archive.expires < get_current_time())\
-                           .with_entities(Archive.id)\
-                           .all()
-    expired_ids = list(itertools.chain(*expired))
-    archive_posts = ArchivePost.query.filter(ArchivePost.archive_id.in_(expired_ids)).all()
-    for archive_post in archive_posts:
-        delete_file(archive_post.file_path)
-        if archive_post.has_preview:
-            delete_file(archive_post.preview_path)
-    status['posts'] = ArchivePost.query.filter(ArchivePost.archive_id.in_(expired_ids)).delete()
-    status['illusts'] = ArchiveIllust.query.filter(ArchiveIllust.archive_id.in_(expired_ids)).delete()
-    status['artists'] = ArchiveArtist.query.filter(ArchiveArtist.archive_id.in_(expired_ids)).delete()
-    status['boorus'] = ArchiveBooru.query.filter(ArchiveBooru.archive_id.in_(expired_ids)).delete()
-    status['total'] = Archive.query.filter(Archive.id.in_(expired_ids)).delete()
-    commit_session()
+def delete_expired_archives(job_id=None):
+    """
+    Each page is committed before moving on to the next, so an interrupted run leaves only unprocessed archives
+    behind, which the next run picks up. Files are deleted before the records, since deleting a missing file is a no-op.
+    """
+    status = {key: 0 for key in ARCHIVE_TYPE_MODELS}
+    status.update({'total': 0, 'pages': 0, 'range': None})
+    expires = get_current_time()
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=ARCHIVE_DELETE_WORKERS) as executor:
+        while True:
+            archive_ids = _get_expired_archive_ids(expires, last_id)
+            if len(archive_ids) == 0:
+                break
+            # Consume the results so that any exceptions get raised
+            list(executor.map(delete_file, _get_archive_file_paths(archive_ids)))
+            for (key, model) in ARCHIVE_TYPE_MODELS.items():
+                status[key] += model.query.filter(model.archive_id.in_(archive_ids)).delete()
+            status['total'] += Archive.query.filter(Archive.id.in_(archive_ids)).delete()
+            status['pages'] += 1
+            status['range'] = f"({archive_ids[0]} - {archive_ids[-1]})"
+            if job_id is not None:
+                create_or_update_job_status(job_id, dict(status, stage='running'))
+            commit_session()
+            last_id = archive_ids[-1]
+    if job_id is not None:
+        create_or_update_job_status(job_id, dict(status, stage='done'))
+        commit_session()
+    del status['range']
     return status
+
+
+# #### Private functions
+
+def _get_expired_archive_ids(expires, last_id):
+    query = Archive.query.filter(Archive.expires < expires, Archive.id > last_id)\
+                         .order_by(Archive.id.asc())\
+                         .with_entities(Archive.id)\
+                         .limit(EXPIRED_ARCHIVES_PER_PAGE)
+    return [id for (id,) in query.all()]
+
+
+def _get_archive_file_paths(archive_ids):
+    file_paths = []
+    for archive_post in ArchivePost.query.filter(ArchivePost.archive_id.in_(archive_ids)).all():
+        file_paths.append(archive_post.file_path)
+        if archive_post.has_preview:
+            file_paths.append(archive_post.preview_path)
+    return file_paths
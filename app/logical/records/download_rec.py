@@ -29,7 +29,7 @@ from ..database.post_db import get_posts_by_id, get_post_by_md5, update_post_fro
 from ..database.error_db import create_and_extend_errors, create_and_append_error, append_error
 from ..media import convert_mp4_to_webp, convert_mp4_to_webm
 from .post_rec import create_image_post, create_video_post, create_ugoira_post, unlink_post_subscription_element
-from .illust_rec import download_illust_url
+from .illust_rec import download_illust_url_file
 
 
 # ## FUNCTIONS
@@ -120,9 +120,9 @@ def create_post_from_download_element(element):
         _duplicate_update(element, illust_url.post)
         return
     if illust_url.type == 'image':
-        results = create_image_post(element, 'user', _get_buffer, _duplicate_check)
+        results = create_image_post(element, 'user', _get_file, _duplicate_check)
     elif illust_url.type == 'video':
-        results = create_video_post(element, 'user', _get_buffer, _duplicate_check)
+        results = create_video_post(element, 'user', _get_file, _duplicate_check)
     elif illust_url.type == 'ugoira':
         results = create_ugoira_post(illust_url, 'user', _duplicate_check)
     else:
@@ -227,8 +227,8 @@ def _duplicate_update(element, post):
     unlink_post_subscription_element(post)
 
 
-def _get_buffer(element):
-    return download_illust_url(element.illust_url)
+def _get_file(element):
+    return download_illust_url_file(element.illust_url)
 
 
 def _duplicate_check(md5):
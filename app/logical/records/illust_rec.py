@@ -1,6 +1,12 @@
 # APP/LOGICAL/RECORDS/ILLUST_REC.PY
 
+# ## PYTHON IMPORTS
+import os
+import uuid
+import threading
+
 # ## PACKAGE IMPORTS
+from config import TEMP_DIRECTORY, DOWNLOAD_SITE_CONCURRENCY, DOWNLOAD_DEFAULT_CONCURRENCY
 from utility.uprint import print_warning
 from utility.data import merge_dicts
 
@@ -9,7 +15,7 @@ from ... import SESSION
 from ...models import IllustTitles, IllustCommentaries, AdditionalCommentaries, ArchiveIllust
 from ...models.description import Description, description_creator
 from ..logger import handle_error_message
-from ..network import get_http_data
+from ..network import get_http_data, download_http_file
 from ..utility import set_error
 from ..sites import site_name_by_url
 from ..database.base_db import delete_record, commit_session
@@ -33,6 +39,9 @@ COMMENTARY_MODELS = {
     'additional': AdditionalCommentaries,
 }
 
+DOWNLOAD_SEMAPHORES = {}
+DOWNLOAD_SEMAPHORES_LOCK = threading.Lock()
+
 
 # ## FUNCTIONS
 
@@ -198,18 +207,48 @@ def illust_add_additional_commentary(illust, commentary):
 # #### Illust URLs
 
 def download_illust_url(illust_url):
+    return download_illust_url_from_parameters(get_illust_url_download_parameters(illust_url))
+
+
+def download_illust_url_file(illust_url):
+    return download_illust_url_file_from_parameters(get_illust_url_download_parameters(illust_url))
+
+
+def get_illust_url_download_parameters(illust_url):
+    """Everything needed to download the illust URL, so that the download can run without database access."""
+    return {
+        'urls': [illust_url.original_url] + ([illust_url.alternate_url] if illust_url.has_alternate else []),
+        'headers': illust_url.source.IMAGE_HEADERS,
+        'domain': illust_url.site_domain,
+    }
+
+
+def download_illust_url_from_parameters(params):
+    """Thread-safe. Downloads to the same domain are capped at the configured concurrency for that domain."""
     retdata = {'errors': [], 'buffer': None}
-    buffer = _download_media(illust_url.original_url, illust_url.source.IMAGE_HEADERS)
-    if isinstance(buffer, tuple):
-        retdata['errors'].append(buffer)
-        if illust_url.has_alternate:
-            buffer = _download_media(illust_url.alternate_url, illust_url.source.IMAGE_HEADERS)
+    with _get_download_semaphore(params['domain']):
+        for url in params['urls']:
+            buffer = _download_media(url, params['headers'])
             if isinstance(buffer, tuple):
                 retdata['errors'].append(buffer)
-            else:
-                retdata['buffer'] = buffer
-    else:
-        retdata['buffer'] = buffer
+                continue
+            retdata['buffer'] = buffer
+            break
+    return retdata
+
+
+def download_illust_url_file_from_parameters(params):
+    """Same as above, except that the media is streamed to a temporary file instead of being held in memory."""
+    retdata = {'errors': [], 'file': None, 'md5': None, 'size': None, 'temporary': True}
+    with _get_download_semaphore(params['domain']):
+        for url in params['urls']:
+            save_path = os.path.join(TEMP_DIRECTORY, str(uuid.uuid4()))
+            result = _download_media_file(url, params['headers'], save_path)
+            if isinstance(result, tuple):
+                retdata['errors'].append(result)
+                continue
+            retdata.update({'file': save_path, 'md5': result['md5'], 'size': result['size']})
+            break
     return retdata
 
 
@@ -245,6 +284,22 @@ def _download_media(download_url, headers):
     return buffer
 
 
+def _download_media_file(download_url, headers, save_path):
+    print("Downloading", download_url)
+    result = download_http_file(download_url, save_path, headers=headers)
+    if isinstance(result, str):
+        return _module_error('download_media_file', "Download URL: %s => %s" % (download_url, result))
+    return result
+
+
+def _get_download_semaphore(domain):
+    with DOWNLOAD_SEMAPHORES_LOCK:
+        if domain not in DOWNLOAD_SEMAPHORES:
+            limit = DOWNLOAD_SITE_CONCURRENCY.get(domain, DOWNLOAD_DEFAULT_CONCURRENCY)
+            DOWNLOAD_SEMAPHORES[domain] = threading.BoundedSemaphore(limit)
+        return DOWNLOAD_SEMAPHORES[domain]
+
+
 def _module_error(function, message):
     return (f'illust_rec.{function}', message)
 
@@ -4,7 +4,7 @@
 from PIL import Image
 
 # ## EXTERNAL IMPORTS
-import distance
+import numpy
 import imagehash
 
 # ## LOCAL IMPORTS
@@ -12,20 +12,70 @@ from ...models.image_hash import ImageHash, HASH_SIZE, TOTAL_BITS
 from ..sources.base_src import get_media_source
 from ..database.post_db import get_posts_by_id
 from ..database.image_hash_db import create_image_hash_from_parameters
+from ..similarity_index import search_similarity_index, score_to_distance
 from .media_file_rec import batch_get_or_create_media
 
 
+# ## GLOBAL VARIABLES
+
+POPCOUNT_TABLE = numpy.array([bin(i).count('1') for i in range(256)], dtype=numpy.uint16)
+
+PAIRWISE_BLOCK_SIZE = 512
+# Ratio ranges are not quite symmetric, so the column bands are padded past them, with the exact check done per pair
+PAIRWISE_RATIO_PADDING = 1.02
+
+
 # ## FUNCTIONS
 
 # #### Helper functions
 
 def img_hash_to_bytes(img_hash):
-    bin_str = ''.join('1' if i else '0' for i in img_hash.hash.flatten())
-    return bytes(int(bin_str[i: i + 8], 2) for i in range(0, len(bin_str), 8))
-
-
-def bytes_to_binary(byte_obj):
-    return bin(int(byte_obj.hex(), 16))[2:].zfill(len(byte_obj * 8))
+    return numpy.packbits(img_hash.hash.flatten()).tobytes()
+
+
+def hashes_to_matrix(image_hashes):
+    return numpy.frombuffer(b''.join(image_hashes), dtype=numpy.uint8).reshape(len(image_hashes), -1)
+
+
+def hamming_distances(image_hash, hash_matrix):
+    """Mismatching bits between the hash and every row of the matrix, computed in a single vectorized pass."""
+    hash_row = numpy.frombuffer(image_hash, dtype=numpy.uint8)
+    return POPCOUNT_TABLE[numpy.bitwise_xor(hash_matrix, hash_row)].sum(axis=1)
+
+
+def distances_to_scores(distances):
+    return numpy.round((1 - (distances / TOTAL_BITS)) * 100, 2)
+
+
+def pairwise_similarity_scores(post_ids, ratios, hash_matrix, min_score, block_size=PAIRWISE_BLOCK_SIZE):
+    """
+    Yields (post_id, post_id, score) for every pair of image hashes at or above the minimum score, where either
+    ratio is within the range of the other. The rows must be sorted by ratio, so that each block of rows only
+    needs to be compared against the following columns up to the end of the block's ratio range.
+    """
+    total = len(ratios)
+    # Same as ratio_range in the image hash model, but for the whole array at once
+    ratio_lows = numpy.round(ratios * 99, 4) / 100
+    ratio_highs = numpy.round(ratios * 101, 4) / 100
+    for row_start in range(0, total, block_size):
+        row_end = min(row_start + block_size, total)
+        col_limit = int(numpy.searchsorted(ratios, ratios[row_end - 1] * PAIRWISE_RATIO_PADDING, side='right'))
+        row_slice = slice(row_start, row_end)
+        for col_start in range(row_start, col_limit, block_size):
+            col_slice = slice(col_start, min(col_start + block_size, col_limit))
+            xor_block = numpy.bitwise_xor(hash_matrix[row_slice, None, :], hash_matrix[None, col_slice, :])
+            scores = distances_to_scores(POPCOUNT_TABLE[xor_block].sum(axis=2))
+            row_ratios = ratios[row_slice, None]
+            col_ratios = ratios[None, col_slice]
+            mask = scores >= min_score
+            mask &= ((col_ratios >= ratio_lows[row_slice, None]) & (col_ratios <= ratio_highs[row_slice, None])) |\
+                    ((row_ratios >= ratio_lows[None, col_slice]) & (row_ratios <= ratio_highs[None, col_slice]))
+            mask &= post_ids[row_slice, None] != post_ids[None, col_slice]
+            if col_start == row_start:
+                # The diagonal block only needs its upper triangle, since the lower one has the same pairs
+                mask &= numpy.arange(mask.shape[0])[:, None] < numpy.arange(mask.shape[1])[None, :]
+            for (row, col) in zip(*numpy.nonzero(mask)):
+                yield (int(post_ids[row_start + row]), int(post_ids[col_start + col]), float(scores[row, col]))
 
 
 def get_image(file_path):
@@ -39,23 +89,31 @@ def get_image_hash(image):
 
 # #### Auxiliary functions
 
-def get_image_hash_matches(image_hash, ratio, sim_clause=None, post_id=None):
-    switcher = {
-        'chunk': lambda image_hash: ImageHash.chunk_similarity_clause(image_hash),
-        'cross0': lambda image_hash: ImageHash.cross_similarity_clause0(image_hash),
-        'cross1': lambda image_hash: ImageHash.cross_similarity_clause1(image_hash),
-        'cross2': lambda image_hash: ImageHash.cross_similarity_clause2(image_hash),
-    }
+def get_image_hash_matches(image_hash, ratio, sim_clause=None, post_id=None, min_score=90.0):
+    if sim_clause == 'index':
+        return get_indexed_image_hash_matches(image_hash, ratio, min_score, post_id=post_id)
     query = ImageHash.query
     if isinstance(ratio, float):
         query = query.filter(ImageHash.ratio_clause(ratio))
-    if sim_clause != 'all':
-        query = query.filter(switcher[sim_clause](image_hash))
+    if sim_clause == 'band':
+        query = query.filter(ImageHash.band_similarity_clause(image_hash, score_to_distance(min_score)))
     if post_id is not None:
         query = query.filter(ImageHash.post_id != post_id)
     return query.all()
 
 
+def get_indexed_image_hash_matches(image_hash, ratio, min_score, post_id=None):
+    index_results = search_similarity_index(image_hash, score_to_distance(min_score), ratio=ratio, post_id=post_id)
+    if index_results is None:
+        # The index is still being built, so use the band lookup table instead
+        return get_image_hash_matches(image_hash, ratio, sim_clause='band', post_id=post_id, min_score=min_score)
+    if len(index_results) == 0:
+        return []
+    image_hash_ids = [result[0] for result in index_results]
+    # Querying the records also weeds out any hashes deleted by other processes
+    return ImageHash.query.filter(ImageHash.id.in_(image_hash_ids)).all()
+
+
 def filter_score_results(score_results):
     """Posts can have more than one image hash, so only return the one with the highest score"""
     seen = set()
@@ -70,19 +128,17 @@ def filter_score_results(score_results):
 
 
 def check_image_match_scores(image_match_results, image_hash, min_score):
+    if len(image_match_results) == 0:
+        return []
+    hash_matrix = hashes_to_matrix([image_match.hash for image_match in image_match_results])
+    scores = distances_to_scores(hamming_distances(image_hash, hash_matrix))
     found_results = []
-    image_binary_string = bytes_to_binary(image_hash)
-    for image_match in image_match_results:
-        image_match_binary_string = bytes_to_binary(image_match.hash)
-        mismatching_bits = distance.hamming(image_binary_string, image_match_binary_string)
-        miss_ratio = mismatching_bits / TOTAL_BITS
-        score = round((1 - miss_ratio) * 100, 2)
-        if score >= min_score:
-            data = {
-                'post_id': image_match.post_id,
-                'score': score,
-            }
-            found_results.append(data)
+    for index in numpy.flatnonzero(scores >= min_score):
+        data = {
+            'post_id': image_match_results[index].post_id,
+            'score': float(scores[index]),
+        }
+        found_results.append(data)
     return sorted(found_results, key=lambda x: x['score'], reverse=True)
 
 
@@ -92,7 +148,7 @@ def check_media_file_image_matches(media_file, min_score, limit, include_posts=F
     image = get_image(media_file.file_path)
     image_hash = get_image_hash(image)
     ratio = round(image.width / image.height, 4)
-    imghash_matches = get_image_hash_matches(image_hash, ratio, sim_clause=sim_clause)
+    imghash_matches = get_image_hash_matches(image_hash, ratio, sim_clause=sim_clause, min_score=min_score)
     score_results = check_image_match_scores(imghash_matches, image_hash, min_score)
     final_results = filter_score_results(score_results)
     if len(final_results) > limit:
@@ -106,35 +162,48 @@ def check_media_file_image_matches(media_file, min_score, limit, include_posts=F
     return final_results
 
 
-# #### Main execution functions
+def get_post_image_hash_params(post):
+    """Everything needed to hash a post's images, without any database access, so it can be sent to other processes."""
+    return {
+        'post_id': post.id,
+        'ratio': round(post.width / post.height, 4),
+        'preview_path': post.preview_path if post.has_preview else None,
+        'file_path': post.file_path if post.file_ext != 'mp4' else None,
+        'sample_path': post.sample_path if post.has_sample else None,
+    }
 
-def generate_post_image_hashes(post, printer=print):
-    ratio = round(post.width / post.height, 4)
+
+def calculate_post_image_hashes(hash_params):
+    """Returns a list of (image type, image hash), leaving out any images too similar to a previous one."""
+    image_hashes = []
+    for (image_type, path_key) in (('PREVIEW', 'preview_path'), ('FULL', 'file_path'), ('SAMPLE', 'sample_path')):
+        if hash_params[path_key] is None:
+            continue
+        image_hash = get_image_hash(get_image(hash_params[path_key]))
+        if len(image_hashes) == 0 or _is_distinct_hash(image_hash, [item[1] for item in image_hashes], 90.0):
+            image_hashes.append((image_type, image_hash))
+    return image_hashes
+
+
+def save_post_image_hashes(hash_params, image_hashes, printer=print, commit=True):
     params = {
-        'post_id': post.id,
-        'ratio': ratio,
+        'post_id': hash_params['post_id'],
+        'ratio': hash_params['ratio'],
     }
     imghash_items = []
-    if post.has_preview:
-        preview_image = get_image(post.preview_path)
-        preview_image_hash = get_image_hash(preview_image)
-        printer("Generate image hash (post #%d): PREVIEW" % post.id)
-        imghash_items.append(create_image_hash_from_parameters({'hash': preview_image_hash, **params}))
-    if post.file_ext != 'mp4':
-        full_image = get_image(post.file_path)
-        full_image_hash = get_image_hash(full_image)
-        if len(imghash_items) == 0 or len(check_image_match_scores(imghash_items, full_image_hash, 90.0)) == 0:
-            printer("Generate image hash (post #%d): FULL" % post.id)
-            imghash_items.append(create_image_hash_from_parameters({'hash': full_image_hash, **params}))
-    if post.has_sample:
-        sample_image = get_image(post.sample_path)
-        sample_image_hash = get_image_hash(sample_image)
-        if len(imghash_items) == 0 or len(check_image_match_scores(imghash_items, sample_image_hash, 90.0)) == 0:
-            printer("Generate image hash (post #%d): SAMPLE" % post.id)
-            imghash_items.append(create_image_hash_from_parameters({'hash': sample_image_hash, **params}))
+    for (image_type, image_hash) in image_hashes:
+        printer("Generate image hash (post #%d): %s" % (hash_params['post_id'], image_type))
+        imghash_items.append(create_image_hash_from_parameters({'hash': image_hash, **params}, commit=commit))
     return imghash_items
 
 
+# #### Main execution functions
+
+def generate_post_image_hashes(post, printer=print):
+    hash_params = get_post_image_hash_params(post)
+    return save_post_image_hashes(hash_params, calculate_post_image_hashes(hash_params), printer=printer)
+
+
 def check_all_image_urls_for_matches(image_urls, min_score, size, limit, include_posts=False, sim_clause=None):
     media_sources = [get_media_source(image_url) for image_url in image_urls]
     if size == 'actual':
@@ -168,3 +237,10 @@ def check_all_image_urls_for_matches(image_urls, min_score, size, limit, include
             }
         image_match_results.append(image_match_result)
     return image_match_results
+
+
+# #### Private functions
+
+def _is_distinct_hash(image_hash, image_hashes, min_score):
+    scores = distances_to_scores(hamming_distances(image_hash, hashes_to_matrix(image_hashes)))
+    return not (scores >= min_score).any()
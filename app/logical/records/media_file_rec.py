@@ -1,16 +1,18 @@
 # APP/LOGICAL/RECORDS/MEDIA_FILE_REC.PY
 
 # ## PYTHON IMPORTS
+import os
+import uuid
 from concurrent.futures import ThreadPoolExecutor
 
 # ## PACKAGE IMPORTS
-from utility.data import get_buffer_checksum
-from utility.file import create_directory, put_get_raw, delete_file
+from config import TEMP_DIRECTORY
+from utility.file import replace_file, delete_file
 from utility.time import days_from_now
 
 # ## LOCAL IMPORTS
 from ... import SESSION
-from ..network import get_http_data
+from ..network import download_http_file
 from ..database.media_file_db import create_media_file_from_parameters, batch_delete_media_files,\
     get_media_file_by_url, get_media_files_by_md5s, update_media_file_from_parameters, get_media_file_by_id,\
     is_media_file
@@ -50,17 +52,17 @@ def get_or_create_media(download_url, source):
 
 
 def create_media(download_url, source):
-    buffer = get_http_data(download_url, headers=source.IMAGE_HEADERS)
-    if type(buffer) is str:
-        return buffer
-    md5 = get_buffer_checksum(buffer)
+    temp_path = os.path.join(TEMP_DIRECTORY, str(uuid.uuid4()))
+    result = download_http_file(download_url, temp_path, headers=source.IMAGE_HEADERS)
+    if type(result) is str:
+        return result
     extension = source.get_media_extension(download_url)
-    media_file = create_media_file_from_parameters({'md5': md5, 'file_ext': extension, 'media_url': download_url})
+    params = {'md5': result['md5'], 'file_ext': extension, 'media_url': download_url}
+    media_file = create_media_file_from_parameters(params)
     try:
-        create_directory(media_file.file_path)
-        put_get_raw(media_file.file_path, 'wb', buffer)
+        replace_file(temp_path, media_file.file_path)
     except Exception as e:
-        delete_file(media_file.file_path)
+        delete_file(temp_path)
         batch_delete_media_files([media_file])
         return "Exception creating media file on disk: %s" % str(e)
     return media_file
@@ -1,14 +1,19 @@
 # APP/LOGICAL/RECORDS/POOL_REC.PY
 
+# ## EXTERNAL IMPORTS
+from sqlalchemy import bindparam
+
 # ## PACKAGE IMPORTS
 from utility.time import get_current_time
 
 # ## LOCAL IMPORTS
-from ...models import Pool, Illust, Post, Notation
+from ... import SESSION
+from ...models import Pool, PoolElement, Illust, Post, Notation
+from ...models.pool_element import POSITION_SPACING
 from ..utility import set_error
 from ..database.base_db import delete_record, commit_session
 from ..database.pool_db import update_pool_from_parameters
-from ..database.pool_element_db import create_pool_element_from_parameters
+from ..database.pool_element_db import create_pool_element_from_parameters, set_pool_element_from_parameters
 
 
 # ## GLOBAL VARIABLES
@@ -49,7 +54,7 @@ def add_item_to_pool(pool, id, id_key, itemclass, itemtype, retdata):
         'position': next_position,
     }
     element = create_pool_element_from_parameters(params, commit=False)
-    update_pool_from_parameters(pool, {'element_count': next_position + 1}, commit=False)
+    update_pool_from_parameters(pool, {'element_count': pool.element_count + 1}, commit=False)
     retdata.update({'pool': pool.basic_json(), 'type': itemtype, 'item': item.basic_json(),
                     'element_ids': pool_element_ids + [element.id], 'data': pool_ids + [pool.id]})
     commit_session()
@@ -62,18 +67,18 @@ def add_items_to_pool(pool, ids, id_key, itemclass, itemtype, retdata):
         return set_error(retdata, "%ss not found." % itemtype)
     next_position = pool.next_position
     elements = []
-    for i, item in enumerate(items):
+    for item in items:
         pool_ids = [pool_element.pool_id for pool_element in item.pool_elements]
         if pool.id in pool_ids:
             continue
         params = {
             'pool_id': pool.id,
             id_key: item.id,
-            'position': next_position + i,
+            'position': next_position + len(elements) * POSITION_SPACING,
         }
         element = create_pool_element_from_parameters(params, commit=False)
         elements.append(element)
-    update_pool_from_parameters(pool, {'element_count': next_position + len(items)}, commit=False)
+    update_pool_from_parameters(pool, {'element_count': pool.element_count + len(elements)}, commit=False)
     pool_element_ids = [element.id for element in elements]
     retdata.update({'pool': pool.basic_json(), 'type': itemtype, 'element_ids': pool_element_ids})
     commit_session()
@@ -81,17 +86,39 @@ def add_items_to_pool(pool, ids, id_key, itemclass, itemtype, retdata):
 
 
 def update_pool_positions(pool):
-    pool.elements.reorder()
+    """Positions no longer need to be made contiguous, so this only recounts the elements."""
     params = {'element_count': pool._get_element_count(), 'checked': get_current_time()}
     update_pool_from_parameters(pool, params, commit=True, update=False)
 
 
+def move_pool_element(pool_element, position):
+    """
+    Moves the element to the 0 based ordinal position, by giving it a key between those of its new neighbors.
+    Positions past the end of the pool move the element to the end.
+    """
+    others = PoolElement.query.filter(PoolElement.pool_id == pool_element.pool_id, PoolElement.id != pool_element.id)
+    position = min(position, others.get_count())
+    others = others.order_by(PoolElement.position, PoolElement.id).with_entities(PoolElement.position)
+    previous_key = others.offset(position - 1).limit(1).scalar() if position > 0 else None
+    next_key = others.offset(position).limit(1).scalar()
+    if previous_key is not None and next_key is not None and next_key - previous_key < 2:
+        # The keys between the neighbors have been used up, which should only happen after many moves to one spot
+        _respace_pool_positions(pool_element.pool)
+        return move_pool_element(pool_element, position)
+    if previous_key is None and next_key is None:
+        return
+    if previous_key is None:
+        key = next_key - POSITION_SPACING
+    elif next_key is None:
+        key = previous_key + POSITION_SPACING
+    else:
+        key = (previous_key + next_key) // 2
+    set_pool_element_from_parameters(pool_element, {'position': key}, 'updated', True)
+
+
 def delete_pool_element(pool_element):
     pool = pool_element.pool
-    if pool_element.position >= (pool.element_count - 1):
-        # Only decrement the pool element count if the element is the last one. This will leave holes, which will be
-        # fixed with a scheduled task, but will at least leave an elements position within range of the element count.
-        update_pool_from_parameters(pool, {'element_count': pool.element_count - 1}, commit=False)
+    update_pool_from_parameters(pool, {'element_count': pool.element_count - 1}, commit=False)
     msg = "[%s]: deleted\n" % pool_element.shortlink
     delete_record(pool_element)
     commit_session()
@@ -110,3 +137,17 @@ def batch_delete_pool_elements(pool_elements):
         pool = Pool.find(pool_id)
         update_pool_positions(pool)
     print("Pool elements deleted:", element_ids, '\n')
+
+
+# #### Private functions
+
+def _respace_pool_positions(pool):
+    query = PoolElement.query.filter(PoolElement.pool_id == pool.id)\
+                             .order_by(PoolElement.position, PoolElement.id)\
+                             .with_entities(PoolElement.id)
+    element_ids = [id for (id,) in query.all()]
+    statement = PoolElement.__table__.update().where(PoolElement.id == bindparam('element_id'))\
+                                              .values(position=bindparam('element_position'))
+    SESSION.execute(statement, [{'element_id': id, 'element_position': i * POSITION_SPACING}
+                                for (i, id) in enumerate(element_ids)])
+    SESSION.expire_all()
@@ -3,12 +3,13 @@
 # ### PYTHON IMPORTS
 import os
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 
 # ### EXTERNAL IMPORTS
 from sqlalchemy.orm import selectinload
 
 # ### PACKAGE IMPORTS
-from config import TEMP_DIRECTORY, ALTERNATE_MOVE_DAYS
+from config import TEMP_DIRECTORY, ALTERNATE_MOVE_DAYS, PARALLEL_IMAGE_HASHES_PER_PAGE
 from utility.data import get_buffer_checksum, merge_dicts, inc_dict_entry, encode_json
 from utility.file import create_directory, put_get_raw, copy_file, delete_file, filename_join, put_get_json,\
     clear_directory, copy_directory
@@ -19,10 +20,12 @@ from ... import SESSION
 from ...models import Post, Artist, ArchivePost, IllustUrl
 from ..utility import set_error, SessionThread
 from ..batch_loader import selectinload_batch_primary
+from ..similarity_index import remove_post_from_index
 from ..logger import handle_error_message
 from ..network import get_http_data
 from ..media import load_image, create_sample, create_preview, create_video_screenshot, convert_mp4_to_webp,\
-    convert_mp4_to_webm, check_filetype, get_pixel_hash, check_alpha, convert_alpha, create_data, get_video_info
+    convert_mp4_to_webm, check_filetype, get_pixel_hash, check_alpha, convert_alpha, create_data, get_video_info,\
+    create_data_from_file
 from ..database.base_db import delete_record, commit_session
 from ..database.post_db import create_post_from_parameters,\
     get_posts_to_query_danbooru_id_query, update_post_from_parameters, alternate_posts_query,\
@@ -37,7 +40,8 @@ from ..database.subscription_element_db import update_subscription_element_from_
 from ..sources.danbooru_src import get_danbooru_posts_by_md5s
 from .base_rec import delete_data, records_paginate
 from .illust_rec import download_illust_url, download_illust_sample, download_illust_url_frames
-from .image_hash_rec import generate_post_image_hashes
+from .image_hash_rec import generate_post_image_hashes, get_post_image_hash_params, calculate_post_image_hashes,\
+    save_post_image_hashes
 from .similarity_match_rec import generate_similarity_matches
 from .pool_rec import delete_pool_element
 
@@ -49,40 +53,45 @@ RELOCATE_PAGE_LIMIT = 10
 
 # ## FUNCTIONS
 
-def create_image_post(record, post_type, get_buffer, duplicate_check):
-    retdata = _single_file_check(record, get_buffer, duplicate_check)
-    if retdata['md5'] is None or retdata['duplicate']:
-        return retdata
-    buffer = retdata['buffer']
-    file_ext = check_filetype(buffer)
+def create_image_post(record, post_type, get_file, duplicate_check):
+    retdata = _single_file_check(record, get_file, duplicate_check)
+    if retdata['md5'] is not None and not retdata['duplicate']:
+        create_image_post_0(record, post_type, retdata)
+    _cleanup_temporary_file(retdata)
+    return retdata
+
+
+def create_image_post_0(record, post_type, retdata):
+    file_ext = check_filetype(retdata['file'])
     if isinstance(file_ext, tuple):
         retdata['errors'].append(_module_error('create_image_post', file_ext[0]))
         file_ext = None
     if file_ext is None:
         file_ext = record.illust_url.url_extension
-    image = _load_image(buffer)
+    md5 = retdata['md5']
+    temppost = Post(md5=md5, file_ext=file_ext)
+    result = create_data_from_file(retdata['file'], temppost.file_path, keep=not retdata['temporary'])
+    if result is not None:
+        retdata['errors'].append(_module_error('create_image_post', result))
+        return
+    # The image is read from its final location, since the temporary file has been moved
+    image = _load_image(temppost.file_path)
     if isinstance(image, tuple):
         retdata['errors'].append(image)
-        return retdata
-    md5 = get_buffer_checksum(buffer)
+        delete_file(temppost.file_path)
+        return
     params = {
         'md5': md5,
-        'size': len(buffer),
+        'size': retdata['size'],
         'width': image.width,
         'height': image.height,
         'pixel_md5': get_pixel_hash(image),
         'file_ext': file_ext,
         'type_name': post_type,
     }
-    temppost = Post(md5=md5, file_ext=file_ext)
-    result = create_data(buffer, temppost.file_path)
-    if result is not None:
-        retdata['errors'].append(_module_error('create_image_post', result))
-        return retdata
     # From this point forward, the post will be created and all errors attached to that post
     retdata['post'] = post = create_post_from_parameters(params)
     create_image_post_sample_preview_images(post, image)
-    return retdata
 
 
 def update_image_post(post, buffer, illust_url):
@@ -210,32 +219,36 @@ def create_ugoira_post_0(illust_url, post_type, working_directory, duplicate_che
     return retdata
 
 
-def create_video_post(record, post_type, get_buffer, duplicate_check):
-    retdata = _single_file_check(record, get_buffer, duplicate_check)
-    if retdata['md5'] is None or retdata['duplicate']:
-        return retdata
+def create_video_post(record, post_type, get_file, duplicate_check):
+    retdata = _single_file_check(record, get_file, duplicate_check)
+    if retdata['md5'] is not None and not retdata['duplicate']:
+        create_video_post_0(record, post_type, retdata)
+    _cleanup_temporary_file(retdata)
+    return retdata
+
+
+def create_video_post_0(record, post_type, retdata):
     illust_url = record.illust_url
-    buffer = retdata['buffer']
-    file_ext = check_filetype(buffer)
+    file_ext = check_filetype(retdata['file'])
     if isinstance(file_ext, tuple):
         retdata['errors'].append(_module_error('create_video_post', file_ext[0]))
         file_ext = None
     if file_ext is None:
         file_ext = illust_url.url_extension
-    md5 = get_buffer_checksum(buffer)
+    md5 = retdata['md5']
     temppost = Post(md5=md5, file_ext=file_ext)
-    result = create_data(buffer, temppost.file_path)
+    result = create_data_from_file(retdata['file'], temppost.file_path, keep=not retdata['temporary'])
     if result is not None:
         retdata['errors'].append(_module_error('create_video_post', result))
-        return retdata
+        return
     info = get_video_info(temppost.file_path)
     if isinstance(info, str):
-        retdata['errors'].append(_module_error('create_video_post', file_ext[0]))
-        return retdata
+        retdata['errors'].append(_module_error('create_video_post', info))
+        return
     # From this point forward, the post will be created and all errors attached to that post
     params = merge_dicts(info, {
         'md5': md5,
-        'size': len(buffer),
+        'size': retdata['size'],
         'file_ext': file_ext,
         'type_name': post_type,
     })
@@ -245,7 +258,6 @@ def create_video_post(record, post_type, get_buffer, duplicate_check):
               (illust_url.width, illust_url.height, info['width'], info['height'])
         create_and_append_error(post, *_module_error('create_video_post', msg))
     create_video_post_sample_preview_images(post)
-    return retdata
 
 
 def update_video_post(post, buffer, illust_url):
@@ -314,7 +326,7 @@ def create_video_post_sample_preview_images(post):
 
 
 def unlink_post_subscription_element(post):
-    selectinload_batch_primary(post.illust_urls, 'subscription_element', reverse=True)
+    selectinload_batch_primary(post.illust_urls, 'subscription_element')
     for illust_url in post.illust_urls:
         element = illust_url.subscription_element
         if element is not None and element.status_name not in ['duplicate', 'unlinked']:
@@ -442,10 +454,12 @@ def delete_post(post, retdata=None):
 
     def _delete(post):
         msg = "[%s]: deleted\n" % post.shortlink
+        post_id = post.id
         for pool_element in post.pool_elements:
             delete_pool_element(pool_element)
         delete_record(post)
         commit_session()
+        remove_post_from_index(post_id)
         print(msg)
 
     retdata = retdata or {'error': False, 'is_deleted': False}
@@ -528,20 +542,37 @@ def recreate_archived_post(archive):
     return retdata
 
 
-def generate_missing_image_hashes(manual):
+def generate_missing_image_hashes(manual, workers=None):
+    """With workers set, image decoding and hashing are spread across a process pool, while the records are
+    still created on this process."""
     total = 0
     max_batches = 10 if not manual else float('inf')
     query = missing_image_hashes_query()
     query = query.options(selectinload(Post.illust_urls).selectinload(IllustUrl.subscription_element),
                           selectinload(Post.image_hashes))
-    page = query.sequential_paginate(per_page=20, page='newest_first')
-    for posts in records_paginate('generate_missing_image_hashes', page, max_batches):
-        for post in posts:
-            generate_post_image_hashes(post)
-            if post.active_subscription_element is None:
-                generate_similarity_matches(post)
-            total += 1
-        commit_session()
+    if workers is None:
+        page = query.sequential_paginate(per_page=20, page='newest_first')
+        for posts in records_paginate('generate_missing_image_hashes', page, max_batches):
+            for post in posts:
+                generate_post_image_hashes(post)
+                if post.active_subscription_element is None:
+                    generate_similarity_matches(post)
+                total += 1
+            commit_session()
+        return total
+    page = query.sequential_paginate(per_page=PARALLEL_IMAGE_HASHES_PER_PAGE, page='newest_first')
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for posts in records_paginate('generate_missing_image_hashes', page, max_batches):
+            hash_params = [get_post_image_hash_params(post) for post in posts]
+            chunksize = max(1, len(hash_params) // (workers * 4))
+            image_hashes = executor.map(calculate_post_image_hashes, hash_params, chunksize=chunksize)
+            for (post, params, post_image_hashes) in zip(posts, hash_params, image_hashes):
+                # Without a commit in between, the preloaded image hashes relation doesn't pick up the new records
+                post.image_hashes.extend(save_post_image_hashes(params, post_image_hashes, commit=False))
+                if post.active_subscription_element is None:
+                    generate_similarity_matches(post)
+                total += 1
+            commit_session()
     return total
 
 
@@ -622,16 +653,22 @@ def process_image_matches(post_ids):
 
 # #### Private functions
 
-def _single_file_check(record, get_buffer, duplicate_check):
-    retdata = get_buffer(record)
-    if retdata['buffer'] is None:
+def _single_file_check(record, get_file, duplicate_check):
+    """Get file returns the file path along with its MD5 and size, and whether it is a temporary file."""
+    retdata = get_file(record)
+    retdata.update({'post': None, 'duplicate': False})
+    if retdata['file'] is None:
         retdata['md5'] = None
         return retdata
-    retdata['md5'] = get_buffer_checksum(retdata['buffer'])
     retdata['duplicate'] = duplicate_check(retdata['md5'])
     return retdata
 
 
+def _cleanup_temporary_file(retdata):
+    if retdata['temporary'] and retdata['file'] is not None:
+        delete_file(retdata['file'])
+
+
 def _save_animation_file(working_directory, save_data):
     print("Saving animation file.")
     try:
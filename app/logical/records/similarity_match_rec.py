@@ -1,10 +1,20 @@
 # APP/LOGICAL/RECORDS/SIMILARITY_MATCH_REC.PY
 
+# ## PYTHON IMPORTS
+import time
+
+# ## EXTERNAL IMPORTS
+import numpy
+
 # ## LOCAL IMPORTS
-from ..database.post_db import update_post_from_parameters
+from ..database.post_db import update_post_from_parameters, missing_similarity_matches_query
+from ..database.image_hash_db import get_all_image_hash_similarity_data
 from ..database.similarity_match_db import create_similarity_match_from_parameters,\
-    update_similarity_match_from_parameters
-from .image_hash_rec import get_image_hash_matches, check_image_match_scores, filter_score_results
+    update_similarity_match_from_parameters, upsert_similarity_matches, get_all_similarity_match_keys,\
+    delete_similarity_matches_by_keys
+from ..database.base_db import commit_session
+from .image_hash_rec import get_image_hash_matches, check_image_match_scores, filter_score_results,\
+    hashes_to_matrix, pairwise_similarity_scores
 
 
 # ## FUNCTIONS
@@ -15,12 +25,42 @@ def generate_similarity_matches(post, singular=False, printer=print):
     update_post_from_parameters(post, {'simcheck': True}, commit=False)
 
 
+def rebuild_all_similarity_matches(min_score=90.0, printer=print):
+    """
+    Recomputes the similarity matches of the entire library at once by comparing every pair of image hashes,
+    instead of querying for candidates one post at a time. Matches which no longer score high enough are removed.
+    """
+    start_time = time.time()
+    rows = get_all_image_hash_similarity_data()
+    printer("Image hashes loaded:", len(rows))
+    if len(rows) == 0:
+        return {'total': 0, 'removed': 0}
+    post_ids = numpy.array([row[0] for row in rows], dtype=numpy.int64)
+    ratios = numpy.array([row[1] for row in rows], dtype=numpy.float64)
+    hash_matrix = hashes_to_matrix([row[2] for row in rows])
+    best_scores = {}
+    for (post_id1, post_id2, score) in pairwise_similarity_scores(post_ids, ratios, hash_matrix, min_score):
+        key = (post_id1, post_id2) if post_id1 < post_id2 else (post_id2, post_id1)
+        if score > best_scores.get(key, 0.0):
+            best_scores[key] = score
+    printer("Similarity matches found: %d in %0.2f seconds" % (len(best_scores), time.time() - start_time))
+    match_params = [{'forward_id': key[0], 'reverse_id': key[1], 'score': score}
+                    for (key, score) in best_scores.items()]
+    upsert_similarity_matches(match_params, commit=False)
+    stale_keys = get_all_similarity_match_keys().difference(best_scores.keys())
+    delete_similarity_matches_by_keys(stale_keys, commit=False)
+    missing_similarity_matches_query().update({'simcheck': True}, synchronize_session=False)
+    commit_session()
+    printer("Similarity matches removed:", len(stale_keys))
+    return {'total': len(best_scores), 'removed': len(stale_keys)}
+
+
 # #### Private
 
 def _calculate_similarity_matches(post, singular, printer):
     score_results = []
     for imghash in post.image_hashes:
-        smatches = get_image_hash_matches(imghash.hash, imghash.ratio, sim_clause='cross2', post_id=imghash.post_id)
+        smatches = get_image_hash_matches(imghash.hash, imghash.ratio, sim_clause='index', post_id=imghash.post_id)
         score_results += check_image_match_scores(smatches, imghash.hash, 90.0)
     final_results = filter_score_results(score_results)
     printer("Similarity match results (post #%d): %d" % (post.id, len(final_results)))
@@ -2,7 +2,7 @@
 
 # ## PYTHON IMPORTS
 import os
-import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # ## EXTERNAL IMPORTS
 from sqlalchemy.orm import selectinload
@@ -10,46 +10,34 @@ from sqlalchemy.orm import selectinload
 # ## PACKAGE IMPORTS
 from config import POPULATE_ELEMENTS_PER_PAGE, SYNC_MISSING_ILLUSTS_PER_PAGE, DOWNLOAD_POSTS_PER_PAGE,\
     UNLINK_ELEMENTS_PER_PAGE, DELETE_ELEMENTS_PER_PAGE, ARCHIVE_ELEMENTS_PER_PAGE,\
-    DOWNLOAD_POSTS_PAGE_LIMIT, EXPIRE_ELEMENTS_PAGE_LIMIT, ALTERNATE_MEDIA_DIRECTORY
+    DOWNLOAD_POSTS_PAGE_LIMIT, EXPIRE_ELEMENTS_PAGE_LIMIT, ALTERNATE_MEDIA_DIRECTORY, DOWNLOAD_MAX_WORKERS
 from utility.time import days_from_now, hours_from_now, days_ago, get_current_time
-from utility.uprint import buffered_print, print_info
+from utility.uprint import buffered_print
+from utility.file import delete_file
 
 # ## LOCAL IMPORTS
 from ... import SESSION
 from ...models import Subscription, SubscriptionElement, Illust, IllustUrl
-from ..utility import SessionThread, SessionTimer
+from ..utility import SessionTimer
 from ..searchable import search_attributes
-from ..media import convert_mp4_to_webp
-from ..logger import log_error
 from ..sources.base_src import get_post_source
 from ..database.subscription_element_db import create_subscription_element_from_parameters,\
     all_pending_subscription_elements_query, update_subscription_element_from_parameters,\
     expired_subscription_elements, get_subscription_elements_by_md5, subscription_pending_elements_query
-from ..database.post_db import get_post_by_md5, get_posts_by_id, get_posts_by_subscription_elements
+from ..database.post_db import get_post_by_md5, get_posts_by_subscription_elements
 from ..database.illust_url_db import update_illust_url_from_parameters
 from ..database.illust_db import create_illust_from_parameters, update_illust_from_parameters_standard, get_site_illust
 from ..database.artist_db import get_site_artist, update_artist_from_parameters_standard
 from ..database.archive_db import get_archive_by_post_md5
 from ..database.error_db import is_error, create_and_append_error, create_and_extend_errors
-from ..database.jobs_db import get_job_status_data, update_job_status, update_job_by_id
+from ..database.jobs_db import get_job_status_data, update_job_status, update_job_by_id, create_media_jobs
 from ..database.subscription_db import update_subscription_from_parameters, check_processing_subscriptions
 from ..database.base_db import safe_db_execute
 from .base_rec import records_paginate
 from .post_rec import create_image_post, create_video_post, recreate_archived_post, archive_post_for_deletion,\
     delete_post, create_ugoira_post
-from .illust_rec import download_illust_url
-from .image_hash_rec import generate_post_image_hashes
-
-
-# ## GLOBAL VARIABLES
-
-IMAGEMATCH_SEMAPHORE = threading.Semaphore(2)
-VIDEO_SEMAPHORE = threading.Semaphore(1)
-
-WAITING_THREADS = {
-    'image_match': 0,
-    'video': 0,
-}
+from .illust_rec import download_illust_url_file, get_illust_url_download_parameters,\
+    download_illust_url_file_from_parameters
 
 
 # ## FUNCTIONS
@@ -166,16 +154,15 @@ def download_subscription_elements(subscription, job_id=None):
     q = subscription_pending_elements_query(subscription.id)
     q = q.options(selectinload(SubscriptionElement.illust_url).selectinload(IllustUrl.illust).lazyload('*'))
     page = q.sequential_paginate(per_page=DOWNLOAD_POSTS_PER_PAGE, page='oldest_first')
-    for elements in records_paginate('download_subscription_elements', page):
+    pages = records_paginate('download_subscription_elements', page)
+    for (elements, downloads) in _pipeline_element_downloads(pages):
         job_status['range'] = f"({elements[0].id} - {elements[-1].id}) / [{page.min_id} - {page.max_id}]"
         update_job_status(job_id, job_status)
-        for element in elements:
-            if create_post_from_subscription_element(element):
+        for (element, download) in _completed_element_downloads(downloads):
+            if create_post_from_subscription_element(element, download):
                 job_status['downloads'] += 1
         active_elements = [element for element in elements if element.status_name == 'active']
-        post_ids = [post.id for post in get_posts_by_subscription_elements(active_elements)]
-        _process_image_matches(post_ids)
-        _process_videos(post_ids)
+        _queue_media_jobs(get_posts_by_subscription_elements(active_elements))
     update_job_status(job_id, job_status)
 
 
@@ -185,14 +172,13 @@ def download_missing_elements(manual=False):
     q = q.options(selectinload(SubscriptionElement.illust_url).selectinload(IllustUrl.illust).lazyload('*'))
     page = q.sequential_paginate(per_page=DOWNLOAD_POSTS_PER_PAGE, page='oldest_first')
     element_count = 0
-    for elements in records_paginate('download_missing_elements', page, max_batches):
-        for element in elements:
+    pages = records_paginate('download_missing_elements', page, max_batches)
+    for (elements, downloads) in _pipeline_element_downloads(pages):
+        for (element, download) in _completed_element_downloads(downloads):
             print(f"Downloading {element.shortlink}")
-            create_post_from_subscription_element(element)
+            create_post_from_subscription_element(element, download)
             element_count += 1
-        post_ids = [post.id for post in get_posts_by_subscription_elements(elements)]
-        _process_image_matches(post_ids)
-        _process_videos(post_ids)
+        _queue_media_jobs(get_posts_by_subscription_elements(elements))
     return element_count
 
 
@@ -280,16 +266,18 @@ def populate_subscription_elements(subscription, job_id=None):
     update_job_status(job_id, job_status)
 
 
-def create_post_from_subscription_element(element):
+def create_post_from_subscription_element(element, download=None):
+    """Download is the result of an already completed download of the element's media, if available."""
     illust_url = element.illust_url
     if illust_url.post is not None:
         _update_duplicate_element(element)
         return False
     duplicate_check = _duplicate_check_standard if element.status_name == 'deleted' else _duplicate_check_additional
+    get_file = _get_file if download is None else (lambda element: download)
     if illust_url.type == 'image':
-        results = create_image_post(element, 'subscription', _get_buffer, duplicate_check)
+        results = create_image_post(element, 'subscription', get_file, duplicate_check)
     elif illust_url.type == 'video':
-        results = create_video_post(element, 'subscription', _get_buffer, duplicate_check)
+        results = create_video_post(element, 'subscription', get_file, duplicate_check)
     elif illust_url.type == 'ugoira':
         results = create_ugoira_post(illust_url, 'subscription', duplicate_check)
     else:
@@ -315,9 +303,7 @@ def redownload_element(element):
         if create_post_from_subscription_element(element):
             post = element.post
             if post.is_video:
-                thread = SessionThread(target=convert_mp4_to_webp,
-                                       args=(post.file_path, post.video_preview_path))
-                thread.start()
+                create_media_jobs('video_preview', [post.id])
             return {'error': False}
         else:
             update_subscription_element_from_parameters(element, {'status_name': 'error', 'keep_name': 'unknown'})
@@ -411,8 +397,61 @@ def subscription_slots_needed_per_hour():
 
 # #### Private
 
-def _get_buffer(element):
-    return download_illust_url(element.illust_url)
+def _get_file(element):
+    return download_illust_url_file(element.illust_url)
+
+
+def _pipeline_element_downloads(pages):
+    """
+    Start downloading the media for each page of elements as soon as it is fetched, and only hand it off once the
+    next page has also been started, so that the network stays busy while posts are being created.
+    """
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_MAX_WORKERS) as executor:
+        in_flight = []
+        try:
+            for elements in pages:
+                in_flight.append((elements, _submit_element_downloads(executor, elements)))
+                if len(in_flight) == 2:
+                    yield in_flight[0]
+                    in_flight.pop(0)
+            if len(in_flight) == 1:
+                yield in_flight[0]
+                in_flight.pop(0)
+        finally:
+            # Only left non-empty when stopped partway, such as when post creation raised an exception
+            for (_, downloads) in in_flight:
+                _discard_element_downloads(downloads)
+
+
+def _submit_element_downloads(executor, elements):
+    downloads = []
+    for element in elements:
+        illust_url = element.illust_url
+        if illust_url.post is None and illust_url.type in ['image', 'video']:
+            params = get_illust_url_download_parameters(illust_url)
+            downloads.append((element, executor.submit(download_illust_url_file_from_parameters, params)))
+        else:
+            downloads.append((element, None))
+    return downloads
+
+
+def _completed_element_downloads(downloads):
+    """Yield elements with their downloads in element order. Later downloads keep running while waiting."""
+    for (element, future) in downloads:
+        yield (element, future.result() if future is not None else None)
+
+
+def _discard_element_downloads(downloads):
+    """Delete the temporary files of downloads that were never used. Files already used have been moved away."""
+    for (_, future) in downloads:
+        if future is None or future.cancel():
+            continue
+        try:
+            result = future.result()
+        except Exception:
+            continue
+        if result['file'] is not None:
+            delete_file(result['file'])
 
 
 def _duplicate_check_standard(md5):
@@ -427,53 +466,9 @@ def _duplicate_check_additional(md5):
     return len(element_ids) > 0
 
 
-def _process_image_matches(post_ids):
-    def _process():
-        print("Image match semaphore waits: %d" % WAITING_THREADS['image_match'])
-        WAITING_THREADS['image_match'] += 1
-        IMAGEMATCH_SEMAPHORE.acquire()
-        WAITING_THREADS['image_match'] -= 1
-        posts = get_posts_by_id(post_ids)
-        try:
-            for post in posts:
-                generate_post_image_hashes(post)
-                SESSION.commit()
-        except Exception as e:
-            msg = "Error processing image matches on subscription: %s" % str(e)
-            log_error('subscription_rec._process_image_matches', msg)
-            SESSION.rollback()
-        finally:
-            IMAGEMATCH_SEMAPHORE.release()
-
-    SessionThread(target=_process).start()
-
-
-def _process_videos(post_ids):
-    def _process():
-        printer = buffered_print(f"Process Videos [{thread.ident}]")
-        print_info("Video semaphore wait:", WAITING_THREADS['video'])
-        WAITING_THREADS['video'] += 1
-        VIDEO_SEMAPHORE.acquire()
-        WAITING_THREADS['video'] -= 1
-        print_info("Video semaphore acquire:", WAITING_THREADS['video'])
-        posts = get_posts_by_id(post_ids)
-        mp4_count = 0
-        try:
-            for post in posts:
-                if post.file_ext == 'mp4':
-                    convert_mp4_to_webp(post.file_path, post.video_preview_path)
-                    mp4_count += 1
-        except Exception as e:
-            msg = "Error processing videos on subscription: %s" % str(e)
-            log_error('subscription_rec.process_videos', msg)
-        finally:
-            VIDEO_SEMAPHORE.release()
-            print_info("Video semaphore release:", WAITING_THREADS['video'])
-        printer("Videos processed:", {'mp4': mp4_count})
-        printer.print()
-
-    thread = SessionThread(target=_process)
-    thread.start()
+def _queue_media_jobs(posts):
+    create_media_jobs('image_hash', [post.id for post in posts])
+    create_media_jobs('video_preview', [post.id for post in posts if post.file_ext == 'mp4'])
 
 
 def _update_duplicate_element(element):
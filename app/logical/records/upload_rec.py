@@ -1,12 +1,13 @@
 # APP/LOGICAL/RECORDS/UPLOAD_REC.PY
 
 # ## PYTHON IMPORTS
+import os
 import itertools
 
 # ## PACKAGE IMPORTS
 from utility.time import minutes_ago, days_ago
 from utility.uprint import buffered_print
-from utility.file import put_get_raw
+from utility.data import get_file_checksum
 
 # ## LOCAL IMPORTS
 from ... import SESSION
@@ -89,9 +90,9 @@ def create_post_from_upload(upload):
         _duplicate_update(upload, illust_url.post)
         return
     if illust_url.type == 'image':
-        results = create_image_post(upload, 'user', _get_buffer, _duplicate_check)
+        results = create_image_post(upload, 'user', _get_file, _duplicate_check)
     elif illust_url.type == 'video':
-        results = create_video_post(upload, 'user', _get_buffer, _duplicate_check)
+        results = create_video_post(upload, 'user', _get_file, _duplicate_check)
     elif illust_url.type == 'ugoira':
         raise Exception("Ugoira uploads not handled yet.")
     else:
@@ -159,11 +160,17 @@ def check_for_new_artist_boorus(post_ids):
 
 # #### Private functions
 
-def _get_buffer(upload):
-    retdata = {'errors': []}
-    retdata['buffer'] = put_get_raw(upload.media_filepath, 'rb')
-    if retdata['buffer'] is None:
-        retdata['errors'].append(('upload_rec.get_buffer', "Unable to load file"))
+def _get_file(upload):
+    # The uploaded file is the user's, so it gets copied into place instead of moved
+    retdata = {'errors': [], 'file': None, 'md5': None, 'size': None, 'temporary': False}
+    if not os.path.exists(upload.media_filepath):
+        retdata['errors'].append(('upload_rec.get_file', "Unable to load file"))
+        return retdata
+    retdata.update({
+        'file': upload.media_filepath,
+        'md5': get_file_checksum(upload.media_filepath),
+        'size': os.path.getsize(upload.media_filepath),
+    })
     return retdata
 
 
@@ -3,7 +3,7 @@
 # ## PYTHON IMPORTS
 import re
 import logging
-from sqlalchemy import and_, not_, or_, func
+from sqlalchemy import and_, not_, or_, func, inspect
 from sqlalchemy.orm import aliased, with_polymorphic, ColumnProperty, RelationshipProperty
 from sqlalchemy.ext.associationproxy import ColumnAssociationProxyInstance, ObjectAssociationProxyInstance,\
     AmbiguousAssociationProxyInstance
@@ -18,6 +18,7 @@ from utility.time import process_utc_timestring
 # ## LOCAL IMPORTS
 from .. import SESSION
 from ..models import base
+from .full_text import has_full_text_index, full_text_match_subquery
 
 # ## GLOBAL VARIABLES
 
@@ -25,6 +26,7 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG if DEBUG_LOG else logging.WARNING)
 
 TEXT_COMPARISON_TYPES = ['eq', 'ne', 'like', 'glob', 'not_like', 'not_glob', 'regex', 'not_regex']
+FULL_TEXT_TYPES = ['match', 'not_match']
 
 COMMA_ARRAY_TYPES = ['comma', 'lower_comma', 'not_comma', 'not_lower_comma']
 SPACE_ARRAY_TYPES = ['space', 'lower_space', 'not_space', 'not_lower_space']
@@ -34,8 +36,61 @@ NOT_ARRAY_TYPES = ['not_array', 'not_comma', 'not_space', 'not_lower_array', 'no
 ALL_ARRAY_TYPES = ['array', 'comma', 'space', 'not_array', 'not_comma', 'not_space', 'lower_array', 'lower_comma',
                    'lower_space', 'not_lower_array', 'not_lower_comma', 'not_lower_space']
 
-TEXT_COMPARISON_RE = r'%%s_(%s)' % '|'.join(TEXT_COMPARISON_TYPES)
-TEXT_ARRAY_RE = '%%s_(%s)' % '|'.join(ALL_ARRAY_TYPES)
+NUMERIC_SUFFIXES = ['', '_not', '_eq', '_ne', '_gt', '_ge', '_lt', '_le', '_exists']
+ENUM_SUFFIXES = ['', '_not', '_exists']
+
+# Number of distinct parameter key sets remembered per model
+SEARCH_SHAPE_CACHE_SIZE = 1000
+
+SEARCH_PLANS = {}
+COLUMN_TYPES = {}
+TEXT_PARAM_KEYS = {}
+
+
+# ## CLASSES
+
+class SearchPlan():
+    """Search metadata for a model class, so that the model is only introspected once."""
+    def __init__(self, model_class):
+        self.basic_attributes = []
+        self.relationship_attributes = []
+        self.param_keys = {}
+        self._shapes = {}
+        for attribute in model_class.searchable_attributes:
+            if not is_column(model_class, attribute):
+                continue
+            basic_class = model_class.polymorphic_columns[attribute]\
+                if is_polymorphic_column(model_class, attribute) else None
+            column_type = get_column_type(basic_class or model_class, attribute)
+            self.basic_attributes.append((attribute, basic_class))
+            self._add_param_keys(attribute, _column_param_keys(attribute, column_type))
+            if has_full_text_index(model_class.__table__.name, attribute):
+                self._add_param_keys(attribute, [attribute + '_' + match_type for match_type in FULL_TEXT_TYPES])
+        for attribute in model_class.searchable_attributes:
+            if not is_relationship(model_class, attribute):
+                continue
+            self.relationship_attributes.append(attribute)
+            self._add_param_keys(attribute, [attribute, 'has_' + attribute, 'count_' + attribute])
+        self.order_columns = [attribute for attribute in model_class.order_attributes
+                              if is_column(model_class, attribute)]
+
+    def active_attributes(self, params):
+        """The attributes with at least one parameter present, memoized by the set of parameter keys."""
+        shape = frozenset(params.keys())
+        active = self._shapes.get(shape)
+        if active is None:
+            active = set()
+            for key in shape:
+                active.update(self.param_keys.get(key, ()))
+            if len(self._shapes) < SEARCH_SHAPE_CACHE_SIZE:
+                self._shapes[shape] = active
+        return active
+
+    # ## Private
+
+    def _add_param_keys(self, attribute, keys):
+        for key in keys:
+            self.param_keys.setdefault(key, set()).add(attribute)
 
 
 # ## FUNCTIONS
@@ -108,7 +163,22 @@ def parse_cast(value, parse_type):
     return value
 
 
+def get_search_plan(model):
+    model_class = _model_class(model)
+    plan = SEARCH_PLANS.get(model_class)
+    if plan is None:
+        plan = SEARCH_PLANS[model_class] = SearchPlan(model_class)
+    return plan
+
+
 def get_column_type(model, columnname):
+    key = (_model_class(model), columnname)
+    if key not in COLUMN_TYPES:
+        COLUMN_TYPES[key] = _get_column_type(model, columnname)
+    return COLUMN_TYPES[key]
+
+
+def _get_column_type(model, columnname):
     switcher = {
         base.IntEnum: 'ENUM',
         base.BlobMD5: 'STRING',
@@ -135,17 +205,19 @@ def search_attributes(query, model, params):
 
 
 def all_attribute_filters(query, model, params):
-    attributes = model.searchable_attributes
-    basic_attributes = [attribute for attribute in attributes if is_column(model, attribute)]
+    plan = get_search_plan(model)
+    active_attributes = plan.active_attributes(params)
+    if len(active_attributes) == 0:
+        return (), query
     basic_filters = ()
-    for attribute in basic_attributes:
-        basic_model = model if not is_polymorphic_column(model, attribute) else model.polymorphic_columns[attribute]
-        basic_filters += basic_attribute_filters(basic_model, attribute, params)
-    relationship_attributes = [attribute for attribute in attributes if is_relationship(model, attribute)]
+    for (attribute, basic_class) in plan.basic_attributes:
+        if attribute in active_attributes:
+            basic_filters += basic_attribute_filters(basic_class or model, attribute, params)
     relationship_filters = ()
-    for attribute in relationship_attributes:
-        filters, query = relationship_attribute_filters(query, model, attribute, params)
-        relationship_filters += filters
+    for attribute in plan.relationship_attributes:
+        if attribute in active_attributes:
+            filters, query = relationship_attribute_filters(query, model, attribute, params)
+            relationship_filters += filters
     return (basic_filters + relationship_filters), query
 
 
@@ -256,20 +328,21 @@ def text_filters(model, columnname, params):
     filters = ()
     if columnname in params:
         filters += (getattr(model, columnname) == params[columnname],)
-    cmp_regex = re.compile(TEXT_COMPARISON_RE % columnname)
-    cmp_matches = [cmp_regex.match(key) for key in params.keys()]
-    cmp_types = [match.group(1) for match in cmp_matches if match is not None]
-    for cmp_type in cmp_types:
-        param_key = columnname + '_' + cmp_type
-        filters += (text_comparison_matching(model, columnname, params[param_key], cmp_type),)
+    cmp_keys, array_keys = _text_param_keys(columnname)
+    for (param_key, cmp_type) in cmp_keys.items():
+        if param_key in params:
+            filters += (text_comparison_matching(model, columnname, params[param_key], cmp_type),)
     if (columnname + '_exists') in params:
         filters += (existence_matching(model, columnname, params[columnname + '_exists']),)
-    array_regex = re.compile(TEXT_ARRAY_RE % columnname)
-    array_matches = [array_regex.match(key) for key in params.keys()]
-    array_types = [match.group(1) for match in array_matches if match is not None]
-    for array_type in array_types:
-        param_key = columnname + '_' + array_type
-        filters += (text_array_matching(model, columnname, params[param_key], array_type),)
+    for (param_key, array_type) in array_keys.items():
+        if param_key in params:
+            filters += (text_array_matching(model, columnname, params[param_key], array_type),)
+    for match_type in FULL_TEXT_TYPES:
+        param_key = columnname + '_' + match_type
+        if param_key in params:
+            clause = full_text_matching(model, columnname, params[param_key], match_type)
+            if clause is not None:
+                filters += (clause,)
     return filters
 
 
@@ -432,6 +505,18 @@ def text_comparison_matching(model, columnname, value, cmp_type):
         return not_(getattr(model, columnname).regexp_match(value))
 
 
+def full_text_matching(model, columnname, value, match_type):
+    table_name = _model_class(model).__table__.name
+    if not has_full_text_index(table_name, columnname):
+        raise Exception("%s - column does not have a full text index" % (columnname + '_' + match_type))
+    subquery = full_text_match_subquery(table_name, columnname, value)
+    if subquery is None:
+        # Nothing to search for
+        return None
+    subclause = model.id.in_(subquery)
+    return subclause if match_type == 'match' else not_(subclause)
+
+
 def existence_matching(model, columnname, value):
     if is_truthy(value):
         return getattr(model, columnname).is_not(None)
@@ -471,8 +556,7 @@ def boolean_matching(model, columnname, value):
 # #### Main order functions
 
 def order_attributes(query, model, order_params):
-    attributes = model.order_attributes
-    basic_attributes = [attribute for attribute in attributes if is_column(model, attribute)]
+    basic_attributes = get_search_plan(model).order_columns
     basic_orders = ()
     if type(order_params) is not list:
         order_params = [order_params]
@@ -508,3 +592,30 @@ def custom_order(query, model, search):
         value=model.id,
     )
     return query.order_by(order_clause)
+
+
+# #### Private functions
+
+def _model_class(model):
+    """Aliased and polymorphic entities share the metadata of their mapped class."""
+    return inspect(model).class_
+
+
+def _text_param_keys(columnname):
+    if columnname not in TEXT_PARAM_KEYS:
+        cmp_keys = {columnname + '_' + cmp_type: cmp_type for cmp_type in TEXT_COMPARISON_TYPES}
+        array_keys = {columnname + '_' + array_type: array_type for array_type in ALL_ARRAY_TYPES}
+        TEXT_PARAM_KEYS[columnname] = (cmp_keys, array_keys)
+    return TEXT_PARAM_KEYS[columnname]
+
+
+def _column_param_keys(columnname, column_type):
+    if column_type in ['INTEGER', 'DATETIME', 'REAL']:
+        return [columnname + suffix for suffix in NUMERIC_SUFFIXES]
+    if column_type == 'ENUM':
+        return [columnname + suffix for suffix in NUMERIC_SUFFIXES] +\
+               [columnname[:-3] + suffix for suffix in ENUM_SUFFIXES]
+    if column_type in ['STRING', 'TEXT']:
+        cmp_keys, array_keys = _text_param_keys(columnname)
+        return [columnname, columnname + '_exists'] + list(cmp_keys.keys()) + list(array_keys.keys())
+    return [columnname]
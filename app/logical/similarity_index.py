@@ -0,0 +1,254 @@
+# APP/LOGICAL/SIMILARITY_INDEX.PY
+
+"""In-process multi-index hash table over all image hashes, for answering Hamming distance lookups."""
+
+# ## PYTHON IMPORTS
+import time
+import threading
+
+# ## EXTERNAL IMPORTS
+from sqlalchemy import text
+
+# ## PACKAGE IMPORTS
+from config import IMAGE_HASH_CHANGE_RETENTION
+from utility.uprint import print_info
+
+# ## LOCAL IMPORTS
+from .. import SESSION
+from ..models.image_hash import ImageHash, TOTAL_BITS, BITS_PER_BAND, NUM_BANDS, BAND_MASK, ratio_range,\
+    band_probe_masks
+
+
+# ## GLOBAL VARIABLES
+
+LOAD_PAGE_SIZE = 10000
+
+SIMILARITY_INDEX = None
+INDEX_LOCK = threading.RLock()
+LOAD_LOCK = threading.Lock()
+
+
+# ## CLASSES
+
+class SimilarityIndex():
+    """
+    Multi-index hashing: the hash is split into NUM_BANDS bands, and every band gets its own exact-match table.
+    By the pigeonhole principle, two hashes within N bits must have at least one band within N // NUM_BANDS bits,
+    so only the neighbors of each query band within that radius need to be probed.
+    The image_hash table has triggers which log each change to the image_hash_change table, so that each process
+    can catch up on the changes made by the others.
+    """
+    def __init__(self):
+        self.entries = {}
+        self.bands = [{} for i in range(NUM_BANDS)]
+        self.change_id = 0
+        self.refreshed = 0.0
+        self._probe_masks = {}
+        self._lock = threading.RLock()
+
+    @property
+    def size(self):
+        return len(self.entries)
+
+    def add(self, id, post_id, ratio, image_hash):
+        value = hash_to_int(image_hash)
+        with self._lock:
+            if id in self.entries:
+                self._discard(id)
+            self.entries[id] = (value, post_id, ratio)
+            for band, key in enumerate(_band_keys(value)):
+                self.bands[band].setdefault(key, []).append(id)
+
+    def remove(self, id):
+        with self._lock:
+            self._discard(id)
+
+    def remove_post(self, post_id):
+        with self._lock:
+            ids = [id for (id, entry) in self.entries.items() if entry[1] == post_id]
+            for id in ids:
+                self._discard(id)
+
+    def search(self, image_hash, max_distance, ratio=None, post_id=None):
+        """Return a list of (id, post_id, distance) for all hashes within max_distance bits."""
+        value = hash_to_int(image_hash)
+        ratio_low, ratio_high = ratio_range(ratio) if ratio is not None else (None, None)
+        radius = max_distance // NUM_BANDS
+        masks = self._get_probe_masks(radius)
+        with self._lock:
+            if len(masks) * NUM_BANDS > len(self.entries):
+                # Probing would touch more buckets than there are entries, so just scan them all
+                candidate_ids = self.entries.keys()
+            else:
+                candidate_ids = set()
+                for band, key in enumerate(_band_keys(value)):
+                    table = self.bands[band]
+                    for mask in masks:
+                        bucket = table.get(key ^ mask)
+                        if bucket is not None:
+                            candidate_ids.update(bucket)
+            results = []
+            for id in candidate_ids:
+                entry_value, entry_post_id, entry_ratio = self.entries[id]
+                if post_id is not None and entry_post_id == post_id:
+                    continue
+                if ratio is not None and not (ratio_low <= entry_ratio <= ratio_high):
+                    continue
+                distance = bin(value ^ entry_value).count('1')
+                if distance <= max_distance:
+                    results.append((id, entry_post_id, distance))
+        return sorted(results, key=lambda x: x[2])
+
+    def load(self):
+        # Changes committed during the load are replayed by the next refresh, which is harmless
+        self.change_id = _image_hash_change_max_id()
+        self.refreshed = time.time()
+        total = 0
+        last_id = 0
+        while True:
+            rows = _image_hash_rows(last_id)
+            for row in rows:
+                self.add(*row)
+            total += len(rows)
+            if len(rows) < LOAD_PAGE_SIZE:
+                return total
+            last_id = rows[-1][0]
+
+    def is_stale(self):
+        if time.time() - self.refreshed > IMAGE_HASH_CHANGE_RETENTION / 2:
+            # Older changes may have already been pruned from the log
+            return True
+        # The log was recreated or its IDs were reused, so changes after the last seen ID can't be trusted
+        return _image_hash_change_max_id() < self.change_id
+
+    def refresh(self):
+        """Replay the image hash changes committed by other processes since the last load or refresh."""
+        total = 0
+        while True:
+            rows = _image_hash_change_rows(self.change_id)
+            with self._lock:
+                for (change_id, id, post_id, ratio, image_hash) in rows:
+                    # The current row is read instead of trusting the logged action, since later changes to
+                    # the same hash may not have been replayed yet
+                    if image_hash is None:
+                        self._discard(id)
+                    else:
+                        self.add(id, post_id, ratio, image_hash)
+                    self.change_id = change_id
+            total += len(rows)
+            if len(rows) < LOAD_PAGE_SIZE:
+                break
+        self.refreshed = time.time()
+        return total
+
+    # ## Private
+
+    def _discard(self, id):
+        entry = self.entries.pop(id, None)
+        if entry is None:
+            return
+        for band, key in enumerate(_band_keys(entry[0])):
+            bucket = self.bands[band].get(key)
+            if bucket is None:
+                continue
+            if id in bucket:
+                bucket.remove(id)
+            if len(bucket) == 0:
+                del self.bands[band][key]
+
+    def _get_probe_masks(self, radius):
+        if radius not in self._probe_masks:
+            self._probe_masks[radius] = band_probe_masks(radius)
+        return self._probe_masks[radius]
+
+
+# ## FUNCTIONS
+
+# #### Helper functions
+
+def hash_to_int(image_hash):
+    return int.from_bytes(image_hash, 'big')
+
+
+def score_to_distance(min_score):
+    return int((100 - min_score) * TOTAL_BITS / 100)
+
+
+# #### Main functions
+
+def load_similarity_index():
+    """
+    The new index is built without holding INDEX_LOCK, so that lookups against the current index aren't held up,
+    and is only swapped in once it is complete.
+    """
+    global SIMILARITY_INDEX
+    with LOAD_LOCK:
+        start_time = time.time()
+        index = SimilarityIndex()
+        total = index.load()
+        with INDEX_LOCK:
+            SIMILARITY_INDEX = index
+        print_info("Similarity index loaded: %d image hashes in %0.2f seconds" % (total, time.time() - start_time))
+    return index
+
+
+def get_similarity_index():
+    """
+    Returns None while the first build is still running in another thread. A stale index keeps being used while
+    its replacement is built.
+    """
+    with INDEX_LOCK:
+        index = SIMILARITY_INDEX
+    if index is None:
+        return None if LOAD_LOCK.locked() else load_similarity_index()
+    if LOAD_LOCK.locked():
+        return index
+    if index.is_stale():
+        return load_similarity_index()
+    index.refresh()
+    return index
+
+
+def search_similarity_index(image_hash, max_distance, ratio=None, post_id=None):
+    index = get_similarity_index()
+    if index is None:
+        return None
+    return index.search(image_hash, max_distance, ratio=ratio, post_id=post_id)
+
+
+def add_image_hash_to_index(image_hash):
+    """Indexes are loaded lazily per process, so there is nothing to update until the first lookup."""
+    if SIMILARITY_INDEX is not None:
+        SIMILARITY_INDEX.add(image_hash.id, image_hash.post_id, image_hash.ratio, image_hash.hash)
+
+
+def remove_post_from_index(post_id):
+    if SIMILARITY_INDEX is not None:
+        SIMILARITY_INDEX.remove_post(post_id)
+
+
+# #### Private functions
+
+def _band_keys(value):
+    return [(value >> (band * BITS_PER_BAND)) & BAND_MASK for band in range(NUM_BANDS)]
+
+
+def _image_hash_rows(min_id):
+    return ImageHash.query.with_entities(ImageHash.id, ImageHash.post_id, ImageHash.ratio, ImageHash.hash)\
+                          .filter(ImageHash.id > min_id)\
+                          .order_by(ImageHash.id.asc())\
+                          .limit(LOAD_PAGE_SIZE)\
+                          .all()
+
+
+def _image_hash_change_max_id():
+    return SESSION.execute(text("SELECT MAX(id) FROM image_hash_change")).scalar() or 0
+
+
+def _image_hash_change_rows(min_id):
+    # Deleted hashes come back with NULL columns
+    statement = text("SELECT image_hash_change.id, image_hash_change.image_hash_id, image_hash.post_id,"
+                     " image_hash.ratio, image_hash.hash FROM image_hash_change"
+                     " LEFT JOIN image_hash ON image_hash.id = image_hash_change.image_hash_id"
+                     " WHERE image_hash_change.id > :min_id ORDER BY image_hash_change.id ASC LIMIT :limit")
+    return SESSION.execute(statement, {'min_id': min_id, 'limit': LOAD_PAGE_SIZE}).fetchall()
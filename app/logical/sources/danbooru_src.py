@@ -4,20 +4,19 @@
 import time
 
 # ## EXTERNAL IMPORTS
-import requests
+import httpx
 
 # ## PACKAGE IMPORTS
 from config import DANBOORU_USERNAME, DANBOORU_APIKEY, DANBOORU_HOSTNAME
 from utility.data import add_dict_entry
 
+# ## LOCAL IMPORTS
+from ..network import get_http_client
+
 
 # ## GLOBAL VARIABLES
 
 DATA_FUNCTIONS = ['post']
-REQUEST_METHODS = {
-    'get': requests.get,
-    'post': requests.post,
-}
 REQUEST_AUTH = (DANBOORU_USERNAME, DANBOORU_APIKEY)\
     if DANBOORU_USERNAME is not None and DANBOORU_APIKEY is not None\
     else None
@@ -32,11 +31,12 @@ def danbooru_request(url, params=None, files=None, long=False, method='get'):
     if long:
         data = data or {}
         data['_method'] = 'get'
+    client = get_http_client(DANBOORU_HOSTNAME)
     for i in range(3):
         try:
-            response = REQUEST_METHODS[method](DANBOORU_HOSTNAME + url, params=params, data=data, files=files,
-                                               timeout=10, auth=REQUEST_AUTH)
-        except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
+            response = client.request(method.upper(), DANBOORU_HOSTNAME + url, params=params, data=data, files=files,
+                                      auth=REQUEST_AUTH)
+        except (httpx.TimeoutException, httpx.NetworkError):
             print("Pausing for network timeout...")
             time.sleep(5)
             continue
@@ -46,7 +46,7 @@ def danbooru_request(url, params=None, files=None, long=False, method='get'):
     if response.status_code in [200, 201]:
         return {'error': False, 'json': response.json()}
     else:
-        return {'error': True, 'message': "HTTP %d: %s" % (response.status_code, response.reason)}
+        return {'error': True, 'message': "HTTP %d: %s" % (response.status_code, response.reason_phrase)}
 
 
 def get_artist_by_id(id, include_urls=False):
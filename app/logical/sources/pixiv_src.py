@@ -18,6 +18,7 @@ from utility.uprint import print_info
 # ## LOCAL IMPORTS
 from ...models.model_enums import SiteDescriptor, ApiDataType
 from ..sites import site_name_by_domain
+from ..network import get_http_client
 from ..database.error_db import create_error, is_error
 from ..database.api_data_db import get_api_artist, get_api_illust, get_api_data, save_api_data
 from ..database.server_info_db import get_next_wait, update_next_wait
@@ -320,7 +321,7 @@ def pixiv_request(url, wait=True):
     check_request_wait(wait)
     for i in range(3):
         try:
-            response = httpx.get(url, headers=API_HEADERS, timeout=10)
+            response = get_http_client(url).get(url, headers=API_HEADERS)
         except (httpx.ConnectTimeout, httpx.ConnectError) as e:
             if i == 2:
                 print("Connection errors exceeded!")
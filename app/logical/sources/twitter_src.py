@@ -25,6 +25,7 @@ from utility.uprint import print_info, print_warning, print_error
 # ## LOCAL IMPORTS
 from ...models.model_enums import SiteDescriptor, ApiDataType
 from ..sites import site_name_by_domain
+from ..network import get_http_client
 from ..logger import log_network_error
 from ..database.error_db import create_error, is_error
 from ..database.api_data_db import get_api_artist, get_api_illust, save_api_data
@@ -914,7 +915,8 @@ def twitter_request(endpoint, addons, wait=True):
         headers = TWITTER_HEADERS.copy()
         headers['x-client-transaction-id'] = transaction_id
         try:
-            response = httpx.get('https://x.com/i/api/graphql/' + endpoint + '?' + addons, headers=headers, timeout=10)
+            request_url = 'https://x.com/i/api/graphql/' + endpoint + '?' + addons
+            response = get_http_client(request_url).get(request_url, headers=headers)
         except (httpx.ConnectTimeout, httpx.ConnectError) as e:
             print_warning("Pausing for network error...")
             error = e
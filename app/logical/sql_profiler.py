@@ -0,0 +1,139 @@
+# APP/LOGICAL/SQL_PROFILER.PY
+
+"""Per-request SQL statistics: query counts and time, the slowest statements, and repeated statement shapes."""
+
+# ## PYTHON IMPORTS
+import re
+import uuid
+import threading
+from collections import OrderedDict
+
+# ## EXTERNAL IMPORTS
+from flask import g, request, has_request_context
+
+# ## PACKAGE IMPORTS
+from config import SQL_PROFILE_SLOWEST, SQL_PROFILE_REPEAT_THRESHOLD, SQL_PROFILE_HISTORY
+
+
+# ## GLOBAL VARIABLES
+
+PARAMETER_LIST_RG = re.compile(r'\(\?(?:, \?)+\)')
+NUMBER_LITERAL_RG = re.compile(r'(?<![\w.])\d+(?![\w.])')
+WHITESPACE_RG = re.compile(r'\s+')
+
+PROFILE_HISTORY = OrderedDict()
+PROFILE_LOCK = threading.Lock()
+
+
+# ## FUNCTIONS
+
+# #### Helper functions
+
+def statement_shape(statement):
+    """Statements that only differ by their parameters, or by the length of an IN list, have the same shape."""
+    shape = WHITESPACE_RG.sub(' ', statement).strip()
+    shape = PARAMETER_LIST_RG.sub('(?...)', shape)
+    return NUMBER_LITERAL_RG.sub('?', shape)
+
+
+# #### Main functions
+
+def start_profile():
+    g.sql_profile = {
+        'id': str(uuid.uuid4()),
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'endpoint': request.endpoint,
+        'count': 0,
+        'time': 0.0,
+        'shapes': {},
+        'slowest': [],
+    }
+
+
+def record_statement(statement, params, duration, executemany):
+    if not has_request_context():
+        return
+    profile = g.get('sql_profile')
+    if profile is None:
+        return
+    profile['count'] += 1
+    profile['time'] += duration
+    shape_totals = profile['shapes'].setdefault(statement_shape(statement), [0, 0.0])
+    shape_totals[0] += 1
+    shape_totals[1] += duration
+    slowest = profile['slowest']
+    if len(slowest) < SQL_PROFILE_SLOWEST or duration > slowest[-1]['time']:
+        slowest.append({'time': duration, 'statement': statement, 'params': None if executemany else params})
+        slowest.sort(key=lambda x: x['time'], reverse=True)
+        del slowest[SQL_PROFILE_SLOWEST:]
+
+
+def finish_profile(response):
+    """Returns the summary of the current request, which is also added to the response headers and the history."""
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return None
+    repeated = [{'statement': shape, 'count': totals[0], 'time': round(totals[1], 3)}
+                for (shape, totals) in profile['shapes'].items() if totals[0] >= SQL_PROFILE_REPEAT_THRESHOLD]
+    summary = {
+        'id': profile['id'],
+        'method': profile['method'],
+        'path': profile['path'],
+        'endpoint': profile['endpoint'],
+        'status': response.status_code,
+        'count': profile['count'],
+        'time': round(profile['time'], 3),
+        'statements': len(profile['shapes']),
+        'repeated': sorted(repeated, key=lambda x: x['count'], reverse=True),
+        'slowest': [_explain_statement(item) for item in profile['slowest']],
+    }
+    response.headers['X-SQL-Profile'] = summary['id']
+    response.headers['X-SQL-Queries'] = str(summary['count'])
+    response.headers['X-SQL-Time'] = "%0.2fms" % summary['time']
+    response.headers['X-SQL-Repeated'] = str(len(summary['repeated']))
+    with PROFILE_LOCK:
+        PROFILE_HISTORY[summary['id']] = summary
+        while len(PROFILE_HISTORY) > SQL_PROFILE_HISTORY:
+            PROFILE_HISTORY.popitem(last=False)
+    return summary
+
+
+def get_profiles():
+    with PROFILE_LOCK:
+        return list(reversed(PROFILE_HISTORY.values()))
+
+
+def get_profile(id):
+    with PROFILE_LOCK:
+        return PROFILE_HISTORY.get(id)
+
+
+def clear_profiles():
+    with PROFILE_LOCK:
+        PROFILE_HISTORY.clear()
+
+
+# #### Private functions
+
+def _explain_statement(item):
+    """Runs on a raw connection, so that the EXPLAIN itself is not counted in the profile."""
+    from .. import DB
+    plan = None
+    if item['params'] is not None and item['statement'].lstrip().upper().startswith('SELECT'):
+        connection = DB.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute('EXPLAIN QUERY PLAN ' + item['statement'], item['params'])
+            plan = [row[3] for row in cursor.fetchall()]
+            cursor.close()
+        except Exception as e:
+            plan = ["Unable to explain statement: %s" % str(e)]
+        finally:
+            connection.close()
+    return {
+        'time': round(item['time'], 3),
+        'statement': item['statement'],
+        'params': [repr(param) for param in item['params']] if item['params'] is not None else None,
+        'plan': plan,
+    }
@@ -0,0 +1,206 @@
+# APP/LOGICAL/TAG_INDEX.PY
+
+"""In-process index of tag -> post/illust IDs, for resolving booru-style tag queries before SQL runs."""
+
+# ## PYTHON IMPORTS
+import time
+import bisect
+import threading
+from array import array
+
+# ## EXTERNAL IMPORTS
+from sqlalchemy import select, column, func, not_
+
+# ## PACKAGE IMPORTS
+from config import TAG_CHANGE_RETENTION
+from utility.data import encode_json
+from utility.uprint import print_info
+
+# ## LOCAL IMPORTS
+from .database.tag_db import get_tag_ids_by_terms, get_tag_association_rows, get_tag_change_max_id,\
+    get_tag_change_rows
+
+
+# ## GLOBAL VARIABLES
+
+LOAD_PAGE_SIZE = 10000
+
+# Index name -> (association table, item column)
+TAG_TABLES = {
+    'post': ('post_tags', 'post_id'),
+    'illust': ('illust_tags', 'illust_id'),
+}
+
+TAG_INDEXES = {}
+INDEX_LOCK = threading.RLock()
+
+
+# ## CLASSES
+
+class TagIndex():
+    """
+    Every tag maps to a sorted array of item IDs. The association tables have triggers which log each change
+    to the tag_change table, so that each process can catch up on the changes made by the others.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.table_name, self.item_column = TAG_TABLES[name]
+        self.tags = {}
+        self.change_id = 0
+        self.refreshed = 0.0
+
+    @property
+    def size(self):
+        return sum(len(items) for items in self.tags.values())
+
+    def load(self):
+        # Changes committed during the load are replayed by the next refresh, which is harmless
+        self.change_id = get_tag_change_max_id()
+        self.refreshed = time.time()
+        tags = {}
+        for (tag_id, item_id) in get_tag_association_rows(self.table_name, self.item_column):
+            tags.setdefault(tag_id, []).append(item_id)
+        self.tags = {tag_id: array('q', sorted(items)) for (tag_id, items) in tags.items()}
+        return self.size
+
+    def refresh(self):
+        if time.time() - self.refreshed > TAG_CHANGE_RETENTION / 2:
+            # Older changes may have already been pruned from the log
+            return self.load()
+        if get_tag_change_max_id() < self.change_id:
+            # The log was recreated or its IDs were reused, so changes after the last seen ID can't be trusted
+            return self.load()
+        total = 0
+        while True:
+            rows = get_tag_change_rows(self.table_name, self.change_id, LOAD_PAGE_SIZE)
+            for (id, item_id, tag_id, action) in rows:
+                if action > 0:
+                    self.add(tag_id, item_id)
+                else:
+                    self.remove(tag_id, item_id)
+                self.change_id = id
+            total += len(rows)
+            if len(rows) < LOAD_PAGE_SIZE:
+                break
+        self.refreshed = time.time()
+        return total
+
+    def add(self, tag_id, item_id):
+        items = self.tags.setdefault(tag_id, array('q'))
+        index = bisect.bisect_left(items, item_id)
+        if index == len(items) or items[index] != item_id:
+            items.insert(index, item_id)
+
+    def remove(self, tag_id, item_id):
+        items = self.tags.get(tag_id)
+        if items is None:
+            return
+        index = bisect.bisect_left(items, item_id)
+        if index < len(items) and items[index] == item_id:
+            del items[index]
+        if len(items) == 0:
+            del self.tags[tag_id]
+
+    def search(self, required, optional, excluded):
+        """
+        Each argument is a list of groups, where each group holds the tag IDs matching one query term.
+        Returns (ids, negated), where negated means the IDs are the ones to leave out.
+        """
+        required = sorted((self._group_arrays(group) for group in required), key=_group_size)
+        optional = [self._group_arrays(group) for group in optional]
+        excluded = [self._group_arrays(group) for group in excluded]
+        if len(required):
+            ids = _group_set(required[0])
+            for arrays in required[1:]:
+                ids = {id for id in ids if _group_contains(arrays, id)}
+            if len(optional):
+                ids = {id for id in ids if any(_group_contains(arrays, id) for arrays in optional)}
+        elif len(optional):
+            ids = set().union(*(_group_set(arrays) for arrays in optional))
+        else:
+            return sorted(set().union(*(_group_set(arrays) for arrays in excluded))), True
+        for arrays in excluded:
+            ids = {id for id in ids if not _group_contains(arrays, id)}
+        return sorted(ids), False
+
+    # ## Private
+
+    def _group_arrays(self, tag_ids):
+        return [self.tags[tag_id] for tag_id in tag_ids if tag_id in self.tags]
+
+
+# ## FUNCTIONS
+
+# #### Helper functions
+
+def parse_tag_query(value):
+    """Space separated terms. A - prefix excludes the tag, and a ~ prefix makes it one of a set of alternatives."""
+    required, optional, excluded = [], [], []
+    for term in value.split():
+        if term[0] == '-' and len(term) > 1:
+            excluded.append(term[1:])
+        elif term[0] == '~' and len(term) > 1:
+            optional.append(term[1:])
+        else:
+            required.append(term)
+    return required, optional, excluded
+
+
+# #### Main functions
+
+def load_tag_indexes():
+    with INDEX_LOCK:
+        for name in TAG_TABLES:
+            start_time = time.time()
+            TAG_INDEXES[name] = TagIndex(name)
+            total = TAG_INDEXES[name].load()
+            print_info("Tag index %s loaded: %d tags in %0.2f seconds" % (name, total, time.time() - start_time))
+
+
+def get_tag_index(name):
+    with INDEX_LOCK:
+        if name not in TAG_INDEXES:
+            TAG_INDEXES[name] = TagIndex(name)
+            TAG_INDEXES[name].load()
+        else:
+            TAG_INDEXES[name].refresh()
+        return TAG_INDEXES[name]
+
+
+def search_tag_index(name, value):
+    required, optional, excluded = parse_tag_query(value)
+    term_ids = get_tag_ids_by_terms(required + optional + excluded)
+    with INDEX_LOCK:
+        return get_tag_index(name).search([term_ids[term] for term in required],
+                                          [term_ids[term] for term in optional],
+                                          [term_ids[term] for term in excluded])
+
+
+def tag_query_filter(query, model, search):
+    """Filters posts or illusts by search[tag_query], e.g. 'blue_sky ~cloud ~sun -rain'."""
+    value = search.get('tag_query', "")
+    if not isinstance(value, str) or value.strip() == "":
+        return query
+    ids, negated = search_tag_index(model.__table__.name, value)
+    # All IDs are passed as a single JSON parameter, which avoids SQLite's parameter limit
+    id_subquery = select(column('value')).select_from(func.json_each(encode_json(ids)))
+    clause = model.id.in_(id_subquery)
+    return query.filter(not_(clause) if negated else clause)
+
+
+# #### Private functions
+
+def _group_size(arrays):
+    return sum(len(items) for items in arrays)
+
+
+def _group_set(arrays):
+    return set().union(*arrays)
+
+
+def _group_contains(arrays, id):
+    for items in arrays:
+        index = bisect.bisect_left(items, id)
+        if index < len(items) and items[index] == id:
+            return True
+    return False
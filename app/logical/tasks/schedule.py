@@ -7,7 +7,7 @@ import time
 import traceback
 
 # ## PACKAGE IMPORTS
-from config import ALTERNATE_MEDIA_DIRECTORY, MAXIMUM_PROCESS_SUBSCRIPTIONS
+from config import ALTERNATE_MEDIA_DIRECTORY, MAXIMUM_PROCESS_SUBSCRIPTIONS, PARALLEL_IMAGE_HASHES
 from utility.uprint import buffered_print, print_info, print_error, print_warning
 from utility.file import get_directory_listing, delete_file
 from utility.time import seconds_from_now_local, get_current_time, days_ago, datetime_to_epoch, datetime_from_epoch
@@ -33,7 +33,8 @@ from ..database.subscription_element_db import all_pending_subscription_elements
 from ..database.api_data_db import expired_api_data_count, delete_expired_api_data
 from ..database.media_file_db import get_expired_media_files, get_all_media_files
 from ..database.archive_db import expired_archive_count
-from ..database.tag_db import prune_unused_tags
+from ..database.tag_db import prune_unused_tags, delete_expired_tag_changes
+from ..database.image_hash_db import delete_expired_image_hash_changes
 from ..database.label_db import prune_unused_labels, remove_duplicate_labels
 from ..database.description_db import prune_unused_descriptions, remove_duplicate_descriptions
 from ..database.ugoira_db import prune_unused_ugoiras, remove_duplicate_ugoiras
@@ -62,6 +63,14 @@ def expunge_cache_records_task():
         if len(expired_media_records) > 0:
             batch_delete_media(expired_media_records)
             status['media'] = len(expired_media_records)
+        tag_change_count = delete_expired_tag_changes()
+        printer("Tag changes deleted:", tag_change_count)
+        if tag_change_count > 0:
+            status['tag_changes'] = tag_change_count
+        image_hash_change_count = delete_expired_image_hash_changes()
+        printer("Image hash changes deleted:", image_hash_change_count)
+        if image_hash_change_count > 0:
+            status['image_hash_changes'] = image_hash_change_count
         return status
 
     _execute_scheduled_task(_task, 'expunge_cache_records')
@@ -120,7 +129,7 @@ def expunge_archive_records_task():
         if archive_delete_count > 0:
             printer("Archive records deleted:", archive_delete_count)
             status = {'total': archive_delete_count}
-            status.update(delete_expired_archives())
+            status.update(delete_expired_archives('expunge_archive_records-progress'))
             return status
         printer("No archive records to delete.")
 
@@ -130,7 +139,8 @@ def expunge_archive_records_task():
 @SCHEDULER.task('interval', **JOB_CONFIG['generate_missing_image_hashes']['config'])
 def generate_missing_image_hashes_task():
     def _task(printer, is_manual):
-        total = generate_missing_image_hashes(is_manual)
+        workers = os.cpu_count() if PARALLEL_IMAGE_HASHES else None
+        total = generate_missing_image_hashes(is_manual, workers=workers)
         if total > 0:
             printer("Post records updated:", total)
         else:
@@ -30,13 +30,13 @@ def load_all():
         Booru, BooruNames, BooruArtists, Error, Post,\
         PostTags, Upload, Notation, Pool, PoolElement,\
         Subscription, SubscriptionElement,\
-        ImageHash, SimilarityMatch, ApiData,\
+        ImageHash, ImageHashBand, SimilarityMatch, ApiData,\
         Archive, ArchivePost, ArchiveIllust, ArchiveArtist, ArchiveBooru,\
         Download, DownloadElement, DownloadUrl,\
         Download, DownloadElement, DownloadUrl, DownloadStatus, DownloadElementStatus,\
         MediaFile,\
         ServerInfo,\
-        JobInfo, JobEnable, JobLock, JobManual, JobTime, JobStatus
+        JobInfo, JobEnable, JobLock, JobManual, JobTime, JobStatus, MediaJob
 
     # #### Enum data
     from .model_enums import SiteDescriptor, ApiDataType, ArchiveType, PostType, SubscriptionStatus,\
@@ -68,7 +68,7 @@ def load_all():
     from .subscription_element import SubscriptionElement
 
     # #### Similarity data
-    from .image_hash import ImageHash
+    from .image_hash import ImageHash, ImageHashBand
     from .similarity_match import SimilarityMatch
 
     # #### Cache data
@@ -85,7 +85,10 @@ def load_all():
     from .server_info import ServerInfo
 
     # #### Job data
-    from .jobs import JobInfo, JobEnable, JobLock, JobManual, JobTime, JobStatus
+    from .jobs import JobInfo, JobEnable, JobLock, JobManual, JobTime, JobStatus, MediaJob
+
+    # #### Raw SQL schema
+    from . import raw_schema  # noqa: F401
 
 
 def initialize():
@@ -109,13 +112,13 @@ def initialize():
             Booru, BooruNames, BooruArtists, Error, Post,
             PostTags, Upload, Notation, Pool, PoolElement,
             Subscription, SubscriptionElement,
-            ImageHash, SimilarityMatch, ApiData,
+            ImageHash, ImageHashBand, SimilarityMatch, ApiData,
             Archive, ArchivePost, ArchiveIllust, ArchiveArtist, ArchiveBooru,
             Download, DownloadElement, DownloadUrl,
             Download, DownloadElement, DownloadUrl, DownloadStatus, DownloadElementStatus,
             MediaFile,
             ServerInfo,
-            JobInfo, JobEnable, JobLock, JobManual, JobTime, JobStatus,
+            JobInfo, JobEnable, JobLock, JobManual, JobTime, JobStatus, MediaJob,
         ]
     for model in models:
         key = model._model_name()
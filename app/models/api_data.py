@@ -5,6 +5,7 @@ from utility.obj import classproperty, memoized_classproperty
 from utility.data import swap_list_values, list_difference
 
 # ## LOCAL IMPORTS
+from .. import DB
 from .model_enums import ApiDataType, SiteDescriptor
 from .base import JsonModel, integer_column, enum_column, compressed_json_column, timestamp_column,\
     register_enum_column
@@ -43,5 +44,6 @@ class ApiData(JsonModel):
 # ## Initialize
 
 def initialize():
+    DB.Index(None, ApiData.site_id, ApiData.type_id, ApiData.data_id, unique=True)
     register_enum_column(ApiData, ApiDataType, 'type')
     register_enum_column(ApiData, SiteDescriptor, 'site')
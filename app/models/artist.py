@@ -190,5 +190,11 @@ class Artist(JsonModel):
 def initialize():
     DB.Index(None, Artist.site_artist_id, Artist.site_id, unique=True, sqlite_where=Artist.site_artist_id.is_not(None))
     DB.Index(None, Artist.site_url, unique=True, sqlite_where=Artist.site_url.is_not(None))
+    DB.Index(None, Artist.site_account_id, unique=False)
+    DB.Index(None, Artist.name_id, unique=False, sqlite_where=Artist.name_id.is_not(None))
+    DB.Index(None, Artist.profile_id, unique=False, sqlite_where=Artist.profile_id.is_not(None))
+    DB.Index(None, ArtistNames.label_id, ArtistNames.artist_id, unique=False)
+    DB.Index(None, ArtistSiteAccounts.label_id, ArtistSiteAccounts.artist_id, unique=False)
+    DB.Index(None, ArtistProfiles.description_id, ArtistProfiles.artist_id, unique=False)
 
     register_enum_column(Artist, SiteDescriptor, 'site')
@@ -98,3 +98,5 @@ class Booru(JsonModel):
 
 def initialize():
     DB.Index(None, Booru.danbooru_id, unique=True, sqlite_where=Booru.danbooru_id.is_not(None))
+    DB.Index(None, Booru.name_id, unique=False, sqlite_where=Booru.name_id.is_not(None))
+    DB.Index(None, BooruNames.label_id, BooruNames.booru_id, unique=False)
@@ -222,6 +222,12 @@ def initialize():
     from .artist import Artist
     DB.Index(None, Illust.site_illust_id, Illust.site_id, unique=True, sqlite_where=Illust.site_illust_id.is_not(None))
     DB.Index(None, Illust.site_url, unique=True, sqlite_where=Illust.site_url.is_not(None))
+    DB.Index(None, Illust.title_id, unique=False, sqlite_where=Illust.title_id.is_not(None))
+    DB.Index(None, Illust.commentary_id, unique=False, sqlite_where=Illust.commentary_id.is_not(None))
+    DB.Index(None, IllustTags.tag_id, IllustTags.illust_id, unique=False)
+    DB.Index(None, IllustTitles.description_id, IllustTitles.illust_id, unique=False)
+    DB.Index(None, IllustCommentaries.description_id, IllustCommentaries.illust_id, unique=False)
+    DB.Index(None, AdditionalCommentaries.description_id, AdditionalCommentaries.illust_id, unique=False)
 
     # Access the opposite side of the relationship to force the back reference to be generated
     Artist.illusts.property._configure_started
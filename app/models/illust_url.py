@@ -9,6 +9,7 @@ from utility.obj import memoized_classproperty
 from utility.data import list_difference, swap_list_values
 
 # ## LOCAL IMPORTS
+from .. import DB
 from ..logical.sites import domain_by_site_name
 from .model_enums import SiteDescriptor
 from .ugoira import Ugoira, ugoira_creator
@@ -164,6 +165,8 @@ class IllustUrl(JsonModel):
 
 def initialize():
     from .illust import Illust
+    DB.Index(None, IllustUrl.ugoira_id, unique=False, sqlite_where=IllustUrl.ugoira_id.is_not(None))
+
     # Access the opposite side of the relationship to force the back reference to be generated
     Illust.urls.property._configure_started
     IllustUrl.set_relation_properties()
@@ -1,7 +1,14 @@
 # APP/MODELS/IMAGE_HASH.PY
 
+# ## PYTHON IMPORTS
+import itertools
+
+# ## EXTERNAL IMPORTS
+from sqlalchemy import and_, or_, true
+
 # ## LOCAL IMPORTS
-from .base import JsonModel, integer_column, real_column, blob_column
+from .. import DB
+from .base import JsonModel, integer_column, real_column, blob_column, relationship
 
 # ## GLOBAL VARIABLES
 
@@ -13,139 +20,92 @@ BITS_PER_BYTE = 8
 # #### Configurable
 
 HASH_SIZE = 16            # Must be a power of 2
-BYTES_PER_CHUNK = 1       # Must be a power of 2 or the value 1
+BITS_PER_BAND = 16        # Must evenly divide the total bits of the hash
+MAX_BAND_PROBES = 512     # Past this many band values, candidate selection is no faster than a full scan
 
 
 # #### Calculated
 
-BITS_PER_CHUNK = BYTES_PER_CHUNK * BITS_PER_BYTE
-NUM_CHUNKS = (HASH_SIZE * HASH_SIZE) // BITS_PER_CHUNK
 TOTAL_BITS = HASH_SIZE * HASH_SIZE
+TOTAL_BYTES = TOTAL_BITS // BITS_PER_BYTE
+NUM_BANDS = TOTAL_BITS // BITS_PER_BAND
+BAND_MASK = (1 << BITS_PER_BAND) - 1
 
 
 # ## FUNCTIONS
 
-def chunk_key(index):
-    return 'chunk' + str(index).zfill(2)
+def ratio_range(ratio):
+    ratio_low = round(ratio * 99, 4) / 100
+    ratio_high = round(ratio * 101, 4) / 100
+    return ratio_low, ratio_high
 
 
-def chunk_index(index):
-    return index * BYTES_PER_CHUNK
+def hash_bands(image_hash):
+    value = int.from_bytes(image_hash, 'big')
+    return [(value >> (band * BITS_PER_BAND)) & BAND_MASK for band in range(NUM_BANDS)]
 
 
-def hex_chunk(hashstr, index):
-    strindex = chunk_index(index)
-    return hashstr[strindex: strindex + BYTES_PER_CHUNK]
+def band_probe_masks(radius):
+    """All of the XOR masks of up to radius bits within a single band."""
+    masks = []
+    for bit_count in range(min(radius, BITS_PER_BAND) + 1):
+        for bits in itertools.combinations(range(BITS_PER_BAND), bit_count):
+            masks.append(sum(1 << bit for bit in bits))
+    return masks
 
 
 # ## CLASSES
 
+class ImageHashBand(JsonModel):
+    # ## Columns
+    image_hash_id = integer_column(foreign_key='image_hash.id', primary_key=True)
+    band = integer_column(primary_key=True)
+    value = integer_column(nullable=False)
+
+    # ## Relations
+    # image_hash <- ImageHash (MtO)
+
+    basic_attributes = ['image_hash_id', 'band', 'value']
+    json_attributes = basic_attributes
+    repr_attributes = json_attributes
+
+    # ## Private
+
+    __table_args__ = (
+        {'sqlite_with_rowid': False},
+    )
+
+
 class ImageHash(JsonModel):
     # ## Columns
     id = integer_column(primary_key=True)
     post_id = integer_column(foreign_key='post.id', nullable=False, index=True)
     ratio = real_column(nullable=False)
+    hash = blob_column(nullable=False)
 
     # ## Relations
+    bands = relationship(ImageHashBand, uselist=True, cascade='all,delete-orphan')
     # (OtO) post [Post]
 
-    # ## Instance properties
-
-    @property
-    def hash(self):
-        rethash = b""
-        for i in range(0, NUM_CHUNKS):
-            temp = getattr(self, chunk_key(i))
-            if temp is None:
-                return None
-            rethash += temp
-        return rethash
-
-    @hash.setter
-    def hash(self, image_hash):
-        for i in range(0, NUM_CHUNKS):
-            setattr(self, chunk_key(i), hex_chunk(image_hash, i))
-
     # ## Class properties
 
     @classmethod
     def ratio_clause(cls, ratio):
-        ratio_low = round(ratio * 99, 4) / 100
-        ratio_high = round(ratio * 101, 4) / 100
-        return cls.ratio.between(ratio_low, ratio_high)
-
-    @classmethod
-    def chunk_similarity_clause(cls, image_hash):
-        clause = cls.chunk00 == image_hash[0:2]
-        for i in range(1, NUM_CHUNKS):
-            clause |= (getattr(cls, chunk_key(i)) == hex_chunk(image_hash, i))
-        return clause
-
-    @classmethod
-    def cross_similarity_clause0(cls, image_hash):
-        clause = None
-        for i in range(NUM_CHUNKS):
-            # XXXX  Left-Right
-            #
-            # ##XX  Backward-Down
-            # XX##
-            chunk1 = i
-            chunk2 = (i + 1) % NUM_CHUNKS
-            subclause = (getattr(cls, chunk_key(chunk1)) == hex_chunk(image_hash, chunk1)) &\
-                        (getattr(cls, chunk_key(chunk2)) == hex_chunk(image_hash, chunk2))
-            groupclause = subclause.self_group()
-            clause = clause | groupclause if clause is not None else groupclause
-        return clause
-
-    @classmethod
-    def cross_similarity_clause1(cls, image_hash):
-        clause = None
-        for i in range(NUM_CHUNKS):
-            # XXXX  Left-Right
-            #
-            # ##XX  Backward-Down
-            # XX##
-            chunk1 = i
-            chunk2 = (i + 1) % NUM_CHUNKS
-            subclause = (getattr(cls, chunk_key(chunk1)) == hex_chunk(image_hash, chunk1)) &\
-                        (getattr(cls, chunk_key(chunk2)) == hex_chunk(image_hash, chunk2))
-            groupclause = subclause.self_group()
-            clause = clause | groupclause if clause is not None else groupclause
-        for i in range(NUM_CHUNKS // 2):
-            # XX##  Forward-Down
-            # ##XX
-            chunk1 = i * 2
-            chunk2 = (chunk1 + 3) % NUM_CHUNKS
-            subclause = (getattr(cls, chunk_key(chunk1)) == hex_chunk(image_hash, chunk1)) &\
-                        (getattr(cls, chunk_key(chunk2)) == hex_chunk(image_hash, chunk2))
-            groupclause = subclause.self_group()
-            clause |= groupclause
-        return clause
+        return cls.ratio.between(*ratio_range(ratio))
 
     @classmethod
-    def cross_similarity_clause2(cls, image_hash):
-        clause = None
-        for i in range(NUM_CHUNKS):
-            # XX##  Rightwards zag
-            # ##XX
-            # XX##
-            if i % 2 == 0:
-                chunk1 = i
-                chunk2 = (i + 3) % NUM_CHUNKS
-                chunk3 = (i + 4) % NUM_CHUNKS
-            # ##XX  Leftwards zag
-            # XX##
-            # ##XX
-            else:
-                chunk1 = i
-                chunk2 = (i + 1) % NUM_CHUNKS
-                chunk3 = (i + 4) % NUM_CHUNKS
-            subclause = (getattr(cls, chunk_key(chunk1)) == hex_chunk(image_hash, chunk1)) &\
-                        (getattr(cls, chunk_key(chunk2)) == hex_chunk(image_hash, chunk2)) &\
-                        (getattr(cls, chunk_key(chunk3)) == hex_chunk(image_hash, chunk3))
-            groupclause = subclause.self_group()
-            clause = clause | groupclause if clause is not None else groupclause
-        return clause
+    def band_similarity_clause(cls, image_hash, max_distance):
+        """
+        Two hashes within N bits must have at least one band within N // NUM_BANDS bits of each other,
+        so the candidates are all of the hashes with a band value among the neighbors of the query's bands.
+        """
+        masks = band_probe_masks(max_distance // NUM_BANDS)
+        if len(masks) * NUM_BANDS > MAX_BAND_PROBES:
+            return true()
+        band_clauses = [and_(ImageHashBand.band == band, ImageHashBand.value.in_([value ^ mask for mask in masks]))
+                        for (band, value) in enumerate(hash_bands(image_hash))]
+        subquery = ImageHashBand.query.filter(or_(*band_clauses)).with_entities(ImageHashBand.image_hash_id)
+        return cls.id.in_(subquery)
 
     basic_attributes = ['id', 'post_id', 'ratio']
     json_attributes = basic_attributes + ['hash']
@@ -155,7 +115,4 @@ class ImageHash(JsonModel):
 # ## INITIALIZATION
 
 def initialize():
-    # Initialize chunk attributes, CHUNK00 - CHUNKXX
-    for i in range(0, NUM_CHUNKS):
-        key = chunk_key(i)
-        setattr(ImageHash, key, blob_column(nullable=False))
+    DB.Index(None, ImageHashBand.band, ImageHashBand.value, unique=False)
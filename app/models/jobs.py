@@ -4,7 +4,8 @@
 import datetime
 
 # ## LOCAL IMPORTS
-from .base import JsonModel, text_column, real_column, boolean_column, blob_column, json_column
+from .. import DB
+from .base import JsonModel, integer_column, text_column, real_column, boolean_column, blob_column, json_column
 
 
 # ## CLASSES
@@ -72,3 +73,31 @@ class JobStatus(JobBase):
     # ## Columns
     id = text_column(primary_key=True)
     data = json_column(nullable=False)
+
+
+class MediaJob(JobBase):
+    # ## Columns
+    id = integer_column(primary_key=True)
+    kind = text_column(nullable=False)
+    post_id = integer_column(nullable=False)
+    status = text_column(nullable=False)
+    attempts = integer_column(nullable=False)
+    error = text_column(nullable=True)
+    created = real_column(nullable=False)
+
+    # ## Properties
+
+    @property
+    def title(self):
+        return "%s #%d" % (self.kind.replace('_', ' ').title(), self.post_id)
+
+    # ## Private
+
+    # The ID is autoincremented, which requires a rowid table
+    __table_args__ = ()
+
+
+# ## INITIALIZATION
+
+def initialize():
+    DB.Index(None, MediaJob.kind, MediaJob.status, unique=False)
@@ -6,13 +6,12 @@ from flask import Markup
 # ## EXTERNAL IMPORTS
 from sqlalchemy import func
 from sqlalchemy.util import memoized_property
-from sqlalchemy.ext.orderinglist import ordering_list
 
 # ## PACKAGE IMPORTS
 from config import DEFAULT_PAGINATE_LIMIT, MAXIMUM_PAGINATE_LIMIT
 
 # ## LOCAL IMPORTS
-from .pool_element import PoolElement
+from .pool_element import PoolElement, POSITION_SPACING
 from .base import JsonModel, integer_column, text_column, boolean_column, timestamp_column, relationship, backref
 
 
@@ -34,9 +33,8 @@ class Pool(JsonModel):
     updated = timestamp_column(nullable=False)
 
     # ## Relationships
-    elements = relationship(PoolElement, order_by=PoolElement.position, uselist=True,
-                            backref=backref('pool', uselist=False), cascade='all,delete',
-                            collection_class=ordering_list('position'))
+    elements = relationship(PoolElement, order_by=(PoolElement.position, PoolElement.id), uselist=True,
+                            backref=backref('pool', uselist=False), cascade='all,delete')
 
     # ## Instance properties
 
@@ -49,13 +47,13 @@ class Pool(JsonModel):
         if self.element_count == 0:
             return 0
         return PoolElement.query.filter(PoolElement.pool_id == self.id)\
-                                .with_entities(func.max(PoolElement.position)).scalar() + 1
+                                .with_entities(func.max(PoolElement.position)).scalar() + POSITION_SPACING
 
     def element_paginate(self, pagenum=None, per_page=None, options=None):
         q = self._element_query
         if options is not None:
             q = q.options(options)
-        q = q.order_by(PoolElement.position)
+        q = q.order_by(PoolElement.position, PoolElement.id)
         per_page = min(per_page, SHOW_PAGINATE_LIMIT) if per_page is not None else DEFAULT_PAGINATE_LIMIT
         return q.count_paginate(per_page=per_page, page=pagenum)
 
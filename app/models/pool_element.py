@@ -5,6 +5,7 @@ import math
 
 # ## EXTERNAL IMPORTS
 from flask import url_for
+from sqlalchemy import func, event
 from sqlalchemy.util import memoized_property
 
 # ## PACKAGE IMPORTS
@@ -13,11 +14,17 @@ from utility.obj import classproperty, memoized_classproperty
 from utility.data import swap_list_values
 
 # ## LOCAL IMPORTS
-from .. import DB
+from .. import DB, SESSION
 from .model_enums import PoolElementType
 from .base import JsonModel, integer_column, enum_column, register_enum_column
 
 
+# ## GLOBAL VARIABLES
+
+# Positions are sparse ordering keys, so that an element can be placed between two others by only changing itself
+POSITION_SPACING = 1024
+
+
 # ## CLASSES
 
 class PoolElement(JsonModel):
@@ -36,6 +43,9 @@ class PoolElement(JsonModel):
     # (MtO) illust [Illust]
     # (OtO) notation [Notation]
 
+    # Set by load_ordinals, and cleared whenever the instance gets expired, e.g. by the commit after a move
+    _ordinal = None
+
     # ## Instance properties
 
     @memoized_property
@@ -49,14 +59,38 @@ class PoolElement(JsonModel):
 
     @property
     def position1(self):
-        # Logic is position 0 based, but the display needs to be position 1 based
-        return self.position + 1
+        """The 1 based ordinal position."""
+        return self.ordinal + 1
+
+    @property
+    def ordinal(self):
+        """The 0 based ordinal position, which the JSON shows in place of the sparse key."""
+        if self._ordinal is None:
+            PoolElement.load_ordinals([self])
+        return self._ordinal
 
     @property
     def page_url(self):
         page = math.ceil(self.position1 / DEFAULT_PAGINATE_LIMIT)
         return url_for('pool.show_html', id=self.pool_id, page=page)
 
+    # ## Class methods
+
+    @classmethod
+    def load_ordinals(cls, elements):
+        """Sets the ordinal positions for a list of elements with a single query, ordering ties by ID."""
+        elements = [element for element in elements if element.id is not None]
+        if len(elements) == 0:
+            return
+        rank = func.row_number().over(partition_by=cls.pool_id, order_by=(cls.position, cls.id))
+        ranks = SESSION.query(cls.id, rank.label('rank'))\
+                       .filter(cls.pool_id.in_({element.pool_id for element in elements}))\
+                       .subquery()
+        ordinals = dict(SESSION.query(ranks.c.id, ranks.c.rank)
+                               .filter(ranks.c.id.in_([element.id for element in elements])).all())
+        for element in elements:
+            element._ordinal = ordinals.get(element.id, 1) - 1
+
     # ## Class properties
 
     @memoized_classproperty
@@ -68,7 +102,7 @@ class PoolElement(JsonModel):
 
     @classproperty
     def json_attributes(cls):
-        return cls.repr_attributes
+        return swap_list_values(cls.repr_attributes, {'position': ('position', 'ordinal')})
 
     __table_args__ = (
         DB.CheckConstraint(
@@ -77,9 +111,18 @@ class PoolElement(JsonModel):
     )
 
 
+# ## FUNCTIONS
+
+# #### Private functions
+
+def _clear_ordinal(pool_element, *args):
+    pool_element._ordinal = None
+
+
 # ## INITIALIZATION
 
 def initialize():
+    DB.Index(None, PoolElement.pool_id, PoolElement.position, unique=False)
     DB.Index(None, PoolElement.post_id, PoolElement.pool_id, unique=True,
              sqlite_where=PoolElement.post_id.is_not(None))
     DB.Index(None, PoolElement.illust_id, PoolElement.pool_id, unique=True,
@@ -87,3 +130,5 @@ def initialize():
     DB.Index(None, PoolElement.notation_id, PoolElement.pool_id, unique=True,
              sqlite_where=PoolElement.notation_id.is_not(None))
     register_enum_column(PoolElement, PoolElementType, 'type')
+    event.listen(PoolElement, 'expire', _clear_ordinal)
+    event.listen(PoolElement, 'refresh', _clear_ordinal)
@@ -18,6 +18,7 @@ from utility.data import swap_list_values, dict_filter, dict_prune
 from utility.file import filename_join, network_path_join
 
 # ## LOCAL IMPORTS
+from .. import DB
 from ..logical.utility import unique_objects
 from .model_enums import PostType
 from .ugoira import Ugoira, ugoira_creator
@@ -337,4 +338,7 @@ class Post(JsonModel):
 # ## INITIALIZATION
 
 def initialize():
+    DB.Index(None, Post.ugoira_id, unique=False, sqlite_where=Post.ugoira_id.is_not(None))
+    DB.Index(None, PostTags.tag_id, PostTags.post_id, unique=False)
+
     register_enum_column(Post, PostType, 'type')
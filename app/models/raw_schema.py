@@ -0,0 +1,269 @@
+# APP/MODELS/RAW_SCHEMA.PY
+
+"""
+Tables and triggers which the models can't declare, so they are created with raw SQL whenever the tables are created
+from the models. The migrations that add them to existing databases keep their own frozen copies of the statements.
+"""
+
+# ## EXTERNAL IMPORTS
+from sqlalchemy import event
+
+# ## LOCAL IMPORTS
+from .. import DB
+from ..logical.full_text import FULL_TEXT_INDEXES, FULL_TEXT_TOKENIZER, full_text_table_name
+
+
+# ## GLOBAL VARIABLES
+
+CREATE_FULL_TEXT_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts
+USING fts5({column}, content='{table}', content_rowid='id', tokenize='{tokenizer}')
+"""
+
+CREATE_FULL_TEXT_INSERT_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+    INSERT INTO {table}_fts(rowid, {column}) VALUES (new.id, new.{column});
+END
+"""
+
+CREATE_FULL_TEXT_DELETE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+    INSERT INTO {table}_fts({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column});
+END
+"""
+
+CREATE_FULL_TEXT_UPDATE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {column} ON {table} BEGIN
+    INSERT INTO {table}_fts({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column});
+    INSERT INTO {table}_fts(rowid, {column}) VALUES (new.id, new.{column});
+END
+"""
+
+REBUILD_FULL_TEXT_TABLE = "INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"
+
+FULL_TEXT_TRIGGERS = ['insert', 'delete', 'update']
+
+# Association table -> item column
+TAG_CHANGE_TABLES = [
+    ('post_tags', 'post_id'),
+    ('illust_tags', 'illust_id'),
+]
+
+# The IDs must never be reused once the log has been emptied, since each process reads the changes after the last
+# ID that it has seen.
+CREATE_TAG_CHANGE_TABLE = """
+CREATE TABLE IF NOT EXISTS tag_change (
+    id INTEGER NOT NULL CONSTRAINT pk_tag_change PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    action INTEGER NOT NULL,
+    created REAL NOT NULL
+)
+"""
+
+# The action is 1 for an added tag and -1 for a removed tag
+CREATE_TAG_CHANGE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS {table}_change_{event} AFTER {event} ON {table} BEGIN
+    INSERT INTO tag_change(table_name, item_id, tag_id, action, created)
+    VALUES ('{table}', {row}.{column}, {row}.tag_id, {action}, (julianday('now') - 2440587.5) * 86400.0);
+END
+"""
+
+# Same as the tag change log, except that the similarity index only needs to know which hashes to reread
+CREATE_IMAGE_HASH_CHANGE_TABLE = """
+CREATE TABLE IF NOT EXISTS image_hash_change (
+    id INTEGER NOT NULL CONSTRAINT pk_image_hash_change PRIMARY KEY AUTOINCREMENT,
+    image_hash_id INTEGER NOT NULL,
+    action INTEGER NOT NULL,
+    created REAL NOT NULL
+)
+"""
+
+# The action is 1 for an added or updated hash and -1 for a removed hash
+CREATE_IMAGE_HASH_CHANGE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS image_hash_change_{event} AFTER {event} ON image_hash BEGIN
+    INSERT INTO image_hash_change(image_hash_id, action, created)
+    VALUES ({row}.id, {action}, (julianday('now') - 2440587.5) * 86400.0);
+END
+"""
+
+IMAGE_HASH_CHANGE_EVENTS = [
+    ('insert', 'new', 1),
+    ('delete', 'old', -1),
+    ('update', 'new', 1),
+]
+
+# Pruneable table -> every table and column that references it
+PRUNE_REFERENCES = {
+    'tag': [
+        ('illust_tags', 'tag_id'),
+        ('post_tags', 'tag_id'),
+    ],
+    'label': [
+        ('artist', 'site_account_id'),
+        ('artist', 'name_id'),
+        ('artist_names', 'label_id'),
+        ('artist_site_accounts', 'label_id'),
+        ('booru', 'name_id'),
+        ('booru_names', 'label_id'),
+    ],
+    'description': [
+        ('illust', 'title_id'),
+        ('illust', 'commentary_id'),
+        ('illust_titles', 'description_id'),
+        ('illust_commentaries', 'description_id'),
+        ('additional_commentaries', 'description_id'),
+        ('artist', 'profile_id'),
+        ('artist_profiles', 'description_id'),
+    ],
+    'ugoira': [
+        ('post', 'ugoira_id'),
+        ('illust_url', 'ugoira_id'),
+    ],
+}
+
+CREATE_PRUNE_CANDIDATE_TABLE = """
+CREATE TABLE IF NOT EXISTS prune_candidate (
+    table_name TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    CONSTRAINT pk_prune_candidate PRIMARY KEY (table_name, item_id)
+) WITHOUT ROWID
+"""
+
+# New items start out unreferenced
+CREATE_PRUNE_INSERT_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS prune_{item_table}_insert AFTER INSERT ON {item_table} BEGIN
+    INSERT OR IGNORE INTO prune_candidate(table_name, item_id) VALUES ('{item_table}', new.id);
+END
+"""
+
+CREATE_PRUNE_DELETE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS prune_{item_table}_{table}_{column}_delete AFTER DELETE ON {table}
+WHEN old.{column} IS NOT NULL BEGIN
+    INSERT OR IGNORE INTO prune_candidate(table_name, item_id) VALUES ('{item_table}', old.{column});
+END
+"""
+
+CREATE_PRUNE_UPDATE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS prune_{item_table}_{table}_{column}_update AFTER UPDATE OF {column} ON {table}
+WHEN old.{column} IS NOT NULL AND old.{column} IS NOT new.{column} BEGIN
+    INSERT OR IGNORE INTO prune_candidate(table_name, item_id) VALUES ('{item_table}', old.{column});
+END
+"""
+
+
+# ## FUNCTIONS
+
+# #### Statement functions
+
+def full_text_statements():
+    statements = []
+    for (table, columns) in FULL_TEXT_INDEXES.items():
+        for column in columns:
+            format_args = {'table': table, 'column': column, 'tokenizer': FULL_TEXT_TOKENIZER}
+            statements += [statement.format(**format_args)
+                           for statement in [CREATE_FULL_TEXT_TABLE, CREATE_FULL_TEXT_INSERT_TRIGGER,
+                                             CREATE_FULL_TEXT_DELETE_TRIGGER, CREATE_FULL_TEXT_UPDATE_TRIGGER,
+                                             REBUILD_FULL_TEXT_TABLE]]
+    return statements
+
+
+def drop_full_text_statements():
+    statements = []
+    for table in FULL_TEXT_INDEXES:
+        statements += ["DROP TRIGGER IF EXISTS %s_fts_%s" % (table, trigger) for trigger in FULL_TEXT_TRIGGERS]
+        statements.append("DROP TABLE IF EXISTS %s" % full_text_table_name(table))
+    return statements
+
+
+def tag_change_statements():
+    statements = [CREATE_TAG_CHANGE_TABLE]
+    for (table, column) in TAG_CHANGE_TABLES:
+        statements.append(CREATE_TAG_CHANGE_TRIGGER.format(table=table, column=column, event='insert', row='new',
+                                                           action=1))
+        statements.append(CREATE_TAG_CHANGE_TRIGGER.format(table=table, column=column, event='delete', row='old',
+                                                           action=-1))
+    return statements
+
+
+def drop_tag_change_statements():
+    statements = []
+    for (table, _) in TAG_CHANGE_TABLES:
+        statements += ["DROP TRIGGER IF EXISTS %s_change_insert" % table,
+                       "DROP TRIGGER IF EXISTS %s_change_delete" % table]
+    statements.append("DROP TABLE IF EXISTS tag_change")
+    return statements
+
+
+def image_hash_change_statements():
+    statements = [CREATE_IMAGE_HASH_CHANGE_TABLE]
+    for (event_name, row, action) in IMAGE_HASH_CHANGE_EVENTS:
+        statements.append(CREATE_IMAGE_HASH_CHANGE_TRIGGER.format(event=event_name, row=row, action=action))
+    return statements
+
+
+def drop_image_hash_change_statements():
+    statements = ["DROP TRIGGER IF EXISTS image_hash_change_%s" % event_name
+                  for (event_name, _, _) in IMAGE_HASH_CHANGE_EVENTS]
+    statements.append("DROP TABLE IF EXISTS image_hash_change")
+    return statements
+
+
+def prune_candidate_statements():
+    statements = [CREATE_PRUNE_CANDIDATE_TABLE]
+    for (item_table, references) in PRUNE_REFERENCES.items():
+        statements.append(CREATE_PRUNE_INSERT_TRIGGER.format(item_table=item_table))
+        for (table, column) in references:
+            format_args = {'item_table': item_table, 'table': table, 'column': column}
+            statements.append(CREATE_PRUNE_DELETE_TRIGGER.format(**format_args))
+            statements.append(CREATE_PRUNE_UPDATE_TRIGGER.format(**format_args))
+    return statements
+
+
+def drop_prune_candidate_statements():
+    statements = []
+    for (item_table, references) in PRUNE_REFERENCES.items():
+        statements.append("DROP TRIGGER IF EXISTS prune_%s_insert" % item_table)
+        for (table, column) in references:
+            statements += ["DROP TRIGGER IF EXISTS prune_%s_%s_%s_delete" % (item_table, table, column),
+                           "DROP TRIGGER IF EXISTS prune_%s_%s_%s_update" % (item_table, table, column)]
+    statements.append("DROP TABLE IF EXISTS prune_candidate")
+    return statements
+
+
+def create_raw_schema(connection):
+    statements = full_text_statements() + tag_change_statements() + image_hash_change_statements() +\
+        prune_candidate_statements()
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def drop_raw_schema(connection):
+    statements = drop_full_text_statements() + drop_tag_change_statements() + drop_image_hash_change_statements() +\
+        drop_prune_candidate_statements()
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+# #### Private functions
+
+def _is_prebooru_bind(connection):
+    return connection.engine.url == DB.get_engine(bind=None).url
+
+
+def _after_create(metadata, connection, **kwargs):
+    if _is_prebooru_bind(connection):
+        create_raw_schema(connection)
+
+
+def _before_drop(metadata, connection, **kwargs):
+    if _is_prebooru_bind(connection):
+        drop_raw_schema(connection)
+
+
+# ## INITIALIZATION
+
+def initialize():
+    event.listen(DB.metadata, 'after_create', _after_create)
+    event.listen(DB.metadata, 'before_drop', _before_drop)
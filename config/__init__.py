@@ -62,6 +62,8 @@ TWITTER_CSRF_TOKEN = get_environment_variable('TWITTER_CSRF_TOKEN', TWITTER_CSRF
 PREBOORU_PORT = get_environment_variable('PREBOORU_PORT', PREBOORU_PORT, int)
 IMAGE_PORT = get_environment_variable('IMAGE_PORT', IMAGE_PORT, int)
 HAS_EXTERNAL_IMAGE_SERVER = get_environment_variable('HAS_EXTERNAL_IMAGE_SERVER', HAS_EXTERNAL_IMAGE_SERVER, eval_bool_string)
+HTTP2_ENABLED = get_environment_variable('HTTP2_ENABLED', HTTP2_ENABLED, eval_bool_string)
+PARALLEL_IMAGE_HASHES = get_environment_variable('PARALLEL_IMAGE_HASHES', PARALLEL_IMAGE_HASHES, eval_bool_string)
 WATCHDOG_MAX_MEMORY_MB = get_environment_variable('PREBOORU_MAX_MEMORY', WATCHDOG_MAX_MEMORY_MB, int) * (1024 * 1024)
 WATCHDOG_POLLING_INTERVAL = get_environment_variable('WATCHDOG_POLLING_INTERVAL', WATCHDOG_POLLING_INTERVAL, int)
 MAXIMUM_PAGINATE_LIMIT = get_environment_variable('MAXIMUM_PAGINATE_LIMIT', MAXIMUM_PAGINATE_LIMIT, eval_bool_string)
@@ -69,6 +71,9 @@ DEFAULT_PAGINATE_LIMIT = get_environment_variable('DEFAULT_PAGINATE_LIMIT', DEFA
 CHECK_FOREIGN_KEYS = get_environment_variable('CHECK_FOREIGN_KEYS', CHECK_FOREIGN_KEYS, eval_bool_string)
 USE_ENUMS = get_environment_variable('USE_ENUMS', USE_ENUMS, eval_bool_string)
 DEBUG_MODE = get_environment_variable('DEBUG_MODE', DEBUG_MODE, eval_bool_string)
+SQL_PROFILING = get_environment_variable('SQL_PROFILING', SQL_PROFILING, eval_bool_string)
+SQL_PROFILE_PANEL = get_environment_variable('SQL_PROFILE_PANEL', SQL_PROFILE_PANEL, eval_bool_string)
+QUERY_SHAPE_LOGGING = get_environment_variable('QUERY_SHAPE_LOGGING', QUERY_SHAPE_LOGGING, eval_bool_string)
 
 # #### Constructed config variables
 
@@ -73,6 +73,16 @@ IMAGE_PORT = 1234
 
 HAS_EXTERNAL_IMAGE_SERVER = False
 
+# Connections are pooled and kept alive per host. HTTP/2 requires the h2 package: pip install httpx[http2]
+HTTP2_ENABLED = False
+HTTP_MAX_CONNECTIONS = 20  # per host
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10  # per host
+HTTP_KEEPALIVE_EXPIRY = 30  # seconds
+HTTP_DEFAULT_TIMEOUT = 10  # seconds
+HTTP_HOST_TIMEOUTS = {
+    'video.twimg.com': 30,
+}
+
 # ## TASK VARIABLES
 """Format for task variables is PERIOD {days, hours, minutes}, DURATION, JITTER (seconds), LEEWAY (seconds)."""
 EXPUNGE_CACHE_RECORDS = ('hours', 8, 600, 60)
@@ -94,6 +104,10 @@ RELOCATE_OLD_POSTS = ('hours', 4, 300, 600)
 DELETE_ORPHAN_IMAGES = ('weeks', 1, 3600, 300)
 VACUUM_ANALYZE_DATABASE = ('weeks', 1, 3600, 60)
 
+# Expired archives are deleted and committed this many at a time, with their files deleted by this many threads
+EXPIRED_ARCHIVES_PER_PAGE = 500
+ARCHIVE_DELETE_WORKERS = 8
+
 # ## SUBSCRIPTION VARIABLES
 
 # #### How many items are processed per batch
@@ -108,11 +122,36 @@ ARCHIVE_ELEMENTS_PER_PAGE = 10
 DOWNLOAD_POSTS_PAGE_LIMIT = 20
 EXPIRE_ELEMENTS_PAGE_LIMIT = 20  # unlink, delete, archive
 
+# #### How many element downloads can run at the same time, in total and per media domain
+DOWNLOAD_MAX_WORKERS = 8
+DOWNLOAD_DEFAULT_CONCURRENCY = 2
+DOWNLOAD_SITE_CONCURRENCY = {
+    'i.pximg.net': 4,
+    'pbs.twimg.com': 4,
+    'video.twimg.com': 2,
+}
+
 """
 Note: The combination of per page and page limit for downloading posts and expiring subscription elements will control
 how many items get processed in total, thus controlling roughly how long a task will take when processed automatically.
 """
 
+# ## SIMILARITY VARIABLES
+
+# Decode and hash images across a process pool sized to the CPU count when generating missing image hashes
+PARALLEL_IMAGE_HASHES = False
+PARALLEL_IMAGE_HASHES_PER_PAGE = 200
+
+# ## MEDIA WORKER VARIABLES
+
+# How many jobs of each kind can be processed at the same time by the media worker processes
+MEDIA_WORKER_LIMITS = {
+    'image_hash': 2,
+    'video_preview': 1,
+}
+MEDIA_JOB_MAX_ATTEMPTS = 3
+MEDIA_WORKER_POLL_INTERVAL = 5  # seconds
+
 # ## WATCHDOG VARIABLES
 
 WATCHDOG_MAX_MEMORY_MB = 2048
@@ -130,14 +169,46 @@ ALTERNATE_MOVE_DAYS = None
 MAXIMUM_PAGINATE_LIMIT = 1000
 DEFAULT_PAGINATE_LIMIT = 20
 
+# Index page counts are cached per search for this many seconds
+COUNT_CACHE_TTL = 60
+COUNT_CACHE_SIZE = 1000
+# Use the table statistics from the last ANALYZE for the count of unfiltered index pages
+APPROXIMATE_UNFILTERED_COUNTS = False
+
+# Decoded API data is kept in memory for this many seconds, or until it expires if that is sooner
+API_DATA_CACHE_TTL = 300
+API_DATA_CACHE_SIZE = 2000
+
 MAXIMUM_PROCESS_SUBSCRIPTIONS = 10
 SHOW_SUBSCRIPTIONS_WITH_PENDING_ELEMENTS = 10
 
 EXPIRED_SUBSCRIPTION = True
 
 CHECK_FOREIGN_KEYS = False
+
+# How often recorded user/server activity is written out for the other processes to see, in seconds
+ACTIVITY_FLUSH_INTERVAL = 5
+# Tag changes are logged for the in-process tag indexes for this many seconds before being pruned
+TAG_CHANGE_RETENTION = 86400
+# Same for the image hash changes read by the in-process similarity indexes
+IMAGE_HASH_CHANGE_RETENTION = 86400
+# The error logs rotate to a new segment past this many bytes, and keep this many old segments
+ERROR_LOG_MAX_SIZE = 5 * 1024 * 1024
+ERROR_LOG_SEGMENTS = 5
 USE_ENUMS = True
 
 DEBUG_MODE = False
 DEBUG_LOG = False
 DEBUG_VERBOSE = False
+
+# Collects per-request SQL statistics, which are returned in the X-SQL-* response headers
+SQL_PROFILING = False
+# Also appends the statistics to the bottom of HTML pages
+SQL_PROFILE_PANEL = False
+SQL_PROFILE_SLOWEST = 5
+# Statement shapes executed this many times in one request are reported as possible N+1 queries
+SQL_PROFILE_REPEAT_THRESHOLD = 10
+SQL_PROFILE_HISTORY = 50
+# Records the shape of every statement to DATA_DIRECTORY/query_shapes.jsonl, for use by index_advisor.py
+QUERY_SHAPE_LOGGING = False
+QUERY_SHAPE_FLUSH_INTERVAL = 60
@@ -12,14 +12,14 @@ from sqlalchemy.orm import selectinload
 
 def initialize():
     global SESSION, Post, SimilarityMatch, generate_similarity_matches, missing_similarity_matches_query,\
-        print_info
+        rebuild_all_similarity_matches, print_info
     colorama.init(autoreset=True)
     sys.path.append(os.path.abspath('.'))
     from utility.uprint import print_info
     from app import SESSION
     from app.models import Post, SimilarityMatch
     from app.logical.database.post_db import missing_similarity_matches_query
-    from app.logical.records.similarity_match_rec import generate_similarity_matches
+    from app.logical.records.similarity_match_rec import generate_similarity_matches, rebuild_all_similarity_matches
 
 
 def main(args):
@@ -27,6 +27,9 @@ def main(args):
         SimilarityMatch.query.delete()
         Post.query.update({'simcheck': False})
         SESSION.commit()
+    if args.bulk:
+        rebuild_all_similarity_matches(printer=print_info)
+        return
     query = missing_similarity_matches_query()
     query = query.options(selectinload(Post.image_hashes))
     page = query.limit_paginate(per_page=50)
@@ -46,6 +49,8 @@ if __name__ == '__main__':
     parser = ArgumentParser(description="Fix script to generate similarity matches.")
     parser.add_argument('--expunge', required=False, default=False, action="store_true",
                         help="Expunge all similarity match records.")
+    parser.add_argument('--bulk', required=False, default=False, action="store_true",
+                        help="Rebuild the matches of all posts at once by comparing every pair of image hashes.")
     args = parser.parse_args()
 
     initialize()
@@ -0,0 +1,72 @@
+# FIXES/026_POPULATE_IMAGE_HASH_BANDS.PY
+
+# ## PYTHON IMPORTS
+import os
+import sys
+import colorama
+from argparse import ArgumentParser
+
+# ## EXTERNAL IMPORTS
+from sqlalchemy import not_
+
+
+# ## GLOBAL VARIABLES
+
+PAGE_SIZE = 1000
+
+
+# ## FUNCTIONS
+
+def initialize():
+    global SESSION, ImageHash, ImageHashBand, hash_bands, print_info
+    sys.path.append(os.path.abspath('.'))
+    from app import SESSION
+    from app.models import ImageHash, ImageHashBand
+    from app.models.image_hash import hash_bands
+    from utility.uprint import print_info
+
+
+def populate_image_hash_bands(rebuild):
+    if rebuild:
+        print_info("Removing all image hash bands")
+        ImageHashBand.query.delete()
+        SESSION.commit()
+    band_query = ImageHashBand.query.with_entities(ImageHashBand.image_hash_id)
+    query = ImageHash.query.with_entities(ImageHash.id, ImageHash.hash)
+    query = query.filter(not_(ImageHash.id.in_(band_query)))
+    query = query.order_by(ImageHash.id.asc())
+    last_id = 0
+    total = 0
+    while True:
+        page = query.filter(ImageHash.id > last_id).limit(PAGE_SIZE).all()
+        if len(page) == 0:
+            break
+        band_rows = [{'image_hash_id': id, 'band': band, 'value': value}
+                     for (id, image_hash) in page
+                     for (band, value) in enumerate(hash_bands(image_hash))]
+        SESSION.execute(ImageHashBand.__table__.insert(), band_rows)
+        SESSION.commit()
+        total += len(page)
+        last_id = page[-1][0]
+        print_info(f"populate_image_hash_bands: image hash #{page[0][0]} - #{last_id} / Total({total})")
+
+
+def main(args):
+    """
+    Populates the band lookup table used for image hash candidate selection. Only image hashes without any
+    bands get populated, unless a rebuild is requested, e.g. after changing the band size.
+    """
+    colorama.init(autoreset=True)
+    populate_image_hash_bands(args.rebuild)
+
+
+# ##EXECUTION START
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Fix script to populate the image hash band table.")
+    parser.add_argument('--rebuild', required=False, default=False, action="store_true",
+                        help="Remove all existing bands before populating.")
+    args = parser.parse_args()
+
+    initialize()
+    main(args)
@@ -0,0 +1,64 @@
+# FIXES/027_CONVERT_ERROR_LOGS.PY
+
+# ## PYTHON IMPORTS
+import os
+import sys
+import colorama
+from argparse import ArgumentParser
+
+
+# ## GLOBAL VARIABLES
+
+LEGACY_LOGS = {
+    'error': 'error_log.json',
+    'network': 'network_error_log.json',
+}
+
+
+# ## FUNCTIONS
+
+def initialize():
+    global ERROR_LOGS, DATA_DIRECTORY, load_default, print_info, print_warning
+    sys.path.append(os.path.abspath('.'))
+    from config import DATA_DIRECTORY
+    from app.logical.logger import ERROR_LOGS
+    from utility.file import load_default
+    from utility.uprint import print_info, print_warning
+
+
+def convert_error_log(log_type, keep):
+    legacy_filepath = os.path.join(DATA_DIRECTORY, LEGACY_LOGS[log_type])
+    if not os.path.exists(legacy_filepath):
+        print_warning(f"convert_error_log: {legacy_filepath} not found.")
+        return
+    error_log = ERROR_LOGS[log_type]
+    legacy_entries = load_default(legacy_filepath, [])
+    # Entries logged since upgrading are newer, so they go after the legacy ones
+    current_entries = list(reversed(error_log.page(1, error_log.count())))
+    error_log.clear()
+    for entry in legacy_entries + current_entries:
+        error_log.append(entry)
+    print_info(f"convert_error_log: {len(legacy_entries)} {log_type} entries converted.")
+    if keep:
+        os.replace(legacy_filepath, legacy_filepath + '.bak')
+    else:
+        os.remove(legacy_filepath)
+
+
+def main(args):
+    """Moves the entries of the old JSON error logs, which were rewritten on every error, to the append-only logs."""
+    colorama.init(autoreset=True)
+    for log_type in LEGACY_LOGS:
+        convert_error_log(log_type, args.keep)
+
+
+# ##EXECUTION START
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Fix script to convert the JSON error logs to JSON-lines logs.")
+    parser.add_argument('--keep', required=False, action="store_true", default=False,
+                        help="Rename the old logs to .bak instead of deleting them.")
+    args = parser.parse_args()
+
+    initialize()
+    main(args)
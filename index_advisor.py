@@ -0,0 +1,309 @@
+# INDEX_ADVISOR.PY
+
+"""
+Reads the statement shapes logged with QUERY_SHAPE_LOGGING, runs EXPLAIN QUERY PLAN on each of them, and
+suggests indexes for the ones that scan a whole table or sort with a temporary B-tree.
+The suggestions come from a heuristic read of the statement, so they should be reviewed before being applied.
+"""
+
+# ## PYTHON IMPORTS
+import os
+import re
+import uuid
+import sqlite3
+import datetime
+import colorama
+from argparse import ArgumentParser
+
+# ## PACKAGE IMPORTS
+from config import DB_PATH
+from utility.uprint import print_info, print_warning, print_error
+
+
+# ## GLOBAL VARIABLES
+
+EXPLAINABLE_RG = re.compile(r'^\s*(SELECT|UPDATE|DELETE)\b', re.IGNORECASE)
+TABLE_ALIAS_RG = re.compile(r'\b(?:FROM|JOIN|UPDATE)\s+(\w+)(?:\s+AS\s+(\w+))?', re.IGNORECASE)
+SCAN_RG = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(.*)$')
+TEMP_BTREE_RG = re.compile(r'USE TEMP B-TREE FOR (.+)$')
+FROM_RG = re.compile(r'\sFROM\s', re.IGNORECASE)
+ORDER_BY_RG = re.compile(r'\bORDER BY (.+?)(?:\bLIMIT\b|\bOFFSET\b|\)|$)', re.IGNORECASE | re.DOTALL)
+
+EQUALITY_TEMPLATES = [r'\b%s\.(\w+)\s*(?:=|\bIS\b|\bIN\b)', r'(?:=|\bIS\b)\s*%s\.(\w+)\b']
+RANGE_TEMPLATES = [r'\b%s\.(\w+)\s*(?:<|>|\bBETWEEN\b)', r'(?:<|>)=?\s*%s\.(\w+)\b']
+
+# Selected columns are only added to make the index covering if there are only a few of them
+MAX_COVERING_COLUMNS = 3
+
+MIGRATION_TEMPLATE = '''# MIGRATIONS/VERSIONS/{revision_upper}_ADD_ADVISED_INDEXES.PY
+"""Add advised indexes
+
+Revision ID: {revision}
+Revises: {down_revision}
+Create Date: {create_date}
+
+"""
+
+# ## EXTERNAL IMPORTS
+from alembic import op
+
+# ## PACKAGE IMPORTS
+from migrations.indexes import create_index, drop_index
+
+
+# ## GLOBAL VARIABLES
+
+# revision identifiers, used by Alembic.
+revision = '{revision}'
+down_revision = '{down_revision}'
+branch_labels = None
+depends_on = None
+
+# Table name, index name, index columns
+ADVISED_INDEXES = [
+{index_lines}
+]
+
+
+# ## FUNCTIONS
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_():
+    for (table_name, index_name, columns) in ADVISED_INDEXES:
+        print("Creating index", index_name)
+        create_index(table_name, index_name, columns, False)
+
+
+def downgrade_():
+    for (table_name, index_name, _) in reversed(ADVISED_INDEXES):
+        drop_index(table_name, index_name)
+
+
+def upgrade_jobs():
+    pass
+
+
+def downgrade_jobs():
+    pass
+'''
+
+
+# ## FUNCTIONS
+
+# #### Initialize functions
+
+def initialize():
+    global load_query_shapes, QUERY_SHAPES_FILEPATH
+    from app.logical.query_shapes import load_query_shapes, QUERY_SHAPES_FILEPATH
+
+
+# #### Helper functions
+
+def explain_plan(connection, statement):
+    parameters = [None] * statement.count('?')
+    return [row[3] for row in connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters)]
+
+
+def index_name(table_name, columns):
+    return 'ix_%s_%s' % (table_name, '_'.join(columns))
+
+
+def table_aliases(statement):
+    aliases = {}
+    for (table_name, alias) in TABLE_ALIAS_RG.findall(statement):
+        aliases[alias or table_name] = table_name
+    return aliases
+
+
+def table_indexes(connection, table_name):
+    indexes = []
+    for row in connection.execute('PRAGMA index_list(%s)' % table_name):
+        indexes.append([info[2] for info in connection.execute('PRAGMA index_info(%s)' % row[1])])
+    return indexes
+
+
+# #### Analysis functions
+
+def find_plan_issues(plan, aliases):
+    """Returns the tables that are fully scanned and the clauses that need a temporary B-tree."""
+    scans, sorts = [], []
+    for detail in plan:
+        match = SCAN_RG.match(detail)
+        if match and 'USING' not in match.group(3):
+            name = match.group(2) or match.group(1)
+            scans.append(aliases.get(name, name))
+        match = TEMP_BTREE_RG.search(detail)
+        if match:
+            sorts.append(match.group(1))
+    return scans, sorts
+
+
+def suggest_columns(statement, table_name, aliases):
+    """Equality columns first, then the ORDER BY columns, then a single range column, then the selected columns."""
+    from_match = FROM_RG.search(statement)
+    # UPDATE statements have no FROM clause, nor any selected columns to cover
+    from_index = from_match.start() if from_match is not None else 0
+    head, body = statement[:from_index], statement[from_index:]
+    order_match = ORDER_BY_RG.search(body)
+    columns = []
+    for alias in (alias for (alias, name) in aliases.items() if name == table_name):
+        equality = _column_matches(EQUALITY_TEMPLATES, alias, body)
+        ordering = re.findall(r'\b%s\.(\w+)' % re.escape(alias), order_match.group(1)) if order_match else []
+        ranges = _column_matches(RANGE_TEMPLATES, alias, body)
+        for columnname in equality + ordering + ranges[:1]:
+            if columnname not in columns:
+                columns.append(columnname)
+        if len(columns) == 0:
+            continue
+        selected = [name for name in re.findall(r'\b%s\.(\w+)' % re.escape(alias), head) if name not in columns]
+        if len(selected) <= MAX_COVERING_COLUMNS:
+            columns += [name for name in selected if name != 'id']
+        break
+    return columns
+
+
+def is_already_indexed(connection, table_name, columns):
+    if columns[0] == 'id':
+        return True
+    return any(index[:len(columns)] == columns for index in table_indexes(connection, table_name))
+
+
+def verify_suggestion(connection, statement, table_name, columns):
+    """Creates the index inside a transaction that is then rolled back, and returns the new plan."""
+    connection.execute('BEGIN')
+    try:
+        name = index_name(table_name, columns)
+        connection.execute('CREATE INDEX %s ON %s (%s)' % (name, table_name, ', '.join(columns)))
+        return explain_plan(connection, statement)
+    finally:
+        connection.execute('ROLLBACK')
+
+
+def analyze_shapes(connection, shapes, args):
+    suggestions = {}
+    for (shape, entry) in sorted(shapes.items(), key=lambda x: x[1]['time'], reverse=True):
+        statement = entry['statement']
+        if entry['count'] < args.min_count or not EXPLAINABLE_RG.match(statement):
+            continue
+        try:
+            plan = explain_plan(connection, statement)
+        except sqlite3.Error as e:
+            # Statements for the jobs database, or for tables that have since been migrated
+            print_warning("Skipping statement:", e)
+            continue
+        aliases = table_aliases(statement)
+        scans, sorts = find_plan_issues(plan, aliases)
+        if len(scans) == 0 and len(sorts) == 0:
+            continue
+        print("\n%d executions / %0.2fms total" % (entry['count'], entry['time']))
+        print(shape)
+        for detail in plan:
+            print('   ', detail)
+        tables = scans if len(scans) else list(aliases.values())[:1]
+        for columns_key in suggest_indexes(connection, statement, dict.fromkeys(tables), aliases, args.verify):
+            suggestions.setdefault(columns_key, 0.0)
+            suggestions[columns_key] += entry['time']
+    return suggestions
+
+
+def suggest_indexes(connection, statement, tables, aliases, verify):
+    suggestions = []
+    for table_name in tables:
+        columns = suggest_columns(statement, table_name, aliases)
+        if len(columns) == 0 or is_already_indexed(connection, table_name, columns):
+            continue
+        print_info("Suggested index: %s(%s)" % (table_name, ', '.join(columns)))
+        if verify:
+            for detail in verify_suggestion(connection, statement, table_name, columns):
+                print('   ', detail)
+        suggestions.append((table_name, tuple(columns)))
+    return suggestions
+
+
+# #### Migration functions
+
+def get_migration_head():
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+    config = Config(os.path.join(directory, 'alembic.ini'))
+    config.set_main_option('script_location', directory)
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+def generate_migration(suggestions):
+    revision = uuid.uuid4().hex[:12]
+    down_revision = get_migration_head()
+    index_lines = []
+    for (table_name, columns) in suggestions:
+        index_lines.append("    ('%s', '%s', %s)," % (table_name, index_name(table_name, columns), list(columns)))
+    text = MIGRATION_TEMPLATE.format(revision=revision, revision_upper=revision.upper(),
+                                     down_revision=down_revision, create_date=datetime.datetime.now(),
+                                     index_lines='\n'.join(index_lines))
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations', 'database_versions')
+    filepath = os.path.join(directory, '%s_add_advised_indexes.py' % revision)
+    with open(filepath, 'w', encoding='utf-8') as file:
+        file.write(text)
+    return filepath
+
+
+# #### Main functions
+
+def main(args):
+    colorama.init(autoreset=True)
+    initialize()
+    filepath = args.file or QUERY_SHAPES_FILEPATH
+    shapes = load_query_shapes(filepath)
+    if len(shapes) == 0:
+        print_error("No query shapes found at", filepath)
+        exit(-1)
+    print("Analyzing %d statement shapes" % len(shapes))
+    connection = sqlite3.connect(DB_PATH, isolation_level=None)
+    try:
+        suggestions = analyze_shapes(connection, shapes, args)
+    finally:
+        connection.close()
+    if len(suggestions) == 0:
+        print_info("\nNo indexes to suggest.")
+        return
+    print("\nSuggested indexes by total time:")
+    suggestions = sorted(suggestions, key=lambda x: suggestions[x], reverse=True)
+    for (table_name, columns) in suggestions:
+        print('   ', index_name(table_name, columns))
+    if args.generate:
+        print_info("\nMigration written to", generate_migration(suggestions))
+        print_warning("Add the matching DB.Index entries to the initialize function of each model.")
+
+
+# #### Private functions
+
+def _column_matches(templates, alias, statement):
+    columns = []
+    for template in templates:
+        for columnname in re.findall(template % re.escape(alias), statement, re.IGNORECASE):
+            if columnname not in columns:
+                columns.append(columnname)
+    return columns
+
+
+# ##EXECUTION START
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Suggests indexes for the statements logged with QUERY_SHAPE_LOGGING.")
+    parser.add_argument('--file', required=False, type=str, help="Query shapes file. Defaults to the data directory.")
+    parser.add_argument('--min-count', required=False, type=int, default=1,
+                        help="Ignore statements executed fewer times than this.")
+    parser.add_argument('--verify', required=False, action="store_true", default=False,
+                        help="Build each index in a rolled back transaction and show the new plan.")
+    parser.add_argument('--generate', required=False, action="store_true", default=False,
+                        help="Write a migration that creates the suggested indexes.")
+    args = parser.parse_args()
+
+    main(args)
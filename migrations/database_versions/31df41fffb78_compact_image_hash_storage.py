@@ -0,0 +1,119 @@
+# MIGRATIONS/VERSIONS/31DF41FFFB78_COMPACT_IMAGE_HASH_STORAGE.PY
+"""Compact image hash storage
+
+Revision ID: 31df41fffb78
+Revises: 8c3e136756aa
+Create Date: 2026-10-18 10:12:44.318265
+
+"""
+
+# ## PACKAGE IMPORTS
+from migrations import batch_alter_table
+from migrations.tables import create_table, drop_table, remove_temp_tables
+from migrations.columns import add_column, add_columns, drop_column, drop_columns, alter_column, alter_columns,\
+    transfer_columns
+from migrations.indexes import create_index
+
+
+# ## GLOBAL VARIABLES
+
+# revision identifiers, used by Alembic.
+revision = '31df41fffb78'
+down_revision = '8c3e136756aa'
+branch_labels = None
+depends_on = None
+
+CHUNK_COLUMNS = ['chunk%02d' % i for i in range(0, 32)]
+
+IMAGE_HASH_BAND_TABLE_CONFIG = {
+    'col_config': [
+        {
+            'name': 'image_hash_id',
+            'type': 'INTEGER',
+            'nullable': False,
+        }, {
+            'name': 'band',
+            'type': 'INTEGER',
+            'nullable': False,
+        }, {
+            'name': 'value',
+            'type': 'INTEGER',
+            'nullable': False,
+        },
+    ],
+    'pk_config': [
+        {
+            'name': 'pk_image_hash_band',
+            'columns': ['image_hash_id', 'band'],
+        },
+    ],
+    'fk_config': [
+        {
+            'name': 'fk_image_hash_band_image_hash_id_image_hash',
+            'columns': ['image_hash_id'],
+            'references': ['image_hash.id'],
+        },
+    ],
+    'with_rowid': False,
+}
+
+
+# ## FUNCTIONS
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_():
+    remove_temp_tables(['image_hash'])
+
+    print("Adding hash column")
+    add_column('image_hash', 'hash', 'BLOB')
+
+    print("Populating hash column")
+    from_config = {name: 'BLOB' for name in CHUNK_COLUMNS}
+    for (_id, mapped_data, update) in transfer_columns('image_hash', from_config, {'hash': 'BLOB'}):
+        update(hash=b''.join(mapped_data[name] for name in CHUNK_COLUMNS))
+
+    print("Dropping chunk columns and setting hash as non-nullable")
+    with batch_alter_table('image_hash') as batch_op:
+        drop_columns(None, CHUNK_COLUMNS, batch_op=batch_op)
+        alter_column(None, 'hash', 'BLOB', {'nullable': False}, batch_op=batch_op)
+
+    print("Creating image_hash_band table")
+    create_table('image_hash_band', **IMAGE_HASH_BAND_TABLE_CONFIG)
+    create_index('image_hash_band', 'ix_image_hash_band_band_value', ['band', 'value'], False)
+
+    print("Run fixes/026_populate_image_hash_bands.py to populate the image_hash_band table")
+
+
+def downgrade_():
+    remove_temp_tables(['image_hash'])
+
+    print("Dropping image_hash_band table")
+    drop_table('image_hash_band')
+
+    print("Adding chunk columns")
+    add_columns('image_hash', [(name, 'BLOB') for name in CHUNK_COLUMNS])
+
+    print("Populating chunk columns")
+    to_config = {name: 'BLOB' for name in CHUNK_COLUMNS}
+    for (_id, mapped_data, update) in transfer_columns('image_hash', {'hash': 'BLOB'}, to_config):
+        update(**{name: mapped_data['hash'][i: i + 1] for (i, name) in enumerate(CHUNK_COLUMNS)})
+
+    print("Dropping hash column and setting chunk columns as non-nullable")
+    with batch_alter_table('image_hash') as batch_op:
+        drop_column(None, 'hash', batch_op=batch_op)
+        alter_columns(None, [(name, 'BLOB', {'nullable': False}) for name in CHUNK_COLUMNS], batch_op=batch_op)
+
+
+def upgrade_jobs():
+    pass
+
+
+def downgrade_jobs():
+    pass
@@ -0,0 +1,160 @@
+# MIGRATIONS/VERSIONS/4D7E2B8C1F36_ADD_PRUNE_CANDIDATE_QUEUE.PY
+"""Add prune candidate queue
+
+Revision ID: 4d7e2b8c1f36
+Revises: e2b9d6c41a73
+Create Date: 2026-10-18 22:12:47.530918
+
+"""
+
+# ## EXTERNAL IMPORTS
+from alembic import op
+
+# ## PACKAGE IMPORTS
+from migrations.indexes import create_index, drop_index
+
+
+# ## GLOBAL VARIABLES
+
+# revision identifiers, used by Alembic.
+revision = '4d7e2b8c1f36'
+down_revision = 'e2b9d6c41a73'
+branch_labels = None
+depends_on = None
+
+# Pruneable table -> every table and column that references it
+PRUNE_REFERENCES = {
+    'tag': [
+        ('illust_tags', 'tag_id'),
+        ('post_tags', 'tag_id'),
+    ],
+    'label': [
+        ('artist', 'site_account_id'),
+        ('artist', 'name_id'),
+        ('artist_names', 'label_id'),
+        ('artist_site_accounts', 'label_id'),
+        ('booru', 'name_id'),
+        ('booru_names', 'label_id'),
+    ],
+    'description': [
+        ('illust', 'title_id'),
+        ('illust', 'commentary_id'),
+        ('illust_titles', 'description_id'),
+        ('illust_commentaries', 'description_id'),
+        ('additional_commentaries', 'description_id'),
+        ('artist', 'profile_id'),
+        ('artist_profiles', 'description_id'),
+    ],
+    'ugoira': [
+        ('post', 'ugoira_id'),
+        ('illust_url', 'ugoira_id'),
+    ],
+}
+
+CREATE_PRUNE_CANDIDATE_TABLE = """
+CREATE TABLE IF NOT EXISTS prune_candidate (
+    table_name TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    CONSTRAINT pk_prune_candidate PRIMARY KEY (table_name, item_id)
+) WITHOUT ROWID
+"""
+
+# New items start out unreferenced
+CREATE_INSERT_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS prune_{item_table}_insert AFTER INSERT ON {item_table} BEGIN
+    INSERT OR IGNORE INTO prune_candidate(table_name, item_id) VALUES ('{item_table}', new.id);
+END
+"""
+
+CREATE_DELETE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS prune_{item_table}_{table}_{column}_delete AFTER DELETE ON {table}
+WHEN old.{column} IS NOT NULL BEGIN
+    INSERT OR IGNORE INTO prune_candidate(table_name, item_id) VALUES ('{item_table}', old.{column});
+END
+"""
+
+CREATE_UPDATE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS prune_{item_table}_{table}_{column}_update AFTER UPDATE OF {column} ON {table}
+WHEN old.{column} IS NOT NULL AND old.{column} IS NOT new.{column} BEGIN
+    INSERT OR IGNORE INTO prune_candidate(table_name, item_id) VALUES ('{item_table}', old.{column});
+END
+"""
+
+# The pruning checks each candidate for references, so every referencing column needs an index
+REVERSE_INDEXES = [
+    ('illust_tags', 'ix_illust_tags_tag_id_illust_id', ['tag_id', 'illust_id'], {}),
+    ('post_tags', 'ix_post_tags_tag_id_post_id', ['tag_id', 'post_id'], {}),
+    ('artist_names', 'ix_artist_names_label_id_artist_id', ['label_id', 'artist_id'], {}),
+    ('artist_site_accounts', 'ix_artist_site_accounts_label_id_artist_id', ['label_id', 'artist_id'], {}),
+    ('booru_names', 'ix_booru_names_label_id_booru_id', ['label_id', 'booru_id'], {}),
+    ('illust_titles', 'ix_illust_titles_description_id_illust_id', ['description_id', 'illust_id'], {}),
+    ('illust_commentaries', 'ix_illust_commentaries_description_id_illust_id', ['description_id', 'illust_id'], {}),
+    ('additional_commentaries', 'ix_additional_commentaries_description_id_illust_id',
+     ['description_id', 'illust_id'], {}),
+    ('artist_profiles', 'ix_artist_profiles_description_id_artist_id', ['description_id', 'artist_id'], {}),
+    ('artist', 'ix_artist_site_account_id', ['site_account_id'], {}),
+    ('artist', 'ix_artist_name_id', ['name_id'], {'sqlite_where': 'name_id IS NOT NULL'}),
+    ('artist', 'ix_artist_profile_id', ['profile_id'], {'sqlite_where': 'profile_id IS NOT NULL'}),
+    ('booru', 'ix_booru_name_id', ['name_id'], {'sqlite_where': 'name_id IS NOT NULL'}),
+    ('illust', 'ix_illust_title_id', ['title_id'], {'sqlite_where': 'title_id IS NOT NULL'}),
+    ('illust', 'ix_illust_commentary_id', ['commentary_id'], {'sqlite_where': 'commentary_id IS NOT NULL'}),
+    ('post', 'ix_post_ugoira_id', ['ugoira_id'], {'sqlite_where': 'ugoira_id IS NOT NULL'}),
+    ('illust_url', 'ix_illust_url_ugoira_id', ['ugoira_id'], {'sqlite_where': 'ugoira_id IS NOT NULL'}),
+]
+
+# Every existing item gets checked on the first run
+POPULATE_PRUNE_CANDIDATES = """
+INSERT INTO prune_candidate(table_name, item_id)
+SELECT '{item_table}', id FROM {item_table}
+"""
+
+
+# ## FUNCTIONS
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_():
+    connection = op.get_bind()
+
+    for (table_name, index_name, columns, kwargs) in REVERSE_INDEXES:
+        print("Creating index", index_name)
+        create_index(table_name, index_name, columns, False, **kwargs)
+
+    print("Creating prune_candidate table")
+    connection.execute(CREATE_PRUNE_CANDIDATE_TABLE)
+
+    for (item_table, references) in PRUNE_REFERENCES.items():
+        print("Creating prune triggers for", item_table)
+        connection.execute(CREATE_INSERT_TRIGGER.format(item_table=item_table))
+        for (table, column) in references:
+            format_args = {'item_table': item_table, 'table': table, 'column': column}
+            connection.execute(CREATE_DELETE_TRIGGER.format(**format_args))
+            connection.execute(CREATE_UPDATE_TRIGGER.format(**format_args))
+        connection.execute(POPULATE_PRUNE_CANDIDATES.format(item_table=item_table))
+
+
+def downgrade_():
+    connection = op.get_bind()
+    for (item_table, references) in PRUNE_REFERENCES.items():
+        connection.execute("DROP TRIGGER IF EXISTS prune_%s_insert" % item_table)
+        for (table, column) in references:
+            connection.execute("DROP TRIGGER IF EXISTS prune_%s_%s_%s_delete" % (item_table, table, column))
+            connection.execute("DROP TRIGGER IF EXISTS prune_%s_%s_%s_update" % (item_table, table, column))
+    connection.execute("DROP TABLE IF EXISTS prune_candidate")
+
+    for (table_name, index_name, *_) in reversed(REVERSE_INDEXES):
+        drop_index(table_name, index_name)
+
+
+def upgrade_jobs():
+    pass
+
+
+def downgrade_jobs():
+    pass
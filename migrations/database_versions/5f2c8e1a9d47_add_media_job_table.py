@@ -0,0 +1,90 @@
+# MIGRATIONS/VERSIONS/5F2C8E1A9D47_ADD_MEDIA_JOB_TABLE.PY
+"""Add media job table
+
+Revision ID: 5f2c8e1a9d47
+Revises: 31df41fffb78
+Create Date: 2026-10-18 13:41:07.552804
+
+"""
+
+# ## PACKAGE IMPORTS
+from migrations.tables import create_table, drop_table
+from migrations.indexes import create_index
+
+
+# ## GLOBAL VARIABLES
+
+# revision identifiers, used by Alembic.
+revision = '5f2c8e1a9d47'
+down_revision = '31df41fffb78'
+branch_labels = None
+depends_on = None
+
+MEDIA_JOB_TABLE_CONFIG = {
+    'col_config': [
+        {
+            'name': 'id',
+            'type': 'INTEGER',
+            'nullable': False,
+        }, {
+            'name': 'kind',
+            'type': 'TEXT',
+            'nullable': False,
+        }, {
+            'name': 'post_id',
+            'type': 'INTEGER',
+            'nullable': False,
+        }, {
+            'name': 'status',
+            'type': 'TEXT',
+            'nullable': False,
+        }, {
+            'name': 'attempts',
+            'type': 'INTEGER',
+            'nullable': False,
+        }, {
+            'name': 'error',
+            'type': 'TEXT',
+            'nullable': True,
+        }, {
+            'name': 'created',
+            'type': 'REAL',
+            'nullable': False,
+        },
+    ],
+    'pk_config': [
+        {
+            'name': 'pk_media_job',
+            'columns': ['id'],
+        },
+    ],
+    'with_rowid': True,
+}
+
+
+# ## FUNCTIONS
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_():
+    pass
+
+
+def downgrade_():
+    pass
+
+
+def upgrade_jobs():
+    print("Creating media_job table")
+    create_table('media_job', **MEDIA_JOB_TABLE_CONFIG)
+    create_index('media_job', 'ix_media_job_kind_status', ['kind', 'status'], False)
+
+
+def downgrade_jobs():
+    drop_table('media_job')
@@ -0,0 +1,63 @@
+# MIGRATIONS/VERSIONS/8B3D4F6A2C19_ADD_UNIQUE_INDEX_TO_API_DATA.PY
+"""Add unique index to api data
+
+Revision ID: 8b3d4f6a2c19
+Revises: 5f2c8e1a9d47
+Create Date: 2026-10-18 20:42:15.318406
+
+"""
+
+# ## EXTERNAL IMPORTS
+from alembic import op
+
+# ## PACKAGE IMPORTS
+from migrations.indexes import create_index, drop_index
+
+
+# ## GLOBAL VARIABLES
+
+# revision identifiers, used by Alembic.
+revision = '8b3d4f6a2c19'
+down_revision = '5f2c8e1a9d47'
+branch_labels = None
+depends_on = None
+
+API_DATA_DEDUPLICATE = """
+DELETE FROM api_data
+WHERE id NOT IN (
+    SELECT MAX(id) FROM api_data
+    GROUP BY site_id, type_id, data_id
+)
+"""
+
+
+# ## FUNCTIONS
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_():
+    connection = op.get_bind()
+
+    print("Removing duplicate api data")
+    connection.execute(API_DATA_DEDUPLICATE)
+
+    print("Creating unique index on api data")
+    create_index('api_data', 'ix_api_data_site_id_type_id_data_id', ['site_id', 'type_id', 'data_id'], True)
+
+
+def downgrade_():
+    drop_index('api_data', 'ix_api_data_site_id_type_id_data_id')
+
+
+def upgrade_jobs():
+    pass
+
+
+def downgrade_jobs():
+    pass
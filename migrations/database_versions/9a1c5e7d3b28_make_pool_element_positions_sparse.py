@@ -0,0 +1,83 @@
+# MIGRATIONS/VERSIONS/9A1C5E7D3B28_MAKE_POOL_ELEMENT_POSITIONS_SPARSE.PY
+"""Make pool element positions sparse
+
+Revision ID: 9a1c5e7d3b28
+Revises: 4d7e2b8c1f36
+Create Date: 2026-10-18 22:48:19.204715
+
+"""
+
+# ## EXTERNAL IMPORTS
+from alembic import op
+
+# ## PACKAGE IMPORTS
+from migrations.indexes import create_index, drop_index
+
+
+# ## GLOBAL VARIABLES
+
+# revision identifiers, used by Alembic.
+revision = '9a1c5e7d3b28'
+down_revision = '4d7e2b8c1f36'
+branch_labels = None
+depends_on = None
+
+# Must match POSITION_SPACING in app/models/pool_element.py
+POSITION_SPACING = 1024
+
+SPREAD_POSITIONS = "UPDATE pool_element SET position = position * %d" % POSITION_SPACING
+
+# Turns the keys back into dense 0 based positions. The ranks are taken before updating, since a correlated
+# subquery would see the rows that have already been updated.
+CREATE_POSITION_RANKS = """
+CREATE TEMPORARY TABLE pool_element_rank (
+    id INTEGER NOT NULL PRIMARY KEY,
+    rank INTEGER NOT NULL
+)
+"""
+
+POPULATE_POSITION_RANKS = """
+INSERT INTO pool_element_rank(id, rank)
+SELECT id, ROW_NUMBER() OVER (PARTITION BY pool_id ORDER BY position, id) - 1 FROM pool_element
+"""
+
+COMPACT_POSITIONS = """
+UPDATE pool_element SET position = (SELECT rank FROM pool_element_rank WHERE pool_element_rank.id = pool_element.id)
+"""
+
+
+# ## FUNCTIONS
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_():
+    connection = op.get_bind()
+
+    print("Creating pool_id/position index on pool element")
+    create_index('pool_element', 'ix_pool_element_pool_id_position', ['pool_id', 'position'], False)
+
+    print("Spreading out pool element positions")
+    connection.execute(SPREAD_POSITIONS)
+
+
+def downgrade_():
+    connection = op.get_bind()
+    connection.execute(CREATE_POSITION_RANKS)
+    connection.execute(POPULATE_POSITION_RANKS)
+    connection.execute(COMPACT_POSITIONS)
+    connection.execute("DROP TABLE pool_element_rank")
+    drop_index('pool_element', 'ix_pool_element_pool_id_position')
+
+
+def upgrade_jobs():
+    pass
+
+
+def downgrade_jobs():
+    pass
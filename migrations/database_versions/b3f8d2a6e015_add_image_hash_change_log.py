@@ -0,0 +1,79 @@
+# MIGRATIONS/VERSIONS/B3F8D2A6E015_ADD_IMAGE_HASH_CHANGE_LOG.PY
+"""Add image hash change log
+
+Revision ID: b3f8d2a6e015
+Revises: 9a1c5e7d3b28
+Create Date: 2026-10-18 23:52:41.617308
+
+"""
+
+# ## EXTERNAL IMPORTS
+from alembic import op
+
+
+# ## GLOBAL VARIABLES
+
+# revision identifiers, used by Alembic.
+revision = 'b3f8d2a6e015'
+down_revision = '9a1c5e7d3b28'
+branch_labels = None
+depends_on = None
+
+CREATE_IMAGE_HASH_CHANGE_TABLE = """
+CREATE TABLE IF NOT EXISTS image_hash_change (
+    id INTEGER NOT NULL CONSTRAINT pk_image_hash_change PRIMARY KEY AUTOINCREMENT,
+    image_hash_id INTEGER NOT NULL,
+    action INTEGER NOT NULL,
+    created REAL NOT NULL
+)
+"""
+
+# The action is 1 for an added or updated hash and -1 for a removed hash
+CREATE_CHANGE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS image_hash_change_{event} AFTER {event} ON image_hash BEGIN
+    INSERT INTO image_hash_change(image_hash_id, action, created)
+    VALUES ({row}.id, {action}, (julianday('now') - 2440587.5) * 86400.0);
+END
+"""
+
+CHANGE_EVENTS = [
+    ('insert', 'new', 1),
+    ('delete', 'old', -1),
+    ('update', 'new', 1),
+]
+
+
+# ## FUNCTIONS
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_():
+    connection = op.get_bind()
+
+    print("Creating image_hash_change table")
+    connection.execute(CREATE_IMAGE_HASH_CHANGE_TABLE)
+
+    print("Creating image hash change triggers")
+    for (event, row, action) in CHANGE_EVENTS:
+        connection.execute(CREATE_CHANGE_TRIGGER.format(event=event, row=row, action=action))
+
+
+def downgrade_():
+    connection = op.get_bind()
+    for (event, _, _) in CHANGE_EVENTS:
+        connection.execute("DROP TRIGGER IF EXISTS image_hash_change_%s" % event)
+    connection.execute("DROP TABLE IF EXISTS image_hash_change")
+
+
+def upgrade_jobs():
+    pass
+
+
+def downgrade_jobs():
+    pass
@@ -0,0 +1,98 @@
+# MIGRATIONS/VERSIONS/C7E1A3F95B20_ADD_FULL_TEXT_INDEXES.PY
+"""Add full text indexes
+
+Revision ID: c7e1a3f95b20
+Revises: 8b3d4f6a2c19
+Create Date: 2026-10-18 21:05:32.164870
+
+"""
+
+# ## PYTHON IMPORTS
+import sqlite3
+
+# ## EXTERNAL IMPORTS
+from alembic import op
+
+
+# ## GLOBAL VARIABLES
+
+# revision identifiers, used by Alembic.
+revision = 'c7e1a3f95b20'
+down_revision = '8b3d4f6a2c19'
+branch_labels = None
+depends_on = None
+
+FULL_TEXT_INDEXES = [
+    ('description', 'body'),
+    ('tag', 'name'),
+    ('label', 'name'),
+    ('notation', 'body'),
+]
+
+# The trigram tokenizer matches substrings, which also works for text without spaces (e.g. Japanese).
+FULL_TEXT_TOKENIZER = 'trigram' if sqlite3.sqlite_version_info >= (3, 34, 0) else 'unicode61 remove_diacritics 2'
+
+CREATE_FULL_TEXT_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts
+USING fts5({column}, content='{table}', content_rowid='id', tokenize='{tokenizer}')
+"""
+
+CREATE_INSERT_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+    INSERT INTO {table}_fts(rowid, {column}) VALUES (new.id, new.{column});
+END
+"""
+
+CREATE_DELETE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+    INSERT INTO {table}_fts({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column});
+END
+"""
+
+CREATE_UPDATE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {column} ON {table} BEGIN
+    INSERT INTO {table}_fts({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column});
+    INSERT INTO {table}_fts(rowid, {column}) VALUES (new.id, new.{column});
+END
+"""
+
+REBUILD_FULL_TEXT_TABLE = "INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"
+
+
+# ## FUNCTIONS
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_():
+    connection = op.get_bind()
+    for (table, column) in FULL_TEXT_INDEXES:
+        print("Creating full text index for %s.%s" % (table, column))
+        format_args = {'table': table, 'column': column, 'tokenizer': FULL_TEXT_TOKENIZER}
+        connection.execute(CREATE_FULL_TEXT_TABLE.format(**format_args))
+        connection.execute(CREATE_INSERT_TRIGGER.format(**format_args))
+        connection.execute(CREATE_DELETE_TRIGGER.format(**format_args))
+        connection.execute(CREATE_UPDATE_TRIGGER.format(**format_args))
+        connection.execute(REBUILD_FULL_TEXT_TABLE.format(**format_args))
+
+
+def downgrade_():
+    connection = op.get_bind()
+    for (table, column) in FULL_TEXT_INDEXES:
+        print("Dropping full text index for %s.%s" % (table, column))
+        for trigger in ['insert', 'delete', 'update']:
+            connection.execute("DROP TRIGGER IF EXISTS %s_fts_%s" % (table, trigger))
+        connection.execute("DROP TABLE IF EXISTS %s_fts" % table)
+
+
+def upgrade_jobs():
+    pass
+
+
+def downgrade_jobs():
+    pass
@@ -0,0 +1,86 @@
+# MIGRATIONS/VERSIONS/E2B9D6C41A73_ADD_TAG_CHANGE_LOG.PY
+"""Add tag change log
+
+Revision ID: e2b9d6c41a73
+Revises: c7e1a3f95b20
+Create Date: 2026-10-18 21:38:04.902115
+
+"""
+
+# ## EXTERNAL IMPORTS
+from alembic import op
+
+
+# ## GLOBAL VARIABLES
+
+# revision identifiers, used by Alembic.
+revision = 'e2b9d6c41a73'
+down_revision = 'c7e1a3f95b20'
+branch_labels = None
+depends_on = None
+
+TAG_TABLES = [
+    ('post_tags', 'post_id'),
+    ('illust_tags', 'illust_id'),
+]
+
+# The IDs must never be reused once the log has been emptied, since each process reads the changes after the last
+# ID that it has seen.
+CREATE_TAG_CHANGE_TABLE = """
+CREATE TABLE IF NOT EXISTS tag_change (
+    id INTEGER NOT NULL CONSTRAINT pk_tag_change PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    action INTEGER NOT NULL,
+    created REAL NOT NULL
+)
+"""
+
+# The action is 1 for an added tag and -1 for a removed tag
+CREATE_CHANGE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS {table}_change_{event} AFTER {event} ON {table} BEGIN
+    INSERT INTO tag_change(table_name, item_id, tag_id, action, created)
+    VALUES ('{table}', {row}.{column}, {row}.tag_id, {action}, (julianday('now') - 2440587.5) * 86400.0);
+END
+"""
+
+
+# ## FUNCTIONS
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_():
+    connection = op.get_bind()
+
+    print("Creating tag_change table")
+    connection.execute(CREATE_TAG_CHANGE_TABLE)
+
+    for (table, column) in TAG_TABLES:
+        print("Creating tag change triggers on %s" % table)
+        connection.execute(CREATE_CHANGE_TRIGGER.format(table=table, column=column, event='insert', row='new',
+                                                        action=1))
+        connection.execute(CREATE_CHANGE_TRIGGER.format(table=table, column=column, event='delete', row='old',
+                                                        action=-1))
+
+
+def downgrade_():
+    connection = op.get_bind()
+    for (table, _) in TAG_TABLES:
+        connection.execute("DROP TRIGGER IF EXISTS %s_change_insert" % table)
+        connection.execute("DROP TRIGGER IF EXISTS %s_change_delete" % table)
+    connection.execute("DROP TABLE IF EXISTS tag_change")
+
+
+def upgrade_jobs():
+    pass
+
+
+def downgrade_jobs():
+    pass
@@ -10,7 +10,7 @@ from alembic import context
 
 USE_TWOPHASE = False
 
-IGNORE_TABLES = ['sqlite_stat1', 'sqlite_stat4', 'server_info']
+IGNORE_TABLES = ['sqlite_stat1', 'sqlite_stat4', 'server_info', 'tag_change', 'image_hash_change', 'prune_candidate']
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -57,13 +57,18 @@ def get_metadata(bind):
 
 def include_object(object, name, type_, reflected, compare_to):
     if (
-        type_ == "table" and name in IGNORE_TABLES
+        type_ == "table" and (name in IGNORE_TABLES or _is_full_text_table(name))
     ):
         return False
     else:
         return True
 
 
+def _is_full_text_table(name):
+    """The FTS5 virtual tables and their shadow tables are managed by raw SQL, not by the models."""
+    return name.endswith('_fts') or '_fts_' in name
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
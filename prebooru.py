@@ -73,6 +73,7 @@ def initialize_controllers():
     PREBOORU_APP.register_blueprint(controllers.static.bp)
     PREBOORU_APP.register_blueprint(controllers.task.bp)
     PREBOORU_APP.register_blueprint(controllers.job.bp)
+    PREBOORU_APP.register_blueprint(controllers.sql_profile.bp)
     PREBOORU_APP.register_blueprint(controllers.image_hash.bp)
     PREBOORU_APP.register_blueprint(controllers.similarity_match.bp)
     if not HAS_EXTERNAL_IMAGE_SERVER:
@@ -207,10 +208,18 @@ def start_server(args):
         # Scheduled tasks must be added only after everything else has been initialized
         from app.logical.tasks import schedule  # noqa: F401
         from app.logical.database.server_info_db import initialize_server_fields
+        from app.logical.similarity_index import load_similarity_index
+        from app.logical.tag_index import load_tag_indexes
+        from app.logical.media_worker import start_media_worker
+        from app.logical.utility import SessionThread
         from app import SESSION
         initialize_server_callbacks(args)
         initialize_server_checks()
         initialize_server_fields()
+        # Build the similarity and tag indexes in the background so that they don't hold up the server startup
+        SessionThread(target=load_similarity_index, daemon=True).start()
+        SessionThread(target=load_tag_indexes, daemon=True).start()
+        start_media_worker()
         with SESSION.connection() as conn:
             validate_version(conn)
             validate_integrity(conn)
@@ -266,6 +275,16 @@ def init_db(args):
         stamp()
 
 
+def generate_hashes(args):
+    import colorama
+    from app.logical.records.post_rec import generate_missing_image_hashes
+    colorama.init(autoreset=True)
+    workers = args.workers if args.workers is not None else os.cpu_count()
+    print(f"Generating missing image hashes with {workers} worker processes")
+    total = generate_missing_image_hashes(True, workers=workers)
+    print(f"Post records updated: {total}")
+
+
 def server_watchdog(args):
     watchdog_info = {}
     try:
@@ -391,6 +410,7 @@ def main(args):
         'init': init_db,
         'watchdog': server_watchdog,
         'kill': kill_server,
+        'hashes': generate_hashes,
     }
     switcher[args.type](args)
 
@@ -420,7 +440,7 @@ def check_other_execs():
 if __name__ == '__main__':
     from argparse import ArgumentParser
     parser = ArgumentParser(description="Server to process network requests.")
-    parser.add_argument('type', choices=['init', 'server', 'watchdog', 'kill'])
+    parser.add_argument('type', choices=['init', 'server', 'watchdog', 'kill', 'hashes'])
     parser.add_argument('--new', required=False, default=False, action="store_true",
                         help="Start with a new database file.")
     parser.add_argument('--extension', required=False, default=False, action="store_true",
@@ -432,6 +452,8 @@ if __name__ == '__main__':
     parser.add_argument('--drop', required=False, default=False, action="store_true",
                         help="Drops the tables before recreating with the 'init' option.")
     parser.add_argument('--unique-id', required=False, help="Unique identifier required to access admin routes.")
+    parser.add_argument('--workers', required=False, type=int,
+                        help="Number of processes used by the 'hashes' option. Defaults to the CPU count.")
     args = parser.parse_args()
     main(args)
 elif __name__ == '__mp_main__':
@@ -24,6 +24,14 @@ def get_buffer_checksum(buffer):
     return hasher.hexdigest()
 
 
+def get_file_checksum(filepath, chunk_size=1024 * 1024):
+    hasher = hashlib.md5()
+    with open(filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
 def decode_unicode(byte_string):
     try:
         decoded_string = byte_string.decode('utf')
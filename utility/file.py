@@ -4,6 +4,8 @@
 import os
 import time
 import json
+import errno
+import shutil
 import pathlib
 
 # ## LOCAL IMPORTS
@@ -158,3 +160,24 @@ def delete_file(filepath):
 def move_file(old_filepath, new_filepath, safe=False):
     copy_file(old_filepath, new_filepath, safe)
     delete_file(old_filepath)
+
+
+def replace_file(old_filepath, new_filepath, keep=False):
+    """Atomically put the file in place, so that a partially written file is never visible at the new path"""
+    create_directory(new_filepath)
+    if not keep:
+        try:
+            os.replace(old_filepath, new_filepath)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    # Copy next to the destination first when the file can't be renamed across devices
+    part_filepath = new_filepath + '.part'
+    try:
+        shutil.copyfile(old_filepath, part_filepath)
+        os.replace(part_filepath, new_filepath)
+    finally:
+        delete_file(part_filepath)
+    if not keep:
+        delete_file(old_filepath)